@@ -1,32 +1,56 @@
 import os
 from dotenv import load_dotenv
-load_dotenv()
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ENV_PATH = os.path.join(BASE_DIR, ".env")
-load_dotenv(ENV_PATH)
+# backend/.env, or the nearest .env above it when there is none.
+load_dotenv(ENV_PATH if os.path.exists(ENV_PATH) else None)
 
-import os, json
-from fastapi import FastAPI, UploadFile, File
+import json, secrets, tempfile, time
+from fastapi import FastAPI, UploadFile, File, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
 import orjson
 from typing import Optional, List  # Added for type hinting
-from core.utils import load_json
+from core.catalog import get_catalog
 from core.audit import audit_program
-from core.planner import greedy_plan
-from core.scheduler import pick_sections
+from core.batch_audit import BatchAuditor
+from core.multi_audit import auditor_for
+from core.planner import MAX_CREDITS, credit_limit, greedy_plan
+from core.plan_search import BUDGET_MS, search_plans
 from core.policy_agent import draft_override
 from core.explainer_agent import explain_decision
-from core.pdf_parser import pdf_to_transcript, extract_text_and_courses
+from core.pdf_parser import pdf_to_transcript, extract_text_and_courses, shutdown_pool
 from datetime import datetime
-from core.chat_agent import chat_with_student
+from contextlib import asynccontextmanager
+from core import llm
+from core.chat_agent import answer_prepared, prepare_chat, stream_prepared
+from core.sessions import get_session_store, new_session_id
+from core.whatif import what_if
+from core.jobs import QueueFull, get_job_queue, shutdown_jobs
+from core.records import as_transcript
+from core.pipeline import run_pipeline, schedule_terms
+from core.offerings import get_offerings
+from core.warmup import warm_up
+from core import metrics
 
-app = FastAPI(title="Agentic Degree Advisor")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up(CATALOG, OFFERINGS)
+    yield
+    shutdown_jobs()
+    await llm.aclose()
+    shutdown_pool()
+
+app = FastAPI(title="Agentic Degree Advisor", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(metrics.MetricsMiddleware)
 
-CATALOG = load_json("catalog.json")
-OFFERINGS = load_json("offerings.json")
-DEFAULT_PROGRAM = list(CATALOG["programs"].keys())[0]
+CATALOG = get_catalog()
+OFFERINGS = get_offerings()
+DEFAULT_TERM = OFFERINGS.default_term or "2026S"
+DEFAULT_PROGRAM = CATALOG.default_program_id
 
 class AuditRequest(BaseModel):
     transcript: dict
@@ -34,19 +58,31 @@ class AuditRequest(BaseModel):
 class PlanRequest(BaseModel):
     transcript: dict
     program_id: str = DEFAULT_PROGRAM
-    term_sequence: list = [OFFERINGS.get("term","2026S"), "2026F", "2027S"]
+    term_sequence: list = [DEFAULT_TERM, "2026F", "2027S"]
+    max_credits: int = MAX_CREDITS
 class ScheduleRequest(BaseModel):
     planned_terms: list
+    alternatives: int = 3
+    terms: Optional[List[str]] = None  # planned terms to schedule; default: all of them
 class ExplainRequest(BaseModel):
     planned_terms: list
     requirements: list
     course: str
     term: str
+    program_id: str = DEFAULT_PROGRAM
+    transcript: Optional[dict] = None
+    max_credits: int = MAX_CREDITS
+    polish: bool = False  # reword the local explanation with the LLM
 
 @app.get("/health")
 def health():
     return {"status":"ok"}
 
+@app.get("/metrics")
+def get_metrics():
+    # Prometheus scrape target: stage/request latency histograms, LLM tokens, cache hit rates.
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/upload_transcript")
 def upload_transcript(file: UploadFile = File(...)):
     raw = file.file.read()
@@ -56,25 +92,67 @@ def upload_transcript(file: UploadFile = File(...)):
         data = json.loads(raw)
     return {"transcript": data}
 
+def process_transcript_pdf(pdf_bytes: bytes, progress=None):
+    transcript = pdf_to_transcript(pdf_bytes, progress=progress)
+    record = as_transcript(transcript)
+    program = CATALOG.get(DEFAULT_PROGRAM)
+    if progress:
+        progress("auditing")
+    audit_res = audit_program(record, program)
+    if progress:
+        progress("planning")
+    _, planned = greedy_plan(record, program, [DEFAULT_TERM, "2026F"], audit=audit_res)
+    return {"transcript": transcript, "audit": audit_res, "planned_terms": planned}
+
 @app.post("/upload_transcript_pdf")
 def upload_transcript_pdf(file: UploadFile = File(...)):
-    pdf_bytes = file.file.read()
-    transcript = pdf_to_transcript(pdf_bytes)
-    program_id = DEFAULT_PROGRAM
-    program = CATALOG["programs"][program_id]
-    audit_res = audit_program(transcript, program)
-    _, planned = greedy_plan(transcript, program, [OFFERINGS.get("term","2026S"), "2026F"])
-    return {"transcript": transcript, "audit": audit_res, "planned_terms": planned}
+    return process_transcript_pdf(file.file.read())
+
+
+# --- Background jobs: the PDF is processed off the request; poll or stream progress ---
+@app.post("/jobs/transcript_pdf", status_code=202)
+def submit_transcript_pdf(file: UploadFile = File(...)):
+    """Queue a transcript PDF. Same result as /upload_transcript_pdf, delivered through
+    GET /jobs/{job_id} (polling) or GET /jobs/{job_id}/events (Server-Sent Events)."""
+    try:
+        job_id = get_job_queue().submit("transcript_pdf", process_transcript_pdf, file.file.read())
+    except QueueFull:
+        raise HTTPException(status_code=429, detail="Too many transcripts queued; retry shortly.",
+                            headers={"Retry-After": "10"})
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+def job_events(job_id: str):
+    """`status` and `progress` events as they happen (earlier ones replayed first), then
+    `done` with the result or `error`."""
+    jobs = get_job_queue()
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+
+    async def body():
+        async for event, data in jobs.subscribe(job_id):
+            yield _sse(event, data)
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.post("/debug_extract_pdf")
-def debug_extract_pdf(file: UploadFile = File(...), save: bool = False):
+def debug_extract_pdf(file: UploadFile = File(...), save: bool = False, refresh: bool = False):
     """Dev endpoint: return extracted raw text and parsed course rows from the uploaded PDF.
 
     If `save=true` is provided, the uploaded PDF will be written to `backend/data/uploads/` for inspection.
+    `refresh=true` re-extracts the text instead of using the transcript cache.
     """
     pdf_bytes = file.file.read()
-    res = extract_text_and_courses(pdf_bytes)
+    res = extract_text_and_courses(pdf_bytes, cache=not refresh)
 
     if save:
         uploads_dir = os.path.join(BASE_DIR, "data", "uploads")
@@ -91,37 +169,186 @@ def debug_extract_pdf(file: UploadFile = File(...), save: bool = False):
 
 @app.post("/audit")
 def audit(req: AuditRequest):
-    program = CATALOG["programs"][req.program_id]
-    results = audit_program(req.transcript, program)
+    program = CATALOG.get(req.program_id)
+    results = audit_program(as_transcript(req.transcript), program)
     return {"program_id": req.program_id, "audit": results}
 
+class AuditAllRequest(BaseModel):
+    transcript: dict
+    max_credits: int = MAX_CREDITS
+    include_audit: bool = False  # also return the full per-requirement audit for each program
+
+@app.post("/audit/all")
+def audit_all(req: AuditAllRequest):
+    """One transcript against every loaded program, closest first."""
+    snapshot = CATALOG.snapshot()
+    transcript = as_transcript(req.transcript)
+    ranked = auditor_for(snapshot).audit(transcript, req.max_credits)
+    if req.include_audit:
+        for r in ranked:
+            r["audit"] = audit_program(transcript, snapshot.programs[r["program_id"]])
+    return {"programs": ranked}
+
+@app.post("/audit/batch")
+async def audit_batch_endpoint(request: Request, program_id: str = DEFAULT_PROGRAM, chunk_size: int = 500):
+    """Cohort audit. Body is NDJSON (one transcript per line); the response streams one
+    NDJSON line per transcript, in input order, flushed every `chunk_size` students. A line
+    that isn't a valid transcript gets {"index", "error"} instead, and the rest go on."""
+    auditor = BatchAuditor(CATALOG.get(program_id))
+    # The body is spooled first (memory up to 8 MB, then disk): StreamingResponse listens
+    # for disconnects on the same receive channel, so it can't be read lazily below.
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+
+    def run_line(index, line):
+        try:
+            t = orjson.loads(line)
+            if not isinstance(t, dict):
+                raise TypeError("a transcript must be a JSON object")
+            return {"index": index, "student": t.get("student"), "audit": auditor.audit(t)}
+        except (orjson.JSONDecodeError, TypeError, KeyError, ValueError, AttributeError) as e:
+            return {"index": index, "error": f"{type(e).__name__}: {e}"}
+
+    def run_chunk(start, chunk):
+        # Lines are parsed here, in the threadpool, like the audits.
+        return b"".join(orjson.dumps(run_line(start + i, line)) + b"\n" for i, line in enumerate(chunk))
+
+    async def body():
+        with spool:
+            chunk, start = [], 0
+            for line in spool:
+                if not line.strip():
+                    continue
+                chunk.append(line)
+                if len(chunk) >= chunk_size:
+                    yield await run_in_threadpool(run_chunk, start, chunk)
+                    start += len(chunk); chunk = []
+            if chunk:
+                yield await run_in_threadpool(run_chunk, start, chunk)
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
 @app.post("/plan")
 def plan(req: PlanRequest):
-    program = CATALOG["programs"][req.program_id]
-    audit_res, planned = greedy_plan(req.transcript, program, req.term_sequence)
+    program = CATALOG.get(req.program_id)
+    audit_res, planned = greedy_plan(as_transcript(req.transcript), program, req.term_sequence, req.max_credits)
     return {"audit": audit_res, "planned_terms": planned}
 
+class PlanAlternativesRequest(PlanRequest):
+    k: int = 3
+    budget_ms: float = BUDGET_MS
+
+@app.post("/plan/alternatives")
+def plan_alternatives(req: PlanAlternativesRequest):
+    """The `k` best plans (elective choices and term assignments) ranked on terms to graduate,
+    seat availability and credit balance; see core/plan_search.py."""
+    program = CATALOG.get(req.program_id)
+    return search_plans(as_transcript(req.transcript), program, req.term_sequence, max(1, min(req.k, 10)),
+                        req.max_credits, OFFERINGS.snapshot(), budget_ms=min(req.budget_ms, 1000))
+
 @app.post("/schedule")
 def schedule(req: ScheduleRequest):
-    next_term = req.planned_terms[0]["term"] if req.planned_terms else OFFERINGS["term"]
-    courses = req.planned_terms[0]["courses"] if req.planned_terms else []
-    chosen, needs = pick_sections(courses, OFFERINGS)
-    return {"term": next_term, "chosen_sections": chosen, "needs_overrides": needs}
+    """Sections for every planned term (or `terms`) against current seats; `terms` in the
+    response has one entry per term, terms without offerings are marked unavailable. The
+    first one is also returned at the top level."""
+    terms = req.terms if req.terms is not None else [t["term"] for t in req.planned_terms]
+    per_term = schedule_terms(req.planned_terms, OFFERINGS.snapshot(), terms, req.alternatives)
+    first = per_term[0] if per_term else {"term": DEFAULT_TERM, "chosen_sections": [], "needs_overrides": [],
+                                          "alternatives": []}
+    return {"term": first["term"], "chosen_sections": first["chosen_sections"],
+            "needs_overrides": first["needs_overrides"], "alternatives": first["alternatives"], "terms": per_term}
+
+class OfferingsDeltas(BaseModel):
+    deltas: List[dict]
+
+@app.get("/offerings")
+def offerings_summary():
+    return OFFERINGS.summary()
+
+@app.get("/offerings/{term}/{course}")
+def offerings_course(term: str, course: str):
+    doc = OFFERINGS.get(term)
+    if doc is None or course not in doc["sections"]:
+        raise HTTPException(status_code=404, detail=f"No sections for {course} in {term}")
+    return {"term": term, "course": course, "version": doc["version"], "open_sections": doc["open"][course],
+            "sections": doc["sections"][course]}
+
+@app.post("/offerings/deltas")
+def offerings_deltas(body: OfferingsDeltas, request: Request):
+    """Seat changes / added / removed sections, applied all-or-nothing (see core/offerings.py).
+    The X-Offerings-Token header must match OFFERINGS_DELTA_TOKEN; without that setting the
+    endpoint is disabled (the watched deltas file still works)."""
+    token = os.getenv("OFFERINGS_DELTA_TOKEN")
+    if not token:
+        raise HTTPException(status_code=403, detail="Offerings updates are disabled (OFFERINGS_DELTA_TOKEN is not set)")
+    if not secrets.compare_digest(request.headers.get("x-offerings-token", "").encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Bad offerings token")
+    try:
+        return OFFERINGS.apply(body.deltas)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+class PipelineRequest(BaseModel):
+    transcript: Optional[dict] = None  # or upload a PDF (multipart `file`, these fields as JSON in `options`)
+    program_id: str = DEFAULT_PROGRAM
+    stages: List[str] = ["audit", "plan", "schedule"]
+    term_sequence: list = [DEFAULT_TERM, "2026F", "2027S"]
+    max_credits: int = MAX_CREDITS
+    planned_terms: Optional[list] = None  # schedule an existing plan instead of planning
+    schedule_terms: Optional[List[str]] = None  # default: the first planned term
+    alternatives: int = 0
+
+@app.post("/pipeline")
+async def pipeline(request: Request):
+    """parse -> audit -> plan -> schedule in one request, each stage computed once.
+
+    JSON body: a PipelineRequest. Multipart: `file` (transcript PDF) plus optional `options`
+    (PipelineRequest fields as JSON). Requested stages pull in the ones they need."""
+    pdf_bytes = None
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            pdf_bytes = await upload.read() if upload is not None else None
+            req = PipelineRequest.model_validate_json(form.get("options") or "{}")
+        else:
+            req = PipelineRequest.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    def run():
+        transcript = pdf_to_transcript(pdf_bytes) if pdf_bytes is not None else req.transcript
+        stages = [s for s in req.stages if s != "parse"]  # parsing is implied by a PDF upload
+        out = run_pipeline(transcript, CATALOG.get(req.program_id), stages, req.term_sequence,
+                           OFFERINGS.snapshot(), req.max_credits, req.planned_terms,
+                           req.schedule_terms, req.alternatives)
+        if pdf_bytes is not None:
+            out["transcript"] = transcript
+            out["stages"].insert(0, "parse")
+        return out
+
+    try:
+        return await run_in_threadpool(run)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @app.post("/override_draft")
-def override_draft_endpoint(payload: dict):
+async def override_draft_endpoint(payload: dict):
     student = payload.get("student", {"name":"Student","id":"Z0000000"})
     course = payload["course"]
-    term = payload.get("term", OFFERINGS.get("term","2026S"))
+    term = payload.get("term", DEFAULT_TERM)
     reason = payload.get("reason","Section is full")
     evidence = payload.get("evidence","On-track graduation requires this course")
-    text = draft_override(student, course, term, reason, evidence)
+    text = await draft_override(student, course, term, reason, evidence)
     return {"draft": text}
 
 @app.post("/explain")
-def explain(req: ExplainRequest):
-    text = explain_decision({"planned_terms": req.planned_terms}, req.requirements, req.course, req.term)
-    return {"explanation": text}
+async def explain(req: ExplainRequest):
+    return await explain_decision({"planned_terms": req.planned_terms}, req.requirements, req.course, req.term,
+                                  program=CATALOG.get(req.program_id), transcript=req.transcript,
+                                  polish=req.polish, max_credits=req.max_credits)
 
 class ChatMessage(BaseModel):
     role: str  # "user" or "assistant"
@@ -133,16 +360,25 @@ class ChatRequest(BaseModel):
     goals: str = "Graduate on time with a balanced workload."
     preferences: dict = {}
     history: list[ChatMessage] = []
-    term_sequence: list = [OFFERINGS.get("term", "2026S"), "2026F", "2027S"]
+    term_sequence: list = [DEFAULT_TERM, "2026F", "2027S"]
     # ---------------------------------------------------------
     # 1. Added field to receive the current plan from frontend
     # ---------------------------------------------------------
     planned_terms: Optional[list] = None 
+    # Returned by the previous /chat turn; keeps the prompt prefix stable and sends only deltas.
+    context_state: Optional[dict] = None
+    context_budget: Optional[int] = None
+    # Ignored: the chat always audits `transcript` itself. A client-sent audit could steer the
+    # advice and isn't worth validating (auditing is cheap). Kept so older clients don't 422.
+    audit: Optional[list] = None
 
 @app.post("/chat")
-def chat(req: ChatRequest):
-    program = CATALOG["programs"][req.program_id]
-    result = chat_with_student(
+async def chat(req: ChatRequest):
+    program = CATALOG.get(req.program_id)
+    # Audit, plan, alternatives and context building are CPU work: keep them off the event
+    # loop, which only waits on the LLM.
+    prepared = await run_in_threadpool(
+        prepare_chat,
         transcript=req.transcript,
         program=program,
         goals=req.goals,
@@ -152,7 +388,205 @@ def chat(req: ChatRequest):
         # ---------------------------------------------------------
         # 2. Pass the plan to the agent function
         # ---------------------------------------------------------
-        existing_plan=req.planned_terms 
+        existing_plan=req.planned_terms,
+        context_state=req.context_state,
+        context_budget=req.context_budget,
     )
     # result already has reply + engine outputs
-    return result
\ No newline at end of file
+    return await answer_prepared(prepared)
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Same inputs as /chat, answered as Server-Sent Events: `engine` (audit + planned_terms)
+    first, then `token` events as the model writes, then `done` with the full reply."""
+    program = CATALOG.get(req.program_id)
+    prepared = await run_in_threadpool(
+        prepare_chat,
+        transcript=req.transcript,
+        program=program,
+        goals=req.goals,
+        preferences=req.preferences,
+        history=[m.model_dump() for m in req.history],
+        term_sequence=req.term_sequence,
+        existing_plan=req.planned_terms,
+        context_state=req.context_state,
+        context_budget=req.context_budget,
+    )
+    events = stream_prepared(prepared)
+
+    async def body():
+        try:
+            async for event, data in events:
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"message": str(e)})
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# --- Advising sessions: transcript, audit, plan and history stay on the server ---
+class SessionCreate(BaseModel):
+    transcript: dict
+    program_id: str = DEFAULT_PROGRAM
+    goals: str = "Graduate on time with a balanced workload."
+    preferences: dict = {}
+    term_sequence: list = [DEFAULT_TERM, "2026F", "2027S"]
+    planned_terms: Optional[list] = None
+
+class SessionMessage(BaseModel):
+    message: str
+    # Optional updates; anything left out keeps the session's current value.
+    goals: Optional[str] = None
+    preferences: Optional[dict] = None
+    planned_terms: Optional[list] = None
+    context_budget: Optional[int] = None
+
+SESSIONS = get_session_store()
+
+@app.post("/sessions")
+def create_session(req: SessionCreate):
+    program = CATALOG.get(req.program_id)
+    transcript = as_transcript(req.transcript)
+    audit_res = audit_program(transcript, program)
+    planned = req.planned_terms
+    if planned is None:
+        max_credits = credit_limit(req.preferences)
+        _, planned = greedy_plan(transcript, program, req.term_sequence, max_credits, audit=audit_res)
+    sid = new_session_id()
+    SESSIONS.put(sid, {
+        "program_id": req.program_id, "transcript": req.transcript, "audit": audit_res,
+        "planned_terms": planned, "goals": req.goals, "preferences": req.preferences,
+        "term_sequence": req.term_sequence, "history": [], "context_state": None, "created": time.time(),
+    })
+    return {"session_id": sid, "audit": audit_res, "planned_terms": planned}
+
+def _load_session(sid: str) -> dict:
+    session = SESSIONS.get(sid)
+    if session is None:
+        raise HTTPException(status_code=404, detail="session not found or expired")
+    return session
+
+@app.get("/sessions/{sid}")
+def get_session(sid: str):
+    return {"session_id": sid, **_load_session(sid)}
+
+@app.delete("/sessions/{sid}")
+def delete_session(sid: str):
+    return {"deleted": SESSIONS.delete(sid)}
+
+def _apply_message(session: dict, msg: SessionMessage, program):
+    """Apply the message's updates and the user's turn to `session` in place."""
+    if msg.goals is not None:
+        session["goals"] = msg.goals
+    if msg.planned_terms is not None:
+        session["planned_terms"] = msg.planned_terms
+    elif msg.preferences is not None and msg.preferences.get("max_credits") != session["preferences"].get("max_credits"):
+        max_credits = credit_limit(msg.preferences)
+        _, session["planned_terms"] = greedy_plan(session["transcript"], program, session["term_sequence"], max_credits,
+                                                  audit=session["audit"])
+    if msg.preferences is not None:
+        session["preferences"] = msg.preferences
+    session["history"].append({"role": "user", "content": msg.message})
+
+def _session_turn(sid: str, msg: SessionMessage):
+    """Apply the message to the session and run the engine half of the chat on it
+    (prepare_chat); returns (session, version read, prepared). Blocking: call it from the threadpool."""
+    hit = SESSIONS.get_versioned(sid)
+    if hit is None:
+        raise HTTPException(status_code=404, detail="session not found or expired")
+    session, version = hit
+    program = CATALOG.get(session["program_id"])
+    _apply_message(session, msg, program)
+    kwargs = dict(
+        transcript=session["transcript"], program=program, goals=session["goals"],
+        preferences=session["preferences"], history=session["history"], term_sequence=session["term_sequence"],
+        existing_plan=session["planned_terms"], audit=session["audit"],
+        context_state=session["context_state"], context_budget=msg.context_budget,
+    )
+    return session, version, prepare_chat(**kwargs)
+
+SAVE_ATTEMPTS = 5
+
+def _save_turn(sid: str, session: dict, version: int, msg: SessionMessage, reply: str, state: Optional[dict]):
+    """Store the turn with a compare-and-set on the version it was read at. If another turn on
+    the session was saved meanwhile, this one (updates, message, reply) is re-applied on top of
+    it rather than overwriting it; its prompt state is dropped then, being built from older history."""
+    for _ in range(SAVE_ATTEMPTS):
+        session["history"].append({"role": "assistant", "content": reply})
+        if state is not None:
+            session["context_state"] = state
+        if SESSIONS.put(sid, session, expect=version):
+            return
+        hit = SESSIONS.get_versioned(sid)
+        if hit is None:
+            return  # deleted or expired during the turn
+        session, version = hit
+        _apply_message(session, msg, CATALOG.get(session["program_id"]))
+        session["context_state"], state = None, None
+    raise HTTPException(status_code=409, detail="session is busy; send the message again")
+
+@app.post("/sessions/{sid}/chat")
+async def session_chat(sid: str, msg: SessionMessage):
+    session, version, prepared = await run_in_threadpool(_session_turn, sid, msg)
+    result = await answer_prepared(prepared)
+    await run_in_threadpool(_save_turn, sid, session, version, msg, result["reply"], result.get("context_state"))
+    return {k: result[k] for k in ("reply", "planned_terms", "alternatives", "usage") if k in result}
+
+@app.post("/sessions/{sid}/chat/stream")
+async def session_chat_stream(sid: str, msg: SessionMessage):
+    """Like /chat/stream, but only the new message is sent; the turn is saved after `done`."""
+    session, version, prepared = await run_in_threadpool(_session_turn, sid, msg)
+    events = stream_prepared(prepared)
+
+    async def body():
+        state = None
+        try:
+            async for event, data in events:
+                if event == "engine":
+                    state = data.pop("context_state", None)
+                    data.pop("audit", None)
+                elif event == "done":
+                    await run_in_threadpool(_save_turn, sid, session, version, msg, data["reply"], state)
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"message": str(e)})
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class WhatIfRequest(BaseModel):
+    # Base: an existing session (its audit and plan are reused) or a transcript.
+    session_id: Optional[str] = None
+    transcript: Optional[dict] = None
+    program_id: str = DEFAULT_PROGRAM
+    term_sequence: list = [DEFAULT_TERM, "2026F", "2027S"]
+    max_credits: int = MAX_CREDITS
+    planned_terms: Optional[list] = None
+    # [{"op": "add" | "drop" | "grade", "code": "COP3530", "term"?, "grade"?}]
+    changes: List[dict]
+
+@app.post("/whatif")
+def whatif(req: WhatIfRequest):
+    """Audit and plan after hypothetical adds/drops/grade changes, with the diff against the base.
+    Nothing is saved; a session stays as it was."""
+    if req.session_id:
+        session = _load_session(req.session_id)
+        program = CATALOG.get(session["program_id"])
+        base = dict(transcript=session["transcript"], term_sequence=session["term_sequence"],
+                    max_credits=credit_limit(session["preferences"]),
+                    base_audit=session["audit"], base_plan=session["planned_terms"])
+    elif req.transcript is not None:
+        program = CATALOG.get(req.program_id)
+        base = dict(transcript=req.transcript, term_sequence=req.term_sequence,
+                    max_credits=req.max_credits, base_plan=req.planned_terms)
+    else:
+        raise HTTPException(status_code=422, detail="session_id or transcript is required")
+    try:
+        return what_if(program=program, changes=req.changes, **base)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"bad change: {e}")
@@ -0,0 +1,57 @@
+"""PDF ingestion benchmark on generated multi-page transcripts.
+
+    cd backend && python -m bench.bench_pdf
+
+Compares in-process extraction (1 worker) with the process pool. OCR timings are only
+run when tesseract and poppler are installed; they also time the single-pass OCR (the
+whole page at full DPI) against the scan + re-read bands pass of _ocr_pages.
+"""
+import resource, shutil, statistics, time
+from core import pdf_parser
+from bench.pdf_fixtures import make_pdf
+
+
+def _time(fn, trials: int):
+    times = []
+    for _ in range(trials):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def _single_pass_ocr(pdf: bytes, dpi: int = 200):
+    import pytesseract
+    from pdf2image import convert_from_bytes
+    return [pytesseract.image_to_string(img.convert("L")) for img in convert_from_bytes(pdf, dpi=dpi)]
+
+
+def run(pages: int, workers_list=(1, 2, 4), trials: int = 5, ocr: bool = False):
+    pdf = make_pdf(pages, seed=pages)
+    line = f"{pages:>3} pages {'ocr ' if ocr else 'text'}"
+    for w in workers_list:
+        pdf_parser.shutdown_pool()
+        pdf_parser.PDF_WORKERS = w
+        if ocr:
+            fn = lambda: pdf_parser._fan_out(pdf_parser._ocr_pages, pdf, pages, w, 200)
+        else:
+            fn = lambda: pdf_parser._extract(pdf, workers=w)
+        fn()  # warm the pool
+        line += f"  {w} worker(s) {_time(fn, trials):8.1f} ms"
+    if ocr:
+        # Pages are loaded one at a time, so this should not grow with the page count.
+        rss = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+        line += f"  peak rss {rss / 1024:.0f} MB"
+        # After the rss reading: this one holds every page's bitmap at once.
+        line += f"  single pass {_time(lambda: _single_pass_ocr(pdf), trials):8.1f} ms"
+    print(line)
+
+
+if __name__ == "__main__":
+    print(f"cpus available: {pdf_parser.os.cpu_count()}")
+    for pages in (2, 8, 24):
+        run(pages)
+    if shutil.which("tesseract") and shutil.which("pdftoppm"):
+        for pages in (2, 8, 20):
+            run(pages, trials=1, ocr=True)
+    pdf_parser.shutdown_pool()
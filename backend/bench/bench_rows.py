@@ -0,0 +1,59 @@
+"""Transcript row parser benchmark: typical text and adversarial long lines.
+
+    cd backend && python -m bench.bench_rows
+
+The old backtracking regex is timed alongside (on inputs small enough to finish) so the
+gap stays visible; the linear scanner should grow ~linearly with line length.
+"""
+import random, re, time
+from core.pdf_parser import _parse_courses
+
+LEGACY_ROW_REGEX = re.compile(
+    r"[\"']?(?P<term>\d{4})[\"']?.*?"
+    r"[\"']?(?P<code>[A-Z]{3,4}[ \t]*\d{3,4}(?:[ \t]*[A-Za-z])?)[\"']?.*?"
+    r"[\"']?(?P<credits>\d+\.\d{1,2})[\"']?.*?"
+    r"[\"']?(?P<grade>(?:[A-Z]{1,2}[\+\-]?))[\"']?"
+)
+
+
+def typical(rows: int = 2000, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(rows):
+        code = f"{rnd.choice(['COP', 'MAC', 'CDA', 'ENC'])}{rnd.randint(1000, 4999)}"
+        out.append(f"2218 {code} Intro to Something 3.00 {rnd.choice(['A', 'B+', 'IP'])}")
+        out.append(f'"2218","{code}","Intro to Something","3.00","A"')
+        out.append("Page header text with no course data on it at all")
+    return "\n".join(out)
+
+
+# Adversarial single lines: terms and codes but nothing that completes a row, so the
+# regex retries every term x code x credits split.
+ADVERSARIAL = {
+    "codes, no credits": lambda n: "2205 " + "COP2220 " * (n // 8),
+    "terms, no code": lambda n: "2205 " * (n // 5) + "3.00 A",
+    "ocr noise": lambda n: "".join(random.Random(n).choice("0123456789 ABC.x") for _ in range(n)),
+}
+
+
+def _time(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def legacy(text: str):
+    return list(LEGACY_ROW_REGEX.finditer(text))
+
+
+if __name__ == "__main__":
+    text = typical()
+    print(f"typical {len(text) // 1000:>4} KB   scanner {_time(lambda: _parse_courses(text)):8.1f} ms"
+          f"   regex {_time(lambda: legacy(text)):8.1f} ms")
+    for name, make in ADVERSARIAL.items():
+        for n in (1000, 4000, 16000, 64000):
+            line = make(n)
+            row = f"{name:<18} {n:>6} chars   scanner {_time(lambda: _parse_courses(line)):8.1f} ms"
+            if n <= 4000:
+                row += f"   regex {_time(lambda: legacy(line)):8.1f} ms"
+            print(row)
@@ -0,0 +1,32 @@
+"""Scheduler benchmark on synthetic offerings.
+
+    cd backend && python -m bench.bench_scheduler
+"""
+import random, statistics, time
+from core.scheduler import pick_sections, rank_schedules
+from bench.synth import synth_offerings
+
+
+def run(n_courses: int, sections_per_course: int, load: int, trials: int = 50, seed: int = 0):
+    offerings = synth_offerings(n_courses, sections_per_course, seed=seed)
+    rnd = random.Random(seed)
+    codes = list(offerings["sections"])
+    times, overrides = [], 0
+    for _ in range(trials):
+        planned = rnd.sample(codes, load)
+        t0 = time.perf_counter()
+        _, needs = pick_sections(planned, offerings)
+        rank_schedules(planned, offerings, k=5)
+        times.append((time.perf_counter() - t0) * 1000)
+        overrides += len(needs)
+    times.sort()
+    total = n_courses * sections_per_course
+    print(f"{total:>6} sections  {load} courses/term  "
+          f"p50 {statistics.median(times):7.2f} ms  p95 {times[int(len(times) * 0.95) - 1]:7.2f} ms  "
+          f"overrides/term {overrides / trials:.2f}")
+
+
+if __name__ == "__main__":
+    for n, per in [(50, 4), (300, 10), (500, 20)]:
+        for load in (4, 6):
+            run(n, per, load)
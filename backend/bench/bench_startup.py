@@ -0,0 +1,57 @@
+"""Cold-start benchmark: `import app` and time to the first /health answer, each in a fresh process.
+
+    cd backend && python -m bench.bench_startup         # median of 5 runs each
+    WARMUP=1 python -m bench.bench_startup              # with the warm-up hook (core/warmup.py)
+
+Both are also cases of bench/suite.py (import_app, first_health), so they get baselines.
+"""
+import os, socket, statistics, subprocess, sys, time, urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("openai", "httpx", "pdfplumber", "pdf2image", "pytesseract")
+_IMPORT = ("import sys, time; t = time.perf_counter(); import app; "
+           f"print(time.perf_counter() - t, *[m for m in {HEAVY!r} if m in sys.modules])")
+
+
+def import_app() -> tuple:
+    """(seconds spent in `import app`, heavy modules it pulled in), in a fresh interpreter."""
+    out = subprocess.run([sys.executable, "-c", _IMPORT], cwd=BACKEND, capture_output=True, text=True, check=True)
+    seconds, *loaded = out.stdout.split()
+    return float(seconds), loaded
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_health(timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn to the first 200 from /health."""
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t0
+            except OSError:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with {proc.returncode}")
+                time.sleep(0.01)
+        raise TimeoutError(f"/health did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    runs = [import_app() for _ in range(5)]
+    loaded = sorted({m for _, mods in runs for m in mods})
+    print(f"import app     median {statistics.median(s for s, _ in runs) * 1000:7.1f} ms  "
+          f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+    health = [first_health() for _ in range(5)]
+    print(f"first /health  median {statistics.median(health) * 1000:7.1f} ms  (WARMUP={os.getenv('WARMUP', '0')})")
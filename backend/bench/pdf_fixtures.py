@@ -0,0 +1,92 @@
+"""Tiny PDF writer for transcript-like fixtures (no extra dependencies).
+
+Each page has a header, a ruled course table (so pdfplumber's table finder has work to do)
+and a few lines of running text.
+"""
+import os, random
+from typing import List, Tuple
+
+SUBJECTS = ["COP", "MAC", "CDA", "COT", "ENC", "PHY", "STA", "CEN", "CNT", "EGN"]
+GRADES = ["A", "A-", "B+", "B", "B-", "C+", "C", "IP"]
+
+
+def _escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_stream(rows: List[Tuple[str, str, str, str, str]], header: List[str]) -> bytes:
+    ops = ["BT /F1 10 Tf"]
+    y = 760
+    for line in header:
+        ops.append(f"1 0 0 1 50 {y} Tm ({_escape(line)}) Tj")
+        y -= 14
+    ops.append("ET")
+    # Ruled table: one cell per column per row.
+    cols = [50, 110, 190, 400, 460, 520]
+    top = y - 10
+    row_h = 16
+    for i, row in enumerate(rows):
+        ry = top - i * row_h
+        for c0, c1 in zip(cols, cols[1:]):
+            ops.append(f"{c0} {ry - row_h} {c1 - c0} {row_h} re S")
+        ops.append("BT /F1 9 Tf")
+        for (c0, _), cell in zip(zip(cols, cols[1:]), row):
+            ops.append(f"1 0 0 1 {c0 + 3} {ry - 12} Tm ({_escape(cell)}) Tj")
+        ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def make_pdf(pages: int, rows_per_page: int = 30, seed: int = 0) -> bytes:
+    rnd = random.Random(seed)
+    streams = []
+    for p in range(pages):
+        header = ["Florida Atlantic University - Unofficial Transcript",
+                  "Name: Jordan Sample    ID: Z12345678", f"Page {p + 1} of {pages}"]
+        rows = []
+        for _ in range(rows_per_page):
+            term = rnd.choice(["2208", "2211", "2215", "2218", "2221", "2225"])
+            code = f"{rnd.choice(SUBJECTS)}{rnd.randint(1000, 4999)}"
+            rows.append((term, code, "Course title " + code, f"{rnd.choice([1, 3, 4])}.00", rnd.choice(GRADES)))
+        streams.append(_page_stream(rows, header))
+
+    # Objects: 1 catalog, 2 pages, 3 font, then (page, content) pairs.
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for s in streams:
+        page_id = len(objs) + 1
+        kids.append(f"{page_id} 0 R")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode())
+        objs.append(b"<< /Length %d >>\nstream\n" % len(s) + s + b"\nendstream")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FIXTURES = {"transcript_1p.pdf": (1, 1), "transcript_4p.pdf": (4, 4), "transcript_12p.pdf": (12, 12)}
+
+
+def fixture(name: str) -> bytes:
+    """Checked-in sample PDF; regenerate with `python -m bench.pdf_fixtures`."""
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+if __name__ == "__main__":
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name, (pages, seed) in FIXTURES.items():
+        with open(os.path.join(FIXTURES_DIR, name), "wb") as f:
+            f.write(make_pdf(pages, seed=seed))
+        print(f"wrote {name}")
@@ -0,0 +1,230 @@
+"""Engine benchmark suite: latency percentiles and throughput per hot path, with baselines.
+
+    cd backend && python -m bench.suite             # run, compare with bench/baselines.json
+    python -m bench.suite --save                    # run and record a new baseline
+    python -m bench.suite --only plan --quick       # subset, fewer iterations
+
+Exits 1 when a case's p50 is more than --threshold (default 25%) slower than its baseline.
+Baselines are machine-specific; the file records where it was taken, and a comparison on
+a different machine prints a warning next to the numbers.
+"""
+import argparse, json, os, platform, random, re, statistics, sys, time
+from typing import Callable, Dict, List, Tuple
+
+from bench.pdf_fixtures import fixture
+from bench.bench_rows import typical
+from bench.synth import synth_cohort, synth_offerings, synth_program
+from core.audit import audit_program
+from core.batch_audit import BatchAuditor
+from core.catalog import Program
+from core.planner import greedy_plan
+from core.scheduler import pick_sections
+from core.utils import load_json
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+THRESHOLD = float(os.getenv("BENCH_THRESHOLD", "0.25"))
+# Differences below this are timer noise, whatever the ratio.
+NOISE_MS = 0.05
+TERMS = ["2026S", "2026F", "2027S", "2027F", "2028S", "2028F"]
+
+Case = Tuple[Callable[[int], object], int]  # fn(i), iterations
+
+
+def _program_and_cohort(quick: bool):
+    raw = synth_program(n_courses=400, depth=12, seed=1)
+    return Program("SYN", raw), raw, synth_cohort(raw, 100 if quick else 500, seed=2)
+
+
+def case_audit_program(quick: bool) -> Case:
+    program, _, cohort = _program_and_cohort(quick)
+    return (lambda i: audit_program(cohort[i % len(cohort)], program)), len(cohort)
+
+
+def case_batch_audit(quick: bool) -> Case:
+    program, _, cohort = _program_and_cohort(quick)
+    auditor = BatchAuditor(program)
+    return (lambda i: auditor.audit(cohort[i % len(cohort)])), len(cohort)
+
+
+def case_greedy_plan(quick: bool) -> Case:
+    program, _, cohort = _program_and_cohort(quick)
+    return (lambda i: greedy_plan(cohort[i % len(cohort)], program, TERMS, 15)), len(cohort) // 2
+
+
+def case_plan_search(quick: bool) -> Case:
+    from core.plan_search import search_plans
+    program, _, cohort = _program_and_cohort(quick)
+    return (lambda i: search_plans(cohort[i % len(cohort)], program, TERMS, 3, 15)), 10 if quick else 40
+
+
+def case_what_if(quick: bool) -> Case:
+    from core.whatif import what_if
+    program, _, cohort = _program_and_cohort(quick)
+    bases = []
+    for t in cohort[:50]:
+        audit, plan = greedy_plan(t, program, TERMS, 15)
+        code = t["taken"][0]["code"] if t["taken"] else program.codes[0]
+        bases.append((t, audit, plan, [{"op": "drop", "code": code}]))
+
+    def run(i):
+        t, audit, plan, changes = bases[i % len(bases)]
+        return what_if(t, program, changes, TERMS, 15, base_audit=audit, base_plan=plan)
+    return run, 200
+
+
+def case_audit_all(quick: bool) -> Case:
+    from core.multi_audit import MultiProgramAuditor
+    programs = [Program(f"SYN{k}", synth_program(n_courses=150, depth=8, n_requirements=15, seed=10 + k))
+                for k in range(20)]
+    auditor = MultiProgramAuditor(programs)
+    cohort = synth_cohort(programs[0].raw, 50, seed=3)
+    return (lambda i: auditor.audit(cohort[i % len(cohort)])), 100 if quick else 300
+
+
+def case_pick_sections(quick: bool) -> Case:
+    offerings = synth_offerings(500, 10, seed=4)
+    rnd = random.Random(5)
+    loads = [rnd.sample(list(offerings["sections"]), 5) for _ in range(100)]
+    return (lambda i: pick_sections(loads[i % len(loads)], offerings)), 100 if quick else 300
+
+
+def case_parse_courses(quick: bool) -> Case:
+    from core.pdf_parser import _parse_courses
+    texts = [typical(60, seed=s) for s in range(20)]
+    return (lambda i: _parse_courses(texts[i % len(texts)])), 100 if quick else 400
+
+
+def case_prepare_chat(quick: bool) -> Case:
+    from core.catalog import get_catalog
+    from core.chat_agent import prepare_chat
+    catalog = get_catalog()
+    program = catalog.get(catalog.default_program_id)
+    transcript = load_json("transcript.sample.json")
+    history = [{"role": "user" if k % 2 == 0 else "assistant", "content": f"Turn {k}: " + "words " * 80}
+               for k in range(12)]
+    return (lambda i: prepare_chat(transcript, program, "Graduate on time.", {}, history, TERMS[:3])), \
+        100 if quick else 300
+
+
+def case_pdf_to_transcript(quick: bool) -> Case:
+    from core.pdf_parser import pdf_to_transcript
+    pdfs = [fixture("transcript_1p.pdf"), fixture("transcript_4p.pdf")]
+    return (lambda i: pdf_to_transcript(pdfs[i % len(pdfs)], cache=False)), 6 if quick else 20
+
+
+def case_import_app(quick: bool) -> Case:
+    from bench.bench_startup import import_app
+    return (lambda i: import_app()), 3 if quick else 8
+
+
+def case_first_health(quick: bool) -> Case:
+    from bench.bench_startup import first_health
+    return (lambda i: first_health()), 3 if quick else 8
+
+
+CASES: Dict[str, Callable[[bool], Case]] = {
+    "audit_program": case_audit_program,
+    "batch_audit": case_batch_audit,
+    "greedy_plan": case_greedy_plan,
+    "plan_search": case_plan_search,
+    "what_if": case_what_if,
+    "audit_all": case_audit_all,
+    "pick_sections": case_pick_sections,
+    "parse_courses": case_parse_courses,
+    "prepare_chat": case_prepare_chat,
+    "pdf_to_transcript": case_pdf_to_transcript,
+    "import_app": case_import_app,
+    "first_health": case_first_health,
+}
+
+
+def percentile(sorted_ms: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    k = max(0, min(len(sorted_ms) - 1, int(round(q / 100 * len(sorted_ms) + 0.5)) - 1))
+    return sorted_ms[k]
+
+
+def measure(fn: Callable[[int], object], iterations: int, warmup: int = 3) -> Dict[str, float]:
+    for i in range(min(warmup, iterations)):
+        fn(i)
+    times = []
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    mean = statistics.fmean(times)
+    return {"n": iterations, "p50_ms": round(percentile(times, 50), 4), "p95_ms": round(percentile(times, 95), 4),
+            "p99_ms": round(percentile(times, 99), 4), "mean_ms": round(mean, 4),
+            "ops_per_s": round(1000 / mean, 1) if mean else 0.0}
+
+
+def machine() -> Dict[str, object]:
+    return {"python": platform.python_version(), "platform": platform.platform(terse=True),
+            "processor": platform.machine(), "cpus": os.cpu_count()}
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float = THRESHOLD) -> List[str]:
+    """Cases whose p50 regressed past `threshold` (a ratio, 0.25 = 25% slower)."""
+    out = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        before, after = base["p50_ms"], r["p50_ms"]
+        if after > before * (1 + threshold) and after - before > NOISE_MS:
+            out.append(f"{name}: p50 {before:.3f} -> {after:.3f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return out
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="engine benchmark suite")
+    ap.add_argument("--only", help="regex over case names")
+    ap.add_argument("--quick", action="store_true", help="smaller inputs and fewer iterations")
+    ap.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    ap.add_argument("--json", help="also write this run's results here")
+    args = ap.parse_args(argv)
+
+    names = [n for n in CASES if not args.only or re.search(args.only, n)]
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    base_results = baseline.get("results", {})
+    if baseline and baseline.get("machine") != machine():
+        print(f"note: baseline was taken on {baseline.get('machine')}; this is {machine()}")
+
+    results = {}
+    print(f"{'case':<18} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9}   vs baseline p50")
+    for name in names:
+        fn, iterations = CASES[name](args.quick)
+        r = results[name] = measure(fn, iterations)
+        base = base_results.get(name)
+        delta = f"{(r['p50_ms'] / base['p50_ms'] - 1) * 100:+.0f}%" if base and base["p50_ms"] else "-"
+        print(f"{name:<18} {r['n']:>5} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} "
+              f"{r['ops_per_s']:>9.1f}   {delta}")
+
+    report = {"machine": machine(), "quick": args.quick, "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save:
+        merged = {**base_results, **results} if baseline.get("machine") == machine() else results
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**report, "results": merged}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"saved baseline to {args.baseline}")
+        return 0
+    if baseline and baseline.get("quick", False) != args.quick:
+        print("note: baseline and this run differ in --quick; not comparing")
+        return 0
+    regressions = compare(results, base_results, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,83 @@
+"""Seeded synthetic data for benchmarks. Same seed, same data."""
+import random
+from typing import Dict, List
+
+DAY_PATTERNS = ["MWF", "TR", "MW", "M", "T", "W", "R", "F"]
+START_TIMES = [f"{h:02d}:{m:02d}" for h in range(8, 20) for m in (0, 30)]
+
+
+def _end(start: str, minutes: int) -> str:
+    h, m = map(int, start.split(":"))
+    t = h * 60 + m + minutes
+    return f"{t // 60:02d}:{t % 60:02d}"
+
+
+def synth_offerings(n_courses: int = 300, sections_per_course: int = 10, seed: int = 0, full_ratio: float = 0.3) -> Dict:
+    rnd = random.Random(seed)
+    sections = {}
+    crn = 10000
+    for i in range(n_courses):
+        secs = []
+        for _ in range(sections_per_course):
+            days = rnd.choice(DAY_PATTERNS)
+            start = rnd.choice(START_TIMES)
+            cap = rnd.choice([25, 30, 40, 60])
+            enrolled = cap if rnd.random() < full_ratio else rnd.randint(0, cap - 1)
+            secs.append({"crn": str(crn), "days": days, "start": start,
+                         "end": _end(start, 50 if len(days) == 3 else 75), "cap": cap, "enrolled": enrolled})
+            crn += 1
+        sections[f"SYN{i:04d}"] = secs
+    return {"term": "2026S", "sections": sections}
+
+
+def synth_program(n_courses: int = 400, depth: int = 12, n_requirements: int = 30, seed: int = 0) -> Dict:
+    """A raw catalog program with `depth`-long prereq chains running through it.
+
+    Courses are laid out in `depth` levels; each course above level 0 needs one to three
+    courses from the level below, so the longest chain is exactly `depth` courses.
+    """
+    rnd = random.Random(seed)
+    codes = [f"SYN{i:04d}" for i in range(n_courses)]
+    levels = [codes[i::depth] for i in range(depth)]
+    prereqs = {}
+    for lvl in range(1, depth):
+        for i, c in enumerate(levels[lvl]):
+            below = levels[lvl - 1]
+            prereqs[c] = sorted({below[i % len(below)], *rnd.sample(below, min(len(below), rnd.randint(0, 2)))})
+    areas = ["math", "science", "humanities", None, None]
+    course_meta = {c: {"credits": rnd.choice([3, 3, 3, 4, 1]), **({"area": a} if (a := rnd.choice(areas)) else {})}
+                   for c in codes}
+    shuffled = codes[:]
+    rnd.shuffle(shuffled)
+    requirements, at = [], 0
+    for j in range(n_requirements):
+        size = rnd.randint(3, 12)
+        pool = shuffled[at:at + size] or rnd.sample(codes, size)
+        at += size
+        if j % 3 == 2:
+            requirements.append({"id": f"choose_{j}", "type": "choose_n", "n": max(1, size // 3), "from": pool})
+        else:
+            requirements.append({"id": f"core_{j}", "type": "all_of", "courses": pool})
+    requirements += [{"id": f"credits_{a}", "type": "credits_at_least", "area": a, "credits": 12}
+                     for a in areas if a]
+    return {"name": "Synthetic", "total_credits": 120, "requirements": requirements,
+            "prereqs": prereqs, "course_meta": course_meta}
+
+
+def synth_cohort(program: Dict, n_students: int = 1000, seed: int = 0, max_taken: int = 40) -> List[Dict]:
+    """Transcripts that respect prereqs: each student takes up to `max_taken` courses whose prereqs they have."""
+    rnd = random.Random(seed)
+    codes = list(program["course_meta"])
+    prereqs = program.get("prereqs", {})
+    cohort = []
+    for s in range(n_students):
+        target, taken = rnd.randint(0, max_taken), set()
+        while len(taken) < target:
+            ready = [c for c in codes if c not in taken and all(p in taken for p in prereqs.get(c, ()))]
+            if not ready:
+                break
+            taken.update(rnd.sample(ready, min(len(ready), target - len(taken), 8)))
+        cohort.append({"student": {"id": f"Z{s:08d}", "name": f"Student {s}"}, "transfer_credits": 0,
+                       "taken": [{"code": c, "term": "2218", "grade": rnd.choice(["A", "B", "C", "IP"]),
+                                  "credits": float(program["course_meta"][c]["credits"])} for c in sorted(taken)]})
+    return cohort
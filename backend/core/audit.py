@@ -1,41 +1,56 @@
 from typing import Dict, List, Set
+from .catalog import Program, as_program
+from .metrics import timed
+from .records import as_transcript
 def build_completed_set(transcript) -> Set[str]:
-    return {t["code"] for t in transcript["taken"]}
-def audit_program(transcript: Dict, program: Dict):
-    completed = build_completed_set(transcript)
-    reqs = program["requirements"]
+    return as_transcript(transcript).completed
+def area_credits(transcript, program: Program) -> Dict[str, int]:
+    """Credits earned per course_meta area, in one pass over the transcript."""
+    earned: Dict[str, int] = {}
+    for code in as_transcript(transcript).codes:
+        i = program.index.get(code)
+        if i is not None and program.area[i] is not None:
+            earned[program.area[i]] = earned.get(program.area[i], 0) + program.credits[i]
+    return earned
+def evaluate_requirement(r, completed: Set[str], earned_by_area: Dict[str, int]) -> Dict:
+    if r.type == "all_of":
+        missing = [c for c in r.pool if c not in completed]
+        return {
+            "id": r.id,
+            "type": "all_of",
+            "met": len(missing) == 0,
+            "details": {"missing": missing, "courses": list(r.pool)}
+        }
+    if r.type == "choose_n":
+        done = [c for c in r.pool if c in completed]
+        need = max(0, r.n - len(done))
+        return {
+            "id": r.id,
+            "type": "choose_n",
+            "met": need == 0,
+            "details": {"need": need, "done": done, "pool": list(r.pool)}
+        }
+    if r.type == "credits_at_least":
+        earned = earned_by_area.get(r.area, 0)
+        need = max(0, r.credits - earned)
+        return {
+            "id": r.id,
+            "type": "credits_at_least",
+            "met": need == 0,
+            "details": {"earned": earned, "need": need, "area": r.area}
+        }
+    return None
+@timed("audit")
+def audit_program(transcript, program):
+    program = as_program(program)
+    transcript = as_transcript(transcript)
+    completed = transcript.completed
+    earned = area_credits(transcript, program)
     results = []
-    for r in reqs:
-        if r["type"] == "all_of":
-            missing = [c for c in r["courses"] if c not in completed]
-            results.append({
-                "id": r.get("id", "+".join(r.get("courses", []))),
-                "type": "all_of",
-                "met": len(missing) == 0,
-                "details": {"missing": missing, "courses": r["courses"]}
-            })
-        elif r["type"] == "choose_n":
-            done = [c for c in r["from"] if c in completed]
-            need = max(0, r["n"] - len(done))
-            results.append({
-                "id": r.get("id", "choose_n"),
-                "type": "choose_n",
-                "met": need == 0,
-                "details": {"need": need, "done": done, "pool": r["from"]}
-            })
-        elif r["type"] == "credits_at_least":
-            earned = 0
-            for t in transcript["taken"]:
-                code = t["code"]
-                if program["course_meta"].get(code, {}).get("area") == r["area"]:
-                    earned += program["course_meta"][code]["credits"]
-            need = max(0, r["credits"] - earned)
-            results.append({
-                "id": r.get("id", f"credits_{r['area']}"),
-                "type": "credits_at_least",
-                "met": need == 0,
-                "details": {"earned": earned, "need": need, "area": r["area"]}
-            })
+    for r in program.requirements:
+        res = evaluate_requirement(r, completed, earned)
+        if res is not None:
+            results.append(res)
     return results
 
 
@@ -0,0 +1,83 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+from .audit import area_credits
+from .catalog import Program, as_program
+from .records import as_transcript
+
+# Cohort audits: each transcript becomes one int bitset over the program's course index,
+# so `all_of` / `choose_n` checks are a single AND against the requirement mask.
+# Students in the same cohort mostly share requirement states, so the per-requirement
+# detail lists are memoized on the masked bits and rebuilt only for unseen states.
+MEMO_LIMIT = 4096
+
+
+class BatchAuditor:
+    def __init__(self, program: Program):
+        self.program = as_program(program)
+        self._bits = [tuple((c, 1 << self.program.index[c]) for c in r.pool) for r in self.program.requirements]
+        self._memo: List[Dict[int, Tuple]] = [{} for _ in self.program.requirements]
+
+    def encode(self, transcript) -> Tuple[int, Dict[str, int]]:
+        transcript = as_transcript(transcript)
+        return transcript.mask(self.program), area_credits(transcript, self.program)
+
+    def _split(self, pos: int, hit: int) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        memo = self._memo[pos]
+        res = memo.get(hit)
+        if res is None:
+            if len(memo) >= MEMO_LIMIT:
+                memo.clear()
+            bits = self._bits[pos]
+            res = (tuple(c for c, b in bits if hit & b), tuple(c for c, b in bits if not hit & b))
+            memo[hit] = res
+        return res
+
+    def audit(self, transcript) -> List[Dict]:
+        mask, earned_by_area = self.encode(transcript)
+        results = []
+        for r, m in zip(self.program.requirements, self.program.req_masks):
+            if r.type == "all_of":
+                hit = mask & m
+                missing = [] if hit == m else list(self._split(r.pos, hit)[1])
+                results.append({
+                    "id": r.id,
+                    "type": "all_of",
+                    "met": not missing,
+                    "details": {"missing": missing, "courses": list(r.pool)}
+                })
+            elif r.type == "choose_n":
+                hit = mask & m
+                done = self._split(r.pos, hit)[0] if hit else ()
+                need = max(0, r.n - len(done))
+                results.append({
+                    "id": r.id,
+                    "type": "choose_n",
+                    "met": need == 0,
+                    "details": {"need": need, "done": list(done), "pool": list(r.pool)}
+                })
+            elif r.type == "credits_at_least":
+                earned = earned_by_area.get(r.area, 0)
+                need = max(0, r.credits - earned)
+                results.append({
+                    "id": r.id,
+                    "type": "credits_at_least",
+                    "met": need == 0,
+                    "details": {"earned": earned, "need": need, "area": r.area}
+                })
+        return results
+
+
+def audit_batch(transcripts: Iterable[Dict], program, chunk_size: int = 500) -> Iterator[List[List[Dict]]]:
+    """Audit a cohort, yielding results in chunks of `chunk_size` transcripts.
+
+    Output per transcript is identical to `audit_program`. `transcripts` can be any
+    iterable (e.g. a file reader), so memory stays flat for large cohorts.
+    """
+    auditor = BatchAuditor(program)
+    chunk: List[List[Dict]] = []
+    for t in transcripts:
+        chunk.append(auditor.audit(t))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,171 @@
+import asyncio, hashlib, os, sqlite3, threading, time, weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+
+def content_key(*parts: Any) -> str:
+    """SHA-256 over a canonical JSON encoding of `parts` (dict keys sorted)."""
+    return hashlib.sha256(orjson.dumps(parts, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+_instances: "weakref.WeakSet[TieredCache]" = weakref.WeakSet()
+
+
+def all_caches() -> List["TieredCache"]:
+    """Live caches, for metrics."""
+    return sorted(_instances, key=lambda c: c.name)
+
+
+class TieredCache:
+    """In-memory LRU in front of an optional SQLite table, both with a TTL.
+
+    Values must be orjson-serializable. The memory tier is capped by entry count, the
+    disk tier by total stored bytes (least recently used rows go first). get/set block on
+    SQLite; from the event loop use aget/aset, which only touch memory inline and run the
+    disk tier in a worker thread. The two tiers have separate locks, so a memory hit never
+    waits behind disk I/O.
+
+    stats: memory_hits, disk_hits, misses, memory_evictions (LRU, count cap), disk_evictions
+    (LRU, size cap) and expired (TTL, either tier).
+    """
+
+    def __init__(self, name: str, path: Optional[str] = None, max_items: int = 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024, ttl: float = 7 * 24 * 3600):
+        self.name = name
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.stats: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                                      "memory_evictions": 0, "disk_evictions": 0, "expired": 0}
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self._disk_bytes = 0
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, created REAL, used REAL, size INTEGER)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_used ON cache(used)")
+            self._purge_expired(time.time())
+        self._writes = 0
+        _instances.add(self)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        return value if value is not None else self._get_disk(key, now)
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        self._remember(key, now, value)
+        if self._db is not None:
+            self._set_disk(key, now, value)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() for event-loop callers."""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is not None or self._db is None:
+            return value if value is not None else self._get_disk(key, now)
+        return await asyncio.to_thread(self._get_disk, key, now)
+
+    async def aset(self, key: str, value: Any):
+        """set() for event-loop callers."""
+        now = time.time()
+        self._remember(key, now, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_disk, key, now, value)
+
+    def _get_memory(self, key: str, now: float) -> Optional[Any]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is None:
+                return None
+            created, value = hit
+            if now - created <= self.ttl:
+                self._mem.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._mem[key]
+            self.stats["expired"] += 1
+            return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[Any]:
+        """The SQLite tier (a memory miss); counts the miss when it has nothing either."""
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._count("expired")
+                    row = None
+                elif row is not None:
+                    self._db.execute("UPDATE cache SET used = ? WHERE key = ?", (now, key))
+            if row is not None:
+                value = orjson.loads(row[0])
+                self._remember(key, row[1], value)
+                self._count("disk_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def _count(self, stat: str, n: int = 1):
+        # Stats only change under the memory lock (taken after _db_lock, never before it).
+        with self._lock:
+            self.stats[stat] += n
+
+    def _set_disk(self, key: str, now: float, value: Any):
+        blob = orjson.dumps(value)
+        with self._db_lock:
+            old = self._db.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)", (key, blob, now, now, len(blob)))
+            self._disk_bytes += len(blob) - (old[0] if old else 0)
+            self._writes += 1
+            if self._writes % 256 == 0:
+                self._purge_expired(now)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _remember(self, key: str, created: float, value: Any):
+        with self._lock:
+            self._mem[key] = (created, value)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_items:
+                self._mem.popitem(last=False)
+                self.stats["memory_evictions"] += 1
+
+    def _purge_expired(self, now: float):
+        """Caller holds _db_lock (or is __init__)."""
+        self._count("expired", self._db.execute("DELETE FROM cache WHERE created < ?", (now - self.ttl,)).rowcount)
+        self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def _evict_disk(self):
+        # Drop least recently used rows until we're back under ~90% of the cap. Caller holds _db_lock.
+        excess = self._disk_bytes - int(self.max_disk_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM cache ORDER BY used"):
+            victims.append((key,)); freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM cache WHERE key = ?", victims)
+        self._disk_bytes -= freed
+        self._count("disk_evictions", len(victims))
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM cache")
+                self._disk_bytes = 0
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
@@ -0,0 +1,241 @@
+import os, sys, threading, time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from .utils import DATA_DIR, load_json
+
+# Courses missing from course_meta are treated like a regular 3-credit class,
+# which is what the advising prompt assumes as well.
+DEFAULT_CREDITS = 3
+
+
+class Requirement:
+    """One compiled requirement; `pool` keeps catalog order, `pool_set` is for membership tests."""
+    __slots__ = ("pos", "id", "type", "label", "pool", "pool_set", "n", "area", "credits")
+
+    def __init__(self, pos: int, raw: Dict):
+        self.pos = pos
+        self.type = raw["type"]
+        self.label = raw.get("label")
+        self.n = raw.get("n", 0)
+        self.area = raw.get("area")
+        self.credits = raw.get("credits", 0)
+        if self.type == "all_of":
+            pool = raw["courses"]
+            self.id = raw.get("id", "+".join(pool))
+        elif self.type == "choose_n":
+            pool = raw["from"]
+            self.id = raw.get("id", "choose_n")
+        else:
+            pool = []
+            self.id = raw.get("id", f"credits_{self.area}")
+        self.pool: Tuple[str, ...] = tuple(sys.intern(c) for c in pool)
+        self.pool_set: FrozenSet[str] = frozenset(self.pool)
+
+
+class Program:
+    """A catalog program compiled once into lookup-friendly indexes.
+
+    Every course code the program mentions (requirements, prereqs, course_meta) gets a
+    small integer index; `credits` and `area` are parallel arrays over that index.
+    """
+    __slots__ = ("id", "name", "total_credits", "raw", "requirements", "codes", "index",
+                 "credits", "area", "meta", "prereqs", "prereq_idx", "dependents_idx", "topo", "prereq_closure",
+                 "requirements_by_course", "req_masks")
+
+    def __init__(self, program_id: Optional[str], raw: Dict):
+        self.id = program_id
+        self.raw = raw
+        self.name = raw.get("name", program_id)
+        self.total_credits = raw.get("total_credits", 0)
+        self.meta: Dict[str, Dict] = raw.get("course_meta", {})
+        self.requirements: Tuple[Requirement, ...] = tuple(
+            Requirement(i, r) for i, r in enumerate(raw.get("requirements", [])))
+
+        codes: List[str] = []
+        index: Dict[str, int] = {}
+        def add(code: str) -> int:
+            code = sys.intern(code)
+            if code not in index:
+                index[code] = len(codes); codes.append(code)
+            return index[code]
+        for r in self.requirements:
+            for c in r.pool:
+                add(c)
+        raw_prereqs = raw.get("prereqs", {})
+        for c, ps in raw_prereqs.items():
+            add(c)
+            for p in ps:
+                add(p)
+        for c in self.meta:
+            add(c)
+        self.codes: Tuple[str, ...] = tuple(codes)
+        self.index = index
+        self.credits: List[int] = [self.meta[c]["credits"] if c in self.meta else DEFAULT_CREDITS for c in codes]
+        self.area: List[Optional[str]] = [self.meta.get(c, {}).get("area") for c in codes]
+
+        self.prereqs: Dict[str, Tuple[str, ...]] = {
+            sys.intern(c): tuple(sys.intern(p) for p in ps) for c, ps in raw_prereqs.items()}
+        self.prereq_idx: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(index[p] for p in self.prereqs.get(c, ())) for c in codes)
+
+        dependents: List[List[int]] = [[] for _ in codes]
+        for i, ps in enumerate(self.prereq_idx):
+            for p in ps:
+                dependents[p].append(i)
+        self.dependents_idx: Tuple[Tuple[int, ...], ...] = tuple(tuple(d) for d in dependents)
+        self.topo, self.prereq_closure = self._toposort()
+
+        by_course: Dict[str, List[int]] = {}
+        for r in self.requirements:
+            if r.type == "credits_at_least":
+                members = [c for c, a in zip(codes, self.area) if a == r.area]
+            else:
+                members = r.pool
+            for c in members:
+                by_course.setdefault(c, []).append(r.pos)
+        self.requirements_by_course: Dict[str, Tuple[int, ...]] = {c: tuple(v) for c, v in by_course.items()}
+        self.req_masks: Tuple[int, ...] = tuple(self.mask(r.pool) for r in self.requirements)
+
+    def _toposort(self) -> Tuple[Tuple[int, ...], List[int]]:
+        """Kahn order over the prereq graph plus each course's transitive prereq bitset.
+
+        Courses on a prereq cycle can never become eligible; they go last in the order
+        with whatever closure their acyclic prereqs give them.
+        """
+        n = len(self.codes)
+        pending = [len(ps) for ps in self.prereq_idx]
+        order = [i for i in range(n) if pending[i] == 0]
+        closure = [0] * n
+        for i in order:
+            for d in self.dependents_idx[i]:
+                closure[d] |= closure[i] | (1 << i)
+                pending[d] -= 1
+                if pending[d] == 0:
+                    order.append(d)
+        if len(order) < n:
+            seen = set(order)
+            order.extend(i for i in range(n) if i not in seen)
+        return tuple(order), closure
+
+    def mask(self, codes) -> int:
+        """Bitset over the course index; codes the program doesn't know are ignored."""
+        m = 0
+        for c in codes:
+            i = self.index.get(c)
+            if i is not None:
+                m |= 1 << i
+        return m
+
+    def credit(self, code: str) -> int:
+        i = self.index.get(code)
+        return self.credits[i] if i is not None else DEFAULT_CREDITS
+
+
+def as_program(program) -> Program:
+    """Accept either a compiled Program or a raw catalog dict (compiled ad hoc)."""
+    return program if isinstance(program, Program) else Program(None, program)
+
+
+class CatalogSnapshot:
+    __slots__ = ("programs", "version", "credits_map")
+
+    def __init__(self, raw: Dict, version, programs: Optional[Dict[str, Program]] = None):
+        if programs is None:
+            programs = {pid: Program(pid, p) for pid, p in raw.get("programs", {}).items()}
+        self.programs: Dict[str, Program] = programs
+        self.version = version
+        credits_map: Dict[str, int] = {}
+        for prog in self.programs.values():
+            for code, meta in prog.meta.items():
+                credits_map[code.upper().strip()] = meta.get("credits")
+        self.credits_map = credits_map
+
+
+class CatalogStore:
+    """Holds the compiled catalog and swaps in a fresh snapshot when the file changes on disk.
+
+    Readers should grab `snapshot()` once per request; a reload replaces the whole snapshot
+    in a single assignment, so a request never sees half-old, half-new programs.
+
+    With `exports_dir`, the spreadsheet exports there are served too (see catalog_compiler):
+    programs come from the precompiled `artifact` while it matches the sources, otherwise
+    they are compiled and the artifact rewritten. Exports the compiler reports errors for
+    are not served.
+    """
+
+    def __init__(self, path: str = "catalog.json", check_interval: float = 2.0,
+                 exports_dir: Optional[str] = None, artifact: Optional[str] = None):
+        self.path = path if os.path.isabs(path) else os.path.join(DATA_DIR, path)
+        self.check_interval = check_interval
+        self.exports_dir = exports_dir
+        self.artifact = artifact
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._snapshot = self._load()
+
+    def _stat(self):
+        if self.exports_dir:
+            from .catalog_compiler import fingerprint
+            return fingerprint(self.path, self.exports_dir)
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> CatalogSnapshot:
+        version = self._stat()
+        if not self.exports_dir:
+            return CatalogSnapshot(load_json(self.path), version)
+        from . import catalog_compiler as cc
+        programs = cc.load_artifact(self.artifact, version) if self.artifact else None
+        if programs is None:
+            catalog, _ = cc.compile_catalog(self.path, self.exports_dir, skip_errors=True)
+            programs = {pid: Program(pid, p) for pid, p in catalog["programs"].items()}
+            if self.artifact:
+                try:
+                    cc.write_artifact(self.artifact, programs, version)
+                except OSError:
+                    pass  # read-only deploy: compile in memory on each start
+        return CatalogSnapshot({}, version, programs)
+
+    def snapshot(self) -> CatalogSnapshot:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._maybe_reload()
+        return self._snapshot
+
+    def _maybe_reload(self):
+        try:
+            version = self._stat()
+        except OSError:
+            return
+        if version == self._snapshot.version:
+            return
+        with self._lock:
+            if version == self._snapshot.version:
+                return
+            try:
+                self._snapshot = self._load()
+            except (OSError, ValueError):
+                # Half-written file: keep serving the previous snapshot and retry later.
+                pass
+
+    @property
+    def programs(self) -> Dict[str, Program]:
+        return self.snapshot().programs
+
+    @property
+    def default_program_id(self) -> str:
+        return next(iter(self.programs))
+
+    def get(self, program_id: str) -> Program:
+        return self.programs[program_id]
+
+
+_store: Optional[CatalogStore] = None
+
+def get_catalog() -> CatalogStore:
+    global _store
+    if _store is None:
+        from .catalog_compiler import ARTIFACT_PATH, EXPORTS_DIR
+        exports = EXPORTS_DIR if os.path.isdir(EXPORTS_DIR) else None
+        _store = CatalogStore(exports_dir=exports, artifact=ARTIFACT_PATH)
+    return _store
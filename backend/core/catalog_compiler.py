@@ -0,0 +1,346 @@
+"""Compile the spreadsheet-exported program catalogs into the backend `programs` schema.
+
+    cd backend && python -m core.catalog_compiler [--strict] [--json out.json]
+
+Reads data/catalog.json (hand-maintained programs, kept as they are) plus every export in
+frontend/src/data, checks each program's prereq graph, and writes data/catalog.pkl: the
+compiled Program objects with their indexes already built. CatalogStore loads that file
+at startup and recompiles it when any source file changes. Sheet noise the compiler can
+repair locally (a malformed code drops that row or edge, a self-listed prereq is dropped) is
+a warning. Errors (a prereq cycle, where which edge is wrong is a guess) keep the program out
+of the artifact until the export is fixed, and make --strict exit 1.
+"""
+import glob, os, pickle, re, sys
+from typing import Dict, List, Optional, Tuple
+from .catalog import DEFAULT_CREDITS, Program
+from .utils import DATA_DIR, load_json
+
+EXPORTS_DIR = os.getenv("CATALOG_EXPORTS_DIR", os.path.join(DATA_DIR, "..", "..", "frontend", "src", "data"))
+ARTIFACT_PATH = os.getenv("CATALOG_ARTIFACT", os.path.join(DATA_DIR, "catalog.pkl"))
+ARTIFACT_VERSION = 3
+
+# Exports that duplicate a hand-maintained program in catalog.json.
+ALIASES = {"BSComputerScience": "BS_CS"}
+NAMES = {
+    "BAComputerScience": "B.A. Computer Science",
+    "BSCivil": "B.S. Civil Engineering",
+    "BSComputerE": "B.S. Computer Engineering",
+    "BSDataScience&A": "B.S. Data Science and Analytics",
+    "BSElectrical": "B.S. Electrical Engineering",
+    "BSEnvironmental": "B.S. Environmental Engineering",
+    "BSGeomatics": "B.S. Geomatics Engineering",
+    "BSMechanical": "B.S. Mechanical Engineering",
+    "BSOceanEngineering": "B.S. Ocean Engineering",
+}
+COLUMNS = ("code", "name", "credits", "prereqs", "coreqs", "type", "availability", "group", "category", "notes")
+
+CODE = re.compile(r"[A-Z]{3}\d{4}[A-Z]?")
+CODEISH = re.compile(r"[A-Z]{2,4}\s*\d{3,5}[A-Z]?")
+TOKEN = re.compile(r"\(|\)|\bAND\b|\bOR\b|" + CODEISH.pattern)
+STANDING = re.compile(r"\b(junior|senior)\s+standing\b", re.I)
+CHOOSE = re.compile(r"choose\s+(\d+)", re.I)
+COUNT = re.compile(r"\b(\d+)\s+([a-z &/-]*?)(semi-core|electives?)\b", re.I)
+
+
+def norm_code(text: str) -> str:
+    return re.sub(r"\s+", "", text.strip().upper())
+
+
+def _credits(value) -> Optional[int]:
+    m = re.match(r"\d+", str(value).strip()) if value is not None else None
+    return int(m.group()) if m else None
+
+
+def read_export(path: str) -> List[Dict]:
+    """Rows of one export as dicts keyed by COLUMNS (the pandas header row is dropped)."""
+    rows = load_json(os.path.abspath(path))
+    if rows and "code" in rows[0]:
+        # Older export shape: code, name, credits, category, type ("Required" / "Choose N").
+        return [{"code": r.get("code"), "name": r.get("name"), "credits": r.get("credits"),
+                 "type": r.get("category") if r.get("type") == "Required" else f"{r.get('category')} Elective",
+                 "notes": r.get("type") if str(r.get("type", "")).startswith("Choose") else None} for r in rows]
+    return [dict(zip(COLUMNS, (r.get(f"Unnamed: {i}") for i in range(len(COLUMNS))))) for r in rows[1:]]
+
+
+def parse_prereqs(text: Optional[str]) -> Tuple[List[List[str]], str]:
+    """Prereq string -> alternatives (OR of ANDs, AND binds tighter) and any text that isn't a code."""
+    if not text or not text.strip():
+        return [], ""
+    tokens = [t.upper() if t in ("(", ")") or t.upper() in ("AND", "OR") else norm_code(t)
+              for t in TOKEN.findall(text)]
+    leftover = " ".join(TOKEN.sub(" ", text).split())
+    pos = 0
+
+    def expr() -> List[List[str]]:
+        nonlocal pos
+        alts = term()
+        while pos < len(tokens) and tokens[pos] == "OR":
+            pos += 1
+            alts = alts + term()
+        return alts
+
+    def term() -> List[List[str]]:
+        nonlocal pos
+        alts = factor()
+        while pos < len(tokens) and tokens[pos] == "AND":
+            pos += 1
+            right = factor()
+            alts = [a + b for a in alts for b in right] if alts and right else alts or right
+        return alts
+
+    def factor() -> List[List[str]]:
+        nonlocal pos
+        if pos >= len(tokens):
+            return []
+        tok = tokens[pos]
+        pos += 1
+        if tok == "(":
+            alts = expr()
+            if pos < len(tokens) and tokens[pos] == ")":
+                pos += 1
+            return alts
+        if tok in ("AND", "OR", ")"):
+            return []
+        return [[tok]]
+
+    alts = []
+    while pos < len(tokens):
+        alts += expr()
+        pos += 1  # skip a stray ")" or operator and keep going
+    return [list(dict.fromkeys(a)) for a in alts], leftover
+
+
+def _choose_counts(rows: List[Dict]) -> Dict[str, int]:
+    """Counts from free-text notes like "3 computer engineering electives & 1 ... semi-core"."""
+    counts: Dict[str, int] = {}
+    for r in rows:
+        for n, words, kind in COUNT.findall(r.get("notes") or ""):
+            if "technical" in words.lower():
+                continue  # technical electives are placeholder credit rows, not a course pool
+            key = "Semi-Core" if kind.lower() == "semi-core" else "Elective"
+            counts[key] = counts.get(key, 0) + int(n)
+    return counts
+
+
+def compile_export(program_id: str, rows: List[Dict]) -> Tuple[Dict, Dict[str, List[str]]]:
+    """One export -> (raw program in the catalog.json schema, {"errors", "warnings"})."""
+    errors: List[str] = []
+    warnings: List[str] = []
+    meta: Dict[str, Dict] = {}
+    groups: Dict[str, List[str]] = {}
+    placeholders = []
+    prereq_text: Dict[str, str] = {}
+    for r in rows:
+        raw_code = (r.get("code") or "").strip()
+        code = norm_code(raw_code)
+        credits = _credits(r.get("credits"))
+        if not CODE.fullmatch(code):
+            if CODEISH.fullmatch(code):
+                warnings.append(f"malformed course code {raw_code!r}; row dropped")
+            elif credits:
+                label = raw_code or (r.get("name") or "").strip()
+                placeholders.append({"label": label, "credits": credits, "type": r.get("type")})
+                warnings.append(f"placeholder row {label!r} ({credits} credits) is not a course; kept as a note")
+            continue
+        if code in meta:
+            warnings.append(f"duplicate row for {code}; first one kept")
+            continue
+        if credits is None:
+            warnings.append(f"{code} has no credits; assuming {DEFAULT_CREDITS}")
+        m = {"credits": credits or DEFAULT_CREDITS, "name": (r.get("name") or "").strip() or None}
+        for key in ("category", "availability", "group", "notes"):
+            if r.get(key):
+                m[key] = r[key].strip() if isinstance(r[key], str) else r[key]
+        meta[code] = {k: v for k, v in m.items() if v is not None}
+        if r.get("prereqs"):
+            prereq_text[code] = r["prereqs"]
+        coreqs = list(dict.fromkeys(c for alt in parse_prereqs(r.get("coreqs"))[0] for c in alt))
+        warnings += [f"{code}: malformed coreq code {c!r}; dropped" for c in coreqs if not CODE.fullmatch(c)]
+        coreqs = [c for c in coreqs if CODE.fullmatch(c)]
+        if coreqs:
+            meta[code]["coreqs"] = coreqs
+        kind = r.get("type") or ("Core" if credits else None)
+        if kind:
+            groups.setdefault(kind.strip(), []).append(code)
+
+    prereqs: Dict[str, List[str]] = {}
+    for code, text in prereq_text.items():
+        alts, leftover = parse_prereqs(text)
+        if leftover:
+            if STANDING.search(leftover):
+                meta[code]["standing"] = leftover
+            else:
+                warnings.append(f"{code}: could not read prereq text {leftover!r}")
+        for c in sorted({c for a in alts for c in a}):
+            if not CODE.fullmatch(c):
+                warnings.append(f"{code}: malformed prereq code {c!r}; dropped")
+        alts = [[c for c in a if CODE.fullmatch(c)] for a in alts]
+        alts = [a for a in alts if a]
+        if not alts:
+            continue
+        if len(alts) > 1:
+            # The planner takes one AND-list; use the alternative this program lists most of.
+            meta[code]["prereq_any"] = alts
+        best = max(alts, key=lambda a: sum(c in meta for c in a))
+        if code in best:
+            warnings.append(f"{code} lists itself as a prereq; dropped")
+            best = [c for c in best if c != code]
+        if best:
+            prereqs[code] = best
+
+    counts = _choose_counts(rows)
+    requirements = []
+    for kind, pool in groups.items():
+        rid = re.sub(r"\W+", "_", kind).strip("_")
+        if "elective" in kind.lower() or kind.lower() == "semi-core":
+            notes = " ".join(meta[c].get("notes", "") for c in pool)
+            m = CHOOSE.search(notes)
+            n = int(m.group(1)) if m else counts.get("Semi-Core" if kind.lower() == "semi-core" else "Elective")
+            if n is None:
+                warnings.append(f"no course count found for {kind!r}; assuming 1")
+                n = 1
+            if n > len(pool):
+                warnings.append(f"{kind!r} asks for {n} of {len(pool)} listed courses; capped")
+                n = len(pool)
+            requirements.append({"id": rid, "label": kind, "type": "choose_n", "n": n, "from": pool})
+        else:
+            requirements.append({"id": rid, "label": kind, "type": "all_of", "courses": pool})
+
+    total = sum(meta[c]["credits"] for r in requirements if r["type"] == "all_of" for c in r["courses"])
+    total += sum(r["n"] * min(meta[c]["credits"] for c in r["from"]) for r in requirements if r["type"] == "choose_n")
+    total += sum(p["credits"] for p in placeholders)
+    program = {"name": NAMES.get(program_id, program_id), "total_credits": total,
+               "requirements": requirements, "prereqs": prereqs, "course_meta": meta}
+    if placeholders:
+        program["placeholders"] = placeholders
+    return program, {"errors": errors, "warnings": warnings}
+
+
+def check_graph(program: Dict) -> Dict[str, List[str]]:
+    """Unknown prereq codes (warnings) and prereq cycles (errors; the closing edge is dropped in place)."""
+    prereqs = program.setdefault("prereqs", {})
+    known = set(program.get("course_meta", {}))
+    warnings = sorted({f"{c} needs {p}, which this program doesn't list" for c, ps in prereqs.items()
+                       for p in ps if p not in known})
+    errors = []
+    state: Dict[str, int] = {}  # 1 = on the DFS stack, 2 = done
+    for start in sorted(prereqs):
+        stack = [(start, iter(list(prereqs.get(start, ()))))]
+        path = [start]
+        state[start] = state.get(start) or 1
+        if state[start] == 2:
+            continue
+        while stack:
+            node, it = stack[-1]
+            nxt = next(it, None)
+            if nxt is None:
+                state[node] = 2
+                stack.pop(); path.pop()
+            elif state.get(nxt) == 1:
+                cycle = path[path.index(nxt):] + [nxt]
+                errors.append("prereq cycle " + " -> ".join(cycle) + f"; dropped {node} -> {nxt}")
+                prereqs[node] = [p for p in prereqs[node] if p != nxt]
+            elif state.get(nxt) is None:
+                state[nxt] = 1
+                stack.append((nxt, iter(list(prereqs.get(nxt, ())))))
+                path.append(nxt)
+    return {"errors": errors, "warnings": warnings}
+
+
+def export_files(src_dir: str = EXPORTS_DIR) -> Dict[str, str]:
+    """{program_id: path} for every export, e.g. "catalog - BSCivil.json" -> "BSCivil"."""
+    out = {}
+    for path in sorted(glob.glob(os.path.join(src_dir, "*.json"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        out[re.sub(r"^catalog\s*-\s*", "", name).strip()] = path
+    return out
+
+
+def compile_catalog(base_path: str = "catalog.json", src_dir: str = EXPORTS_DIR,
+                    skip_errors: bool = False) -> Tuple[Dict, Dict]:
+    """catalog.json programs followed by the compiled exports, and a report per program.
+    With `skip_errors`, exports with errors are only in the report (catalog.json is kept as is)."""
+    catalog = load_json(base_path)
+    programs = dict(catalog.get("programs", {}))
+    report: Dict[str, Dict[str, List[str]]] = {}
+    for pid in programs:
+        report[pid] = check_graph(programs[pid])
+    for pid, path in export_files(src_dir).items():
+        if ALIASES.get(pid) in programs or pid in programs:
+            continue
+        programs[pid], report[pid] = compile_export(pid, read_export(path))
+        graph = check_graph(programs[pid])
+        report[pid]["errors"] += graph["errors"]
+        report[pid]["warnings"] += graph["warnings"]
+        if skip_errors and report[pid]["errors"]:
+            del programs[pid]
+    return {**catalog, "programs": programs}, report
+
+
+def fingerprint(base_path: str, src_dir: str) -> Tuple:
+    """Stat-based identity of every source file; any edit (or added export) changes it."""
+    paths = [base_path if os.path.isabs(base_path) else os.path.join(DATA_DIR, base_path)]
+    paths += list(export_files(src_dir).values())
+    out = []
+    for p in paths:
+        st = os.stat(p)
+        out.append((os.path.basename(p), st.st_mtime_ns, st.st_size))
+    return (ARTIFACT_VERSION, tuple(out))
+
+
+def write_artifact(path: str, programs: Dict[str, Program], version: Tuple):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": version, "programs": programs}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_artifact(path: str, version: Tuple) -> Optional[Dict[str, Program]]:
+    """Compiled programs if the artifact matches `version`. The file is only ever written by us."""
+    try:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    return data["programs"] if data.get("version") == version else None
+
+
+def build(base_path: str = "catalog.json", src_dir: str = EXPORTS_DIR, artifact: str = ARTIFACT_PATH):
+    """Compile, write the artifact (without the exports that have errors), and return
+    (programs, version, report)."""
+    version = fingerprint(base_path, src_dir)
+    catalog, report = compile_catalog(base_path, src_dir, skip_errors=True)
+    programs = {pid: Program(pid, p) for pid, p in catalog["programs"].items()}
+    write_artifact(artifact, programs, version)
+    return programs, version, report
+
+
+def main(argv: List[str]) -> int:
+    import argparse, json
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--src", default=EXPORTS_DIR, help="directory with the exported catalog JSON files")
+    ap.add_argument("--base", default="catalog.json", help="hand-maintained catalog (relative to backend/data)")
+    ap.add_argument("--out", default=ARTIFACT_PATH, help="artifact to write")
+    ap.add_argument("--json", help="also write the compiled catalog as JSON here")
+    ap.add_argument("--strict", action="store_true", help="exit 1 if any program has errors")
+    args = ap.parse_args(argv)
+
+    programs, _, report = build(args.base, args.src, args.out)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"programs": {pid: p.raw for pid, p in programs.items()}}, f, indent=2)
+    for pid, r in report.items():
+        p = programs.get(pid)
+        shape = f"{len(p.requirements):>2} requirements {len(p.codes):>3} courses" if p else "skipped" + " " * 24
+        print(f"{pid:<20} {shape} {len(r['errors'])} errors {len(r['warnings'])} warnings")
+        for e in r["errors"]:
+            print(f"    error: {e}")
+        for w in r["warnings"]:
+            print(f"    warning: {w}")
+    print(f"wrote {args.out}")
+    return 1 if args.strict and any(r["errors"] for r in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
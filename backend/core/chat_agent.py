@@ -1,9 +1,12 @@
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 
 from .audit import audit_program
-from .planner import greedy_plan
-from .llm import client, MODEL
+from .planner import credit_limit, greedy_plan
+from .plan_search import search_plans
+from .catalog import Program, as_program
+from .llm import complete, stream_complete
+from .context_builder import build_messages, snapshot
 
 SYSTEM_PROMPT = """
 You are an academic advising assistant for engineering students.
@@ -31,58 +34,36 @@ Rules:
 - Because EGN4952C has to be taken if EGN4950C has been taken or is in progress, if EGN4952C is in the list of missing classes, always suggest it for Term 1 in the plan and proposed schedule. You cannot suggest the student to skip a term and take it later, it must be taken in the closest term possible.
 """
 
-def build_context_blocks(
+def prepare_chat(
     transcript: Dict[str, Any],
-    program: Dict[str, Any],
-    audit: List[Dict[str, Any]],
-    planned_terms: List[Dict[str, Any]],
-) -> str:
-    """Pack core engine outputs into a short text block for the LLM."""
-    return (
-        "CATALOG_PROGRAM_JSON:\n```"
-        + json.dumps(
-            {
-                "total_credits": program["total_credits"],
-                "requirements": program["requirements"],
-                "prereqs": program.get("prereqs", {}),
-            },
-            indent=2,
-        )
-        + "```\n\n"
-        "TRANSCRIPT_JSON:\n```"
-        + json.dumps(transcript, indent=2)
-        + "```\n\n"
-        "AUDIT_RESULTS_JSON:\n```"
-        + json.dumps(audit, indent=2)
-        + "```\n\n"
-        "PLANNED_TERMS_JSON:\n```"
-        + json.dumps(planned_terms, indent=2)
-        + "```"
-    )
-
-def chat_with_student(
-    transcript: Dict[str, Any],
-    program: Dict[str, Any],
+    program: Program,
     goals: str,
     preferences: Dict[str, Any],
     history: List[Dict[str, str]],
     term_sequence: list,
-    existing_plan: Optional[List[Dict[str, Any]]] = None # <--- 1. ADD THIS ARGUMENT
+    existing_plan: Optional[List[Dict[str, Any]]] = None, # <--- 1. ADD THIS ARGUMENT
+    context_state: Optional[Dict[str, Any]] = None,
+    context_budget: Optional[int] = None,
+    audit: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """
-    High-level agent:
-    - Runs the course/degree engine (audit + planner)
-    - Calls the LLM to have a conversation and explain recommendations
+    Engine half of the agent, shared by the blocking and streaming chat:
+    - Runs the course/degree engine (audit + planner), unless a session passes both in
+    - Returns either a ready `reply` (backend shortcut) or the LLM `messages` to send,
+      with the `context_state` to pass back next turn and estimated token `usage`
     """
 
     # Run core engine
-    audit = audit_program(transcript, program)
+    program = as_program(program)
+    if audit is None:
+        audit = audit_program(transcript, program)
     
     # 2. USE EXISTING PLAN IF PROVIDED, OTHERWISE GENERATE NEW
     if existing_plan:
         planned_terms = existing_plan
     else:
-        _, planned_terms = greedy_plan(transcript, program, term_sequence)
+        max_credits = credit_limit(preferences)
+        _, planned_terms = greedy_plan(transcript, program, term_sequence, max_credits, audit=audit)
 
     # SINGLE backend shortcut: If the latest user message asks about confirmed classes for a term,
     # return only the confirmed courses for that term (avoid running the LLM).
@@ -111,59 +92,106 @@ def chat_with_student(
                         "audit": audit,
                         "planned_terms": planned_terms,
                     }
-
-    # --- Proceed to build LLM context and normal conversation flow ---
-    # 3) Build context for the LLM
-    credit_summary = "Planned Credits Per Term:\n"
-    total_credits = 0
-    for term in planned_terms:
-        credit_summary += f"- {term['term']}: {term.get('credits', 0)} credits ({', '.join(term.get('courses', []))})\n"
-        total_credits += term.get('credits', 0)
-    credit_summary += f"Total Planned Credits: {total_credits}\n"
-
-    confirmed_courses_block = ""
-    if planned_terms and planned_terms[0].get('courses'):
-        confirmed_courses_block = (
-            "CONFIRMED_COURSES_FOR_NEXT_TERM:\n" +
-            "\n".join(f"- {c}" for c in planned_terms[0].get('courses', [])) +
-            "\n"
-        )
-
-    context = credit_summary + "\n" + confirmed_courses_block + build_context_blocks(transcript, program, audit, planned_terms)
-
-    # 3) Build message list (history + new context)
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-
-    # Inject context as an assistant-style note so the model can reference it
-    messages.append(
-        {
-            "role": "assistant",
-            "content": "Context for this student:\n" + context,
-        }
-    )
-
-    # Add prior chat history, if any
-    for msg in history:
-        if msg.get("role") in ("user", "assistant"):
-            messages.append({"role": msg["role"], "content": msg["content"]})
+            # Alternative plans come from the plan search, not from the LLM.
+            if re.search(r"\b(alternative|other|different)\s+(plans?|pathways?|options)\b", last_user["content"], re.IGNORECASE):
+                from .offerings import get_offerings
+                max_credits = credit_limit(preferences)
+                plans = search_plans(transcript, program, term_sequence, 3, max_credits,
+                                     get_offerings().snapshot(), audit=audit)["plans"]
+                return {
+                    "reply": _alternatives_reply(plans),
+                    "audit": audit,
+                    "planned_terms": planned_terms,
+                    "alternatives": plans,
+                }
 
     # Add the latest user query / goals summary
     user_text = (
         f"My goals/preferences: {goals}. "
-        f"Additional preferences JSON: {json.dumps(preferences)}. "
+        f"Additional preferences JSON: {json.dumps(preferences, separators=(',', ':'), sort_keys=True)}. "
         "Given the transcript + audit + planned terms in the context, "
         "help me understand what classes I still need and suggest a multi-semester plan. "
         "Explain *why* you chose each term's courses, and invite me to tweak things "
         "(like max credits, hard vs easy balance, summer usage, etc.)."
     )
-    messages.append({"role": "user", "content": user_text})
 
-    # 4) Call OpenAI
-    resp = client.chat.completions.create(model=MODEL, messages=messages)
-    reply = resp.choices[0].message.content.strip()
+    # Compact, prefix-stable prompt within the token budget (see core/context_builder.py)
+    messages, state, usage = build_messages(
+        SYSTEM_PROMPT, program, snapshot(transcript, audit, planned_terms), history, user_text,
+        context_state, context_budget,
+    )
 
     return {
-        "reply": reply,
+        "messages": messages,
         "audit": audit,
         "planned_terms": planned_terms,
-    }
\ No newline at end of file
+        "context_state": state,
+        "usage": usage,
+    }
+
+def _alternatives_reply(plans: List[Dict[str, Any]]) -> str:
+    if not plans or not plans[0]["planned_terms"]:
+        return "There is nothing left to plan: your remaining requirements are already covered."
+    lines = [f"Here are {len(plans)} plan option(s), best first:"]
+    for n, p in enumerate(plans, 1):
+        terms = "; ".join(f"{t['term']}: {', '.join(t['courses'])}" for t in p["planned_terms"])
+        notes = [f"{p['terms']} term(s)", f"{p['credits']} credits"]
+        if p["seat_issues"]:
+            notes.append("no open seats for " + ", ".join(f"{x['course']} ({x['term']})" for x in p["seat_issues"]))
+        if p["missing"]:
+            notes.append("still missing " + ", ".join(p["missing"]))
+        if p["electives_short"]:
+            notes.append(f"{p['electives_short']} elective(s) short")
+        lines.append(f"{n}. {terms} [{'; '.join(notes)}]")
+    return "\n".join(lines)
+
+async def chat_with_student(*args, **kwargs) -> Dict[str, Any]:
+    """
+    High-level agent:
+    - Runs the course/degree engine (audit + planner)
+    - Calls the LLM to have a conversation and explain recommendations
+    The engine half runs inline; async servers should run prepare_chat in a worker thread
+    and call answer_prepared instead.
+    """
+    return await answer_prepared(prepare_chat(*args, **kwargs))
+
+async def answer_prepared(prepared: Dict[str, Any]) -> Dict[str, Any]:
+    """The LLM half of chat_with_student, for the output of prepare_chat."""
+    if "reply" in prepared:
+        return prepared
+
+    # 4) Call OpenAI
+    # Conversations rarely repeat verbatim, so they skip the response cache.
+    reply = await complete(prepared["messages"], cache=False)
+
+    return {
+        "reply": reply,
+        "audit": prepared["audit"],
+        "planned_terms": prepared["planned_terms"],
+        "context_state": prepared["context_state"],
+        "usage": prepared["usage"],
+    }
+
+async def stream_chat_with_student(*args, **kwargs) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Same as chat_with_student, but yields (event, data) pairs as the reply is generated:
+    one "engine" event with audit + planned_terms (+ context_state and usage when the LLM
+    is called), then "token" deltas, then "done".
+    """
+    async for item in stream_prepared(prepare_chat(*args, **kwargs)):
+        yield item
+
+async def stream_prepared(prepared: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """The LLM half of stream_chat_with_student, for the output of prepare_chat."""
+    yield "engine", {k: prepared[k] for k in ("audit", "planned_terms", "alternatives", "context_state", "usage")
+                     if k in prepared}
+    if "reply" in prepared:
+        yield "token", {"text": prepared["reply"]}
+        yield "done", {"reply": prepared["reply"]}
+        return
+
+    parts = []
+    async for delta in stream_complete(prepared["messages"]):
+        parts.append(delta)
+        yield "token", {"text": delta}
+    yield "done", {"reply": "".join(parts).strip()}
@@ -0,0 +1,180 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from .catalog import Program
+from .metrics import timed
+
+# Chat prompts are laid out so consecutive turns share a byte-identical prefix (provider
+# prompt caching) and grow as little as possible:
+#   system   SYSTEM_PROMPT + compact program JSON         (fixed per program)
+#   context  student snapshot taken at the baseline turn  (fixed until rebased)
+#   summary  folded old history, if the budget required it
+#   history  remaining turns verbatim
+#   update   audit / plan / transcript changes since the baseline, if any
+#   user     goals + preferences for this turn
+# The baseline snapshot and summary travel between turns in `context_state`.
+CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "8000"))
+KEEP_RECENT = int(os.getenv("CHAT_KEEP_RECENT", "6"))
+MESSAGE_OVERHEAD = 4
+SUMMARY_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token (GPT-4o tokenizer on English/JSON), plus per-message framing."""
+    return (len(text) + 3) // 4 + MESSAGE_OVERHEAD
+
+
+def compact(obj: Any) -> str:
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+
+
+@lru_cache(maxsize=32)
+def program_block(program: Program) -> str:
+    return "CATALOG_PROGRAM_JSON:\n" + compact({
+        "program_id": program.id,
+        "total_credits": program.total_credits,
+        "requirements": program.raw["requirements"],
+        "prereqs": program.raw.get("prereqs", {}),
+    })
+
+
+def snapshot(transcript: Dict[str, Any], audit: List[Dict[str, Any]], planned_terms: List[Dict[str, Any]]) -> Dict:
+    """What the model needs about the student; pools are left out, they're in the program block."""
+    return {
+        "student": transcript.get("student"),
+        "transfer_credits": transcript.get("transfer_credits", 0),
+        "taken": sorted(([t.get("code"), t.get("term"), t.get("grade"), t.get("credits")]
+                         for t in transcript.get("taken", [])), key=str),
+        "audit": [{**r, "details": {k: v for k, v in r.get("details", {}).items() if k not in ("courses", "pool")}}
+                  for r in audit],
+        "plan": [dict(t) for t in planned_terms],
+    }
+
+
+def _credit_summary(plan: List[Dict[str, Any]]) -> str:
+    lines = ["Planned Credits Per Term:"]
+    lines += [f"- {t['term']}: {t.get('credits', 0)} credits ({', '.join(t.get('courses', []))})" for t in plan]
+    lines.append(f"Total Planned Credits: {sum(t.get('credits', 0) for t in plan)}")
+    if plan and plan[0].get("courses"):
+        lines.append("CONFIRMED_COURSES_FOR_NEXT_TERM:")
+        lines += [f"- {c}" for c in plan[0]["courses"]]
+    return "\n".join(lines)
+
+
+def render_snapshot(snap: Dict) -> str:
+    return (
+        "Context for this student:\n" + _credit_summary(snap["plan"]) + "\n\n"
+        "TRANSCRIPT_JSON (taken rows are [code, term, grade, credits]):\n"
+        + compact({k: snap[k] for k in ("student", "transfer_credits", "taken")}) + "\n\n"
+        "AUDIT_RESULTS_JSON:\n" + compact(snap["audit"]) + "\n\n"
+        "PLANNED_TERMS_JSON:\n" + compact(snap["plan"])
+    )
+
+
+def diff(old: Dict, new: Dict) -> Dict:
+    """Changes from `old` to `new` snapshot; empty when nothing the model saw has changed."""
+    d: Dict[str, Any] = {}
+    for key, ident in (("audit", "id"), ("plan", "term")):
+        before = {x[ident]: x for x in old[key]}
+        after = {x[ident]: x for x in new[key]}
+        changed = [x for k, x in after.items() if before.get(k) != x]
+        removed = [k for k in before if k not in after]
+        if changed:
+            d[key + "_changed"] = changed
+        if removed:
+            d[key + "_removed"] = removed
+    before, after = {tuple(t) for t in old["taken"]}, {tuple(t) for t in new["taken"]}
+    if after - before:
+        d["taken_added"] = sorted((list(t) for t in after - before), key=str)
+    if before - after:
+        d["taken_removed"] = sorted((list(t) for t in before - after), key=str)
+    for key in ("student", "transfer_credits"):
+        if old[key] != new[key]:
+            d[key] = new[key]
+    return d
+
+
+def _summary_line(msg: Dict[str, str]) -> str:
+    text = " ".join(msg.get("content", "").split())
+    cut = text.find(". ")
+    if 0 < cut < SUMMARY_CHARS:
+        text = text[:cut + 1]
+    elif len(text) > SUMMARY_CHARS:
+        text = text[:SUMMARY_CHARS - 3] + "..."
+    return f"- {msg['role']}: {text}"
+
+
+@timed("context")
+def build_messages(system: str, program: Program, snap: Dict, history: List[Dict[str, str]], user_text: str,
+                   state: Optional[Dict] = None, budget: Optional[int] = None) -> Tuple[List[Dict[str, str]], Dict, Dict]:
+    """Messages for one chat turn, the state to pass to the next turn, and token usage per block."""
+    budget = budget or CONTEXT_TOKENS
+    history = [m for m in history if m.get("role") in ("user", "assistant")]
+    if not (state and state.get("program_id") == program.id and state.get("baseline")
+            and state.get("summarized", 0) <= len(history)):
+        state = {"program_id": program.id, "baseline": snap, "summary": [], "summarized": 0}
+    state = dict(state, summary=list(state.get("summary", [])))
+
+    system_msg = system.strip() + "\n\n" + program_block(program)
+    delta = diff(state["baseline"], snap)
+    rebased = False
+    # Once the accumulated changes outweigh the snapshot itself, start from a fresh baseline.
+    if delta and estimate_tokens(compact(delta)) * 2 > estimate_tokens(render_snapshot(snap)):
+        state["baseline"], delta, rebased = snap, {}, True
+
+    def update_text():
+        if not delta:
+            return None
+        head = "CONTEXT_UPDATE (changes since the student context above; these take precedence):\n"
+        if "plan_changed" in delta or "plan_removed" in delta:
+            head += _credit_summary(snap["plan"]) + "\n"
+        return head + compact(delta)
+
+    def assemble():
+        msgs = [{"role": "system", "content": system_msg},
+                {"role": "assistant", "content": render_snapshot(state["baseline"])}]
+        if state["summary"]:
+            msgs.append({"role": "assistant", "content": "Earlier conversation (summarized):\n" + "\n".join(state["summary"])})
+        msgs += [{"role": m["role"], "content": m["content"]} for m in history[state["summarized"]:]]
+        update = update_text()
+        if update:
+            msgs.append({"role": "assistant", "content": update})
+        msgs.append({"role": "user", "content": user_text})
+        return msgs
+
+    messages = assemble()
+    total = sum(estimate_tokens(m["content"]) for m in messages)
+    if total > budget:
+        # Fold the oldest turns into the summary, down to ~3/4 of the budget so the
+        # summary (and the cached prefix behind it) doesn't change on every turn.
+        target = budget * 3 // 4
+        while total > target and state["summarized"] < len(history) - KEEP_RECENT:
+            msg = history[state["summarized"]]
+            line = _summary_line(msg)
+            total += estimate_tokens(line) - MESSAGE_OVERHEAD - estimate_tokens(msg["content"])
+            state["summary"].append(line)
+            state["summarized"] += 1
+        # Then drop the oldest summary lines if that still wasn't enough.
+        while total > budget and state["summary"]:
+            total -= estimate_tokens(state["summary"].pop(0)) - MESSAGE_OVERHEAD
+        messages = assemble()
+
+    sizes = {"system": estimate_tokens(system_msg), "context": estimate_tokens(messages[1]["content"])}
+    rest = messages[2:-1]
+    if state["summary"]:
+        sizes["summary"], rest = estimate_tokens(rest[0]["content"]), rest[1:]
+    if delta:
+        sizes["update"], rest = estimate_tokens(rest[-1]["content"]), rest[:-1]
+    sizes["history"] = sum(estimate_tokens(m["content"]) for m in rest)
+    sizes["user"] = estimate_tokens(user_text)
+    usage = {
+        "budget": budget,
+        "estimated_prompt_tokens": sum(estimate_tokens(m["content"]) for m in messages),
+        "blocks": sizes,
+        "summarized_messages": state["summarized"],
+        "rebased": rebased,
+    }
+    return messages, state, usage
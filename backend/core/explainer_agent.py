@@ -1,42 +1,174 @@
 import json
-from .llm import client, MODEL
-from .utils import load_json
-
-EXPLAIN_SYSTEM = "You explain degree planning decisions clearly and briefly and short only do three semesters ahead."
-
-
-def explain_decision(plan_json: dict, req_json: dict, course: str, term: str):
-    # Build a small credits map for any courses mentioned in the plan so the LLM
-    # gets exact per-course credit values instead of guessing.
-    catalog = load_json("catalog.json")
-    credits_map = {}
-    for pid, prog in catalog.get("programs", {}).items():
-        for code, meta in prog.get("course_meta", {}).items():
-            credits_map[code.upper().strip()] = meta.get("credits")
-
-    # Build a human-readable credits block for the prompt
-    involved = set()
-    for t in plan_json.get("planned_terms", []):
-        for c in t.get("courses", []):
-            involved.add(c.upper().strip())
-
-    credits_lines = []
-    for c in sorted(involved):
-        cr = credits_map.get(c)
-        credits_lines.append(f"{c}: {cr if cr is not None else 'unknown'}")
-
-    user = (
-        "Given this plan JSON: ```"
-        + json.dumps(plan_json)
-        + "``` and requirements: ```"
-        + json.dumps(req_json)
-        + f"```, answer: Why was {course} placed in {term}? Include prereq chain and credit balance.\n\n"
-        + "Course credits (from catalog):\n```"
-        + "\n".join(credits_lines)
-        + "\n```"
-    )
-
-    resp = client.chat.completions.create(
-        model=MODEL, messages=[{"role": "system", "content": EXPLAIN_SYSTEM}, {"role": "user", "content": user}]
-    )
-    return resp.choices[0].message.content.strip()
+from typing import Any, Dict, List, Optional, Set
+from .llm import complete
+from .catalog import Program, get_catalog
+from .planner import MAX_CREDITS, chain_lengths
+
+POLISH_SYSTEM = (
+    "You rewrite degree-planning explanations in friendly, concise language. "
+    "Use only the facts in the JSON you are given; do not add courses, terms or numbers."
+)
+
+
+def completed_from_audit(audit: List[Dict[str, Any]]) -> Set[str]:
+    """Courses the audit already counts as done (all_of courses not missing, choose_n picks)."""
+    done: Set[str] = set()
+    for r in audit or []:
+        d = r.get("details", {})
+        if r.get("type") == "all_of":
+            done |= set(d.get("courses", [])) - set(d.get("missing", []))
+        elif r.get("type") == "choose_n":
+            done |= set(d.get("done", []))
+    return done
+
+
+def explain_locally(program: Program, planned_terms: List[Dict], course: str, term: str,
+                    completed: Optional[Set[str]] = None, max_credits: int = MAX_CREDITS) -> Dict[str, Any]:
+    """Why `course` sits in `term`, computed from the compiled catalog and the plan itself.
+
+    `completed` is what the student already has (transcript or audit); prereqs that are neither
+    completed nor planned are reported as "assumed" (outside the plan, e.g. transfer credit).
+    A course planned in another term gets reason "wrong_term" (see "planned_term"); one the
+    plan doesn't have, "not_in_plan"; a code the program doesn't know, "unknown_course".
+    """
+    course = course.upper().strip()
+    completed = completed or set()
+    term_pos = {t["term"]: i for i, t in enumerate(planned_terms)}
+    planned_in = {c: t["term"] for t in planned_terms for c in t.get("courses", [])}
+    term_credits = [{"term": t["term"], "credits": t.get("credits", sum(program.credit(c) for c in t.get("courses", [])))}
+                    for t in planned_terms]
+    planned_term = planned_in.get(course)
+    pos = term_pos.get(planned_term)
+    i = program.index.get(course)
+
+    # Transitive prereqs in topological order, each with where it gets satisfied.
+    chain = []
+    if i is not None:
+        closure = program.prereq_closure[i]
+        for j in program.topo:
+            if closure >> j & 1:
+                code = program.codes[j]
+                if code in completed:
+                    status, when = "completed", None
+                elif code in planned_in:
+                    status, when = "planned", planned_in[code]
+                else:
+                    status, when = "assumed", None
+                chain.append({"code": code, "direct": j in program.prereq_idx[i], "status": status, "term": when})
+
+    # First plan term in which every prereq is done or planned strictly earlier.
+    earliest = 0
+    for p in chain:
+        if p["status"] == "planned" and p["term"] in term_pos:
+            earliest = max(earliest, term_pos[p["term"]] + 1)
+    blocked_by = [p["code"] for p in chain if p["status"] == "planned" and p["direct"]
+                  and term_pos.get(p["term"], -1) + 1 == earliest and earliest > 0]
+
+    credits = program.credit(course)
+    if i is None:
+        reason = "unknown_course"
+    elif planned_term is None:
+        reason = "not_in_plan"
+    elif planned_term != term:
+        reason = "wrong_term"
+    elif pos < earliest:
+        reason = "before_prereqs"
+    elif pos == earliest:
+        reason = "eligible"
+    elif all(term_credits[k]["credits"] + credits > max_credits for k in range(earliest, pos)):
+        reason = "credit_cap"
+    else:
+        reason = "priority"
+
+    todo = {program.index[c] for c in planned_in if c in program.index}
+    lengths = chain_lengths(program, todo) if i in todo else {}
+    unlocks = [c for c in planned_in if c in program.index and i is not None
+               and program.prereq_closure[program.index[c]] >> i & 1]
+    satisfies = [{"id": program.requirements[r].id, "label": program.requirements[r].label,
+                  "type": program.requirements[r].type} for r in program.requirements_by_course.get(course, ())]
+
+    details = {
+        "course": course,
+        "name": program.meta.get(course, {}).get("name"),
+        "credits": credits,
+        "term": term,
+        "planned_term": planned_term,
+        "reason": reason,
+        "earliest_term": planned_terms[earliest]["term"] if earliest < len(planned_terms) else None,
+        "blocked_by": blocked_by,
+        "prereq_chain": chain,
+        "satisfies": satisfies,
+        "unlocks": sorted(unlocks),
+        "chain_length": lengths.get(i, 1),
+        "term_credits": term_credits,
+        "max_credits": max_credits,
+    }
+    details["text"] = render_explanation(details)
+    return details
+
+
+def render_explanation(d: Dict[str, Any]) -> str:
+    title = f"{d['course']}" + (f" ({d['name']}, {d['credits']} cr)" if d["name"] else f" ({d['credits']} cr)")
+    lines = []
+    if d["reason"] == "unknown_course":
+        return f"{d['course']} is not a course in this program's catalog."
+    if d["reason"] == "not_in_plan":
+        lines.append(f"{title} is not in the current plan.")
+    elif d["reason"] == "wrong_term":
+        lines.append(f"{title} is planned for {d['planned_term']}, not {d['term']}.")
+    else:
+        lines.append(f"{title} is planned for {d['term']}.")
+    if d["satisfies"]:
+        lines.append("It counts toward " + ", ".join(r["label"] or r["id"] for r in d["satisfies"]) + ".")
+    if d["prereq_chain"]:
+        parts = []
+        for p in d["prereq_chain"]:
+            if p["status"] == "completed":
+                parts.append(f"{p['code']} (completed)")
+            elif p["status"] == "planned":
+                parts.append(f"{p['code']} ({p['term']})")
+            else:
+                parts.append(f"{p['code']} (assumed complete)")
+        lines.append("Prerequisites, earliest first: " + ", ".join(parts) + ".")
+    else:
+        lines.append("It has no prerequisites.")
+    if d["reason"] == "eligible":
+        if d["blocked_by"]:
+            lines.append(f"{d['term']} is the first term after {', '.join(d['blocked_by'])}, so it can't go earlier.")
+        else:
+            lines.append("Its prerequisites are already met, so it goes in the first available term.")
+    elif d["reason"] == "credit_cap":
+        lines.append(f"It became eligible in {d['earliest_term']}, but the terms before {d['term']} were already "
+                     f"at the {d['max_credits']}-credit cap.")
+    elif d["reason"] == "before_prereqs":
+        lines.append(f"Warning: its prerequisites are not finished before {d['term']}; "
+                     f"the earliest valid term is {d['earliest_term'] or 'after the current plan'}.")
+    elif d["reason"] == "priority":
+        lines.append(f"It became eligible in {d['earliest_term']}; courses that unlock longer prerequisite "
+                     f"chains were scheduled first.")
+    if d["unlocks"]:
+        lines.append("Taking it on time keeps " + ", ".join(d["unlocks"]) + " on track.")
+    load = next((t["credits"] for t in d["term_credits"] if t["term"] == d["planned_term"]), None)
+    if load is not None:
+        lines.append(f"{d['planned_term']} totals {load} credits (cap {d['max_credits']}).")
+    return " ".join(lines)
+
+
+async def explain_decision(plan_json: dict, req_json: list, course: str, term: str,
+                           program: Optional[Program] = None, transcript: Optional[dict] = None,
+                           polish: bool = False, max_credits: int = MAX_CREDITS) -> Dict[str, Any]:
+    """Local explanation first; the LLM is only used when `polish` is set, to reword the facts."""
+    catalog = get_catalog()
+    program = program or catalog.get(catalog.default_program_id)
+    completed = {t["code"] for t in transcript["taken"]} if transcript else completed_from_audit(req_json)
+    details = explain_locally(program, plan_json.get("planned_terms", []), course, term, completed, max_credits)
+    text = details["text"]
+    if polish:
+        facts = {k: v for k, v in details.items() if k != "text"}
+        user = (
+            f"Explain why {details['course']} was placed in {term}, using these facts: ```"
+            + json.dumps(facts)
+            + "```\n\nDraft to improve:\n" + text
+        )
+        text = await complete([{"role": "system", "content": POLISH_SYSTEM}, {"role": "user", "content": user}])
+    return {"explanation": text, "details": details}
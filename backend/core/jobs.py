@@ -0,0 +1,168 @@
+import asyncio, os, secrets, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .metrics import describe, inc
+
+# Background jobs for work too slow to hold a request open (scanned transcript PDFs:
+# OCR is seconds per page). submit() returns a job id at once; JOB_WORKERS threads run
+# the jobs (page extraction/OCR still fans out to the PDF process pool) and at most
+# JOB_QUEUE_MAX more wait behind them, past that submit() raises QueueFull.
+# A job records its events: ("status", {"status": "running"}), ("progress", {"stage",
+# "done", "total"}), then ("done", result) or ("error", {"message"}). Clients poll get()
+# or stream them with subscribe(), which replays what already happened first.
+# Finished jobs are dropped JOB_TTL seconds after they finish, and the oldest finished
+# ones beyond JOB_MAX. Jobs live in this process: poll the worker that took the upload.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "32"))
+JOB_TTL = float(os.getenv("JOB_TTL", "3600"))
+JOB_MAX = int(os.getenv("JOB_MAX", "1000"))
+TERMINAL = ("done", "error")
+
+describe("advisor_jobs_total", "counter", "Background jobs by kind and outcome.")
+
+Event = Tuple[str, Any]
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_MAX, ttl: float = JOB_TTL,
+                 max_jobs: int = JOB_MAX):
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+        self._queued = 0
+
+    def submit(self, kind: str, fn: Callable, *args) -> str:
+        """Queue fn(*args, progress=...); progress(stage, done=0, total=0) adds a progress event."""
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            if self._queued >= self.max_queued:
+                inc("advisor_jobs_total", kind=kind, outcome="rejected")
+                raise QueueFull(f"{self._queued} jobs already waiting")
+            self._queued += 1
+            jid = secrets.token_urlsafe(12)
+            self._jobs[jid] = {"id": jid, "kind": kind, "status": "queued", "created": now, "updated": now,
+                               "finished": None, "progress": None, "result": None, "error": None,
+                               "events": [("status", {"status": "queued"})]}
+        self._pool.submit(self._run, jid, kind, fn, args)
+        return jid
+
+    def _run(self, jid: str, kind: str, fn: Callable, args: tuple):
+        with self._lock:
+            self._queued -= 1
+        self._emit(jid, "status", {"status": "running"}, status="running")
+
+        def progress(stage: str, done: int = 0, total: int = 0):
+            self._emit(jid, "progress", {"stage": stage, "done": done, "total": total})
+
+        try:
+            result = fn(*args, progress=progress)
+        except Exception as e:
+            inc("advisor_jobs_total", kind=kind, outcome="error")
+            self._emit(jid, "error", {"message": str(e)}, status="error", error=str(e))
+        else:
+            inc("advisor_jobs_total", kind=kind, outcome="done")
+            self._emit(jid, "done", result, status="done", result=result)
+
+    def _emit(self, jid: str, event: str, data: Any, **fields):
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(jid)
+            if job is None:
+                return
+            job["events"].append((event, data))
+            job["updated"] = now
+            if event == "progress":
+                job["progress"] = data
+            job.update(fields)
+            if event in TERMINAL:
+                job["finished"] = now
+            subscribers = list(self._subscribers.get(jid, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+            except RuntimeError:
+                pass  # the subscriber's loop is gone
+
+    def _sweep(self, now: float):
+        finished = [jid for jid, job in self._jobs.items() if job["finished"] is not None]
+        for jid in finished:
+            if now - self._jobs[jid]["finished"] > self.ttl:
+                del self._jobs[jid]
+        extra = len(self._jobs) - self.max_jobs
+        for jid in finished:
+            if extra <= 0:
+                break
+            if self._jobs.pop(jid, None) is not None:
+                extra -= 1
+
+    def get(self, jid: str) -> Optional[Dict[str, Any]]:
+        """Status, latest progress and, once done, the result; None when unknown or expired."""
+        with self._lock:
+            self._sweep(time.time())
+            job = self._jobs.get(jid)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if k not in ("events", "finished")}
+
+    async def subscribe(self, jid: str) -> AsyncIterator[Event]:
+        """The job's events so far, then live ones until it is done or failed."""
+        queue: asyncio.Queue = asyncio.Queue()
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            job = self._jobs.get(jid)
+            if job is None:
+                return
+            past = list(job["events"])
+            live = job["status"] not in TERMINAL
+            if live:
+                self._subscribers.setdefault(jid, []).append(entry)
+        try:
+            for event in past:
+                yield event
+            while live:
+                event = await queue.get()
+                yield event
+                live = event[0] not in TERMINAL
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(jid)
+                if subscribers and entry in subscribers:
+                    subscribers.remove(entry)
+                    if not subscribers:
+                        del self._subscribers[jid]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = sum(job["status"] == "running" for job in self._jobs.values())
+            return {"queued": self._queued, "running": running, "jobs": len(self._jobs)}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        _queue = JobQueue()
+    return _queue
+
+
+def shutdown_jobs():
+    global _queue
+    if _queue is not None:
+        _queue.shutdown()
+        _queue = None
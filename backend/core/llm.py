@@ -1,8 +1,152 @@
-import os
-from openai import OpenAI
+import asyncio, os, random
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
 
-# Backend agents share one client + model setting to guarantee gpt-4o-mini usage.
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from .cache import TieredCache, content_key
+from .metrics import inc, span
+from .utils import DATA_DIR
+
+# Backend agents share one async client + model setting to guarantee gpt-4o-mini usage.
+# Every call goes through `complete` / `stream_complete`, which add a global concurrency
+# cap (provider rate limits), per-call timeouts and retries with exponential backoff.
 MODEL = "gpt-4o-mini"
+TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "256"))
+POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "100"))
+
+# Replies are cached by a hash of model + messages (system prompt included) + call options.
+# LLM_CACHE=0 turns the cache off; individual calls can pass cache=False.
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(DATA_DIR, "cache", "llm_cache.sqlite"))
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# openai and httpx take ~250 ms to import, so they are loaded with the first client
+# (or the first error to classify), not when the API process starts.
+_client: Optional["AsyncOpenAI"] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+_cache: Optional[TieredCache] = None
+_retryable: Optional[Tuple[type, ...]] = None
+
+
+def retryable() -> Tuple[type, ...]:
+    """The SDK errors worth another attempt."""
+    global _retryable
+    if _retryable is None:
+        from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+        _retryable = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+    return _retryable
+
+
+def get_client() -> "AsyncOpenAI":
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+            timeout=httpx.Timeout(TIMEOUT, connect=5.0),
+        )
+        # Retries are handled here, not by the SDK, so they respect the semaphore.
+        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0)
+    return _client
+
+
+def get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        _cache = TieredCache("llm", CACHE_PATH, max_items=2048, ttl=CACHE_TTL)
+    return _cache
+
+
+def _limiter() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _backoff(attempt: int) -> float:
+    return min(8.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+
+
+def _count_usage(model: str, usage) -> None:
+    if usage is not None:
+        inc("advisor_llm_tokens_total", usage.prompt_tokens or 0, model=model, kind="prompt")
+        inc("advisor_llm_tokens_total", usage.completion_tokens or 0, model=model, kind="completion")
+
+
+async def complete(messages: List[Dict[str, str]], model: str = MODEL, timeout: Optional[float] = None,
+                   cache: bool = True, **kwargs) -> str:
+    """One chat completion; returns the stripped reply text.
+
+    Identical requests are answered from the response cache unless `cache=False`.
+    """
+    key = None
+    if cache and CACHE_ENABLED:
+        key = content_key(model, messages, kwargs)
+        hit = await get_cache().aget(key)
+        if hit is not None:
+            inc("advisor_llm_requests_total", model=model, outcome="cache_hit")
+            return hit
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with _limiter():
+                with span("llm"):
+                    resp = await get_client().chat.completions.create(
+                        model=model, messages=messages, timeout=timeout or TIMEOUT, **kwargs)
+            _count_usage(model, getattr(resp, "usage", None))
+            inc("advisor_llm_requests_total", model=model, outcome="ok")
+            reply = resp.choices[0].message.content.strip()
+            if key is not None:
+                await get_cache().aset(key, reply)
+            return reply
+        except retryable():
+            inc("advisor_llm_requests_total", model=model, outcome="retry" if attempt < MAX_RETRIES else "error")
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+
+
+async def stream_complete(messages: List[Dict[str, str]], model: str = MODEL, timeout: Optional[float] = None,
+                          **kwargs) -> AsyncIterator[str]:
+    """Yield reply text deltas. Retries only before the first delta has been sent.
+
+    Token usage arrives on a final chunk with no choices (stream_options.include_usage).
+    """
+    kwargs.setdefault("stream_options", {"include_usage": True})
+    for attempt in range(MAX_RETRIES + 1):
+        sent = False
+        try:
+            async with _limiter():
+                with span("llm.stream"):
+                    stream = await get_client().chat.completions.create(
+                        model=model, messages=messages, stream=True, timeout=timeout or TIMEOUT, **kwargs)
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            _count_usage(model, getattr(chunk, "usage", None))
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            sent = True
+                            yield delta
+            inc("advisor_llm_requests_total", model=model, outcome="ok")
+            return
+        except retryable():
+            inc("advisor_llm_requests_total", model=model,
+                outcome="retry" if not sent and attempt < MAX_RETRIES else "error")
+            if sent or attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
 
-__all__ = ["client", "MODEL"]
+__all__ = ["MODEL", "complete", "stream_complete", "get_client", "get_cache", "aclose"]
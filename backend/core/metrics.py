@@ -0,0 +1,213 @@
+import os, threading, time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+# Process-local metrics in Prometheus text format (GET /metrics).
+#   span("audit")       times a block into advisor_stage_seconds{stage="audit"} and, inside
+#                       a request, into its Server-Timing header
+#   inc(name, n, ...)   counters (LLM tokens, request outcomes)
+# TieredCache hit/miss counts are read from the caches themselves at scrape time.
+# A span costs two perf_counter calls and one locked bucket increment (~1-2 us);
+# METRICS=0 turns spans into no-ops.
+ENABLED = os.getenv("METRICS", "1") != "0"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+_histograms: Dict[Tuple[str, Labels], List] = {}  # [per-bucket counts (+Inf last), sum, count]
+_help: Dict[str, Tuple[str, str]] = {}
+# Spans of the current request, for Server-Timing; None outside a timed request.
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+def describe(name: str, kind: str, text: str):
+    _help[name] = (kind, text)
+
+
+describe("advisor_stage_seconds", "histogram", "Engine stage latency.")
+describe("advisor_http_request_seconds", "histogram", "HTTP request latency by route (until the response starts).")
+describe("advisor_http_requests_total", "counter", "HTTP requests by route and status.")
+describe("advisor_llm_tokens_total", "counter", "LLM tokens reported by the provider.")
+describe("advisor_llm_requests_total", "counter", "LLM calls by outcome.")
+describe("advisor_cache_requests_total", "counter", "Cache lookups by result.")
+describe("advisor_cache_evictions_total", "counter", "Cache evictions to stay under a tier's cap, by tier.")
+describe("advisor_cache_expired_total", "counter", "Cache entries dropped for being older than the TTL.")
+describe("advisor_cache_hit_ratio", "gauge", "Cache hits / lookups since start.")
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def _observe(key: Tuple[str, Labels], seconds: float):
+    i = bisect_left(BUCKETS, seconds)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        h[0][i] += 1
+        h[1] += seconds
+        h[2] += 1
+
+
+def observe(name: str, seconds: float, **labels):
+    _observe((name, _labels(labels)), seconds)
+
+
+class span:
+    """Times a block as an engine stage: `with span("audit"): ...`."""
+    __slots__ = ("stage", "key", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.key = ("advisor_stage_seconds", (("stage", stage),))
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        if not ENABLED:
+            return
+        dt = time.perf_counter() - self.t0
+        _observe(self.key, dt)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((self.stage, dt))
+
+
+def timed(stage: str):
+    """Decorator form of span() for plain functions."""
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+        key = ("advisor_stage_seconds", (("stage", stage),))
+
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                dt = time.perf_counter() - t0
+                _observe(key, dt)
+                spans = _request_spans.get()
+                if spans is not None:
+                    spans.append((stage, dt))
+        return inner
+    return wrap
+
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing header value; repeated stages are summed, in first-seen order."""
+    agg: Dict[str, List[float]] = {}
+    for name, dt in spans:
+        a = agg.setdefault(name, [0.0, 0])
+        a[0] += dt
+        a[1] += 1
+    parts = [f'{name.replace(".", "-")};dur={a[0] * 1000:.2f}' + (f';desc="x{a[1]}"' if a[1] > 1 else "")
+             for name, a in agg.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request latency per route template, and an optional Server-Timing
+    header (SERVER_TIMING=1, or per request with an `x-server-timing` header). Streaming
+    responses only report the spans that finished before the headers went out."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        spans: List[Tuple[str, float]] = []
+        token = _request_spans.set(spans)
+        want = SERVER_TIMING or any(k == b"x-server-timing" for k, _ in scope.get("headers", ()))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                dt = time.perf_counter() - t0
+                route = scope.get("route")
+                path = getattr(route, "path", "unmatched")
+                observe("advisor_http_request_seconds", dt, method=scope["method"], route=path)
+                inc("advisor_http_requests_total", method=scope["method"], route=path, status=message["status"])
+                if want:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(spans, dt).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_spans.reset(token)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _cache_samples():
+    from .cache import all_caches
+    for c in all_caches():
+        s = c.stats
+        lbl = (("cache", c.name),)
+        for stat, result in (("memory_hits", "memory_hit"), ("disk_hits", "disk_hit"), ("misses", "miss")):
+            yield "advisor_cache_requests_total", lbl + (("result", result),), s[stat]
+        for tier in ("memory", "disk"):
+            yield "advisor_cache_evictions_total", lbl + (("tier", tier),), s[f"{tier}_evictions"]
+        yield "advisor_cache_expired_total", lbl, s["expired"]
+        yield "advisor_cache_hit_ratio", lbl, round(c.hit_rate(), 6)
+
+
+def render() -> str:
+    """Everything in Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters = dict(_counters)
+        hists = {k: (list(v[0]), v[1], v[2]) for k, v in _histograms.items()}
+    samples: Dict[str, List[str]] = {}
+    for (name, labels), value in sorted(counters.items()):
+        samples.setdefault(name, []).append(f"{name}{_fmt_labels(labels)} {value:g}")
+    for name, labels, value in _cache_samples():
+        samples.setdefault(name, []).append(f"{name}{_fmt_labels(labels)} {value:g}")
+    for (name, labels), (counts, total, n) in sorted(hists.items()):
+        lines = samples.setdefault(name, [])
+        cum = 0
+        for le, c in zip(BUCKETS + (float("inf"),), counts):
+            cum += c
+            bound = "+Inf" if le == float("inf") else f"{le:g}"
+            lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', bound),))} {cum}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {n}")
+    out = []
+    for name in sorted(samples):
+        kind, text = _help.get(name, ("untyped", ""))
+        out += [f"# HELP {name} {text}", f"# TYPE {name} {kind}", *samples[name]]
+    return "\n".join(out) + "\n"
+
+
+def reset():
+    """Tests only."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
@@ -0,0 +1,122 @@
+from math import ceil
+from typing import Dict, Iterable, List, Optional, Tuple
+from .catalog import Program
+from .metrics import timed
+from .planner import MAX_CREDITS
+from .records import as_transcript
+
+# "How far am I from every major": one transcript against all loaded programs.
+# Course codes share one index across programs, and each code posts to the
+# (program, requirement) pairs that mention it. A transcript row only touches its
+# postings; programs it never touches reuse the result precomputed for an empty
+# transcript, so the cost follows the transcript, not the number of programs.
+
+
+class MultiProgramAuditor:
+    def __init__(self, programs: Iterable[Program]):
+        self.programs: Tuple[Program, ...] = tuple(programs)
+        index: Dict[str, int] = {}
+        postings: List[List[Tuple[int, int, int]]] = []
+        for k, p in enumerate(self.programs):
+            for code, positions in p.requirements_by_course.items():
+                g = index.setdefault(code, len(index))
+                if g == len(postings):
+                    postings.append([])
+                credit = p.credit(code)
+                # Credit only matters for credits_at_least postings (area members).
+                postings[g].extend((k, pos, credit if p.requirements[pos].type == "credits_at_least" else 0)
+                                   for pos in positions)
+        self.index = index
+        self.postings: Tuple[Tuple[Tuple[int, int, int], ...], ...] = tuple(tuple(v) for v in postings)
+        self._topo_pos = [{i: n for n, i in enumerate(p.topo)} for p in self.programs]
+        self._empty = [self._summarize(k, 0, {}, MAX_CREDITS) for k in range(len(self.programs))]
+
+    def _longest_chain(self, k: int, todo: List[int]) -> int:
+        """Longest prereq chain among `todo` (local indexes), walked in topological order."""
+        p, depth = self.programs[k], {}
+        for i in sorted(todo, key=self._topo_pos[k].__getitem__):
+            ps = p.prereq_idx[i]
+            depth[i] = 1 + max((depth[q] for q in ps if q in depth), default=0) if ps else 1
+        return max(depth.values(), default=0)
+
+    def _summarize(self, k: int, taken: int, earned: Dict[int, int], max_credits: int) -> Dict:
+        """Remaining work for program k; `taken` is its local bitset, `earned` credits per requirement."""
+        p = self.programs[k]
+        remaining, met, gaps = 0, 0, []
+        for r, m in zip(p.requirements, p.req_masks):
+            if r.type == "all_of":
+                rem = m & ~taken
+                met += not rem
+                remaining |= rem
+            elif r.type == "choose_n":
+                need = max(0, r.n - bin(m & taken).count("1"))
+                met += not need
+                for c in r.pool:
+                    if not need:
+                        break
+                    bit = 1 << p.index[c]
+                    if not taken & bit:
+                        remaining |= bit
+                        need -= 1
+            elif r.type == "credits_at_least":
+                need = max(0, r.credits - earned.get(r.pos, 0))
+                met += not need
+                if need:
+                    gaps.append((r.area, need))
+        todo = []
+        while remaining:
+            low = remaining & -remaining
+            todo.append(low.bit_length() - 1)
+            remaining ^= low
+        credits = sum(p.credits[i] for i in todo)
+        for area, need in gaps:
+            # Area credits not already covered by courses that are on the list anyway.
+            credits += max(0, need - sum(p.credits[i] for i in todo if p.area[i] == area))
+        chain = self._longest_chain(k, todo)
+        return {
+            "program_id": p.id,
+            "name": p.name,
+            "requirements_met": met,
+            "requirements_total": sum(r.type in ("all_of", "choose_n", "credits_at_least") for r in p.requirements),
+            "remaining_credits": credits,
+            # Lower bound: credit load at max_credits per term vs. the longest prereq chain left.
+            "estimated_terms": max(ceil(credits / max_credits), chain) if credits else 0,
+            "remaining_courses": sorted(p.codes[i] for i in todo),
+        }
+
+    @timed("audit_all")
+    def audit(self, transcript, max_credits: int = MAX_CREDITS) -> List[Dict]:
+        """All programs ranked by remaining credits, then estimated terms."""
+        taken: Dict[int, List[str]] = {}
+        earned: Dict[int, Dict[int, int]] = {}
+        for code in as_transcript(transcript).codes:
+            g = self.index.get(code)
+            if g is None:
+                continue
+            for k, pos, credit in self.postings[g]:
+                taken.setdefault(k, []).append(code)
+                if credit:
+                    # Per row, like area_credits: a repeated course counts each time.
+                    e = earned.setdefault(k, {})
+                    e[pos] = e.get(pos, 0) + credit
+        out = []
+        for k, p in enumerate(self.programs):
+            if k in taken:
+                out.append(self._summarize(k, p.mask(taken[k]), earned.get(k, {}), max_credits))
+            elif max_credits == MAX_CREDITS:
+                out.append(dict(self._empty[k]))
+            else:
+                out.append(self._summarize(k, 0, {}, max_credits))
+        out.sort(key=lambda s: (s["remaining_credits"], s["estimated_terms"], str(s["program_id"])))
+        return out
+
+
+_auditor: Optional[Tuple[object, MultiProgramAuditor]] = None
+
+
+def auditor_for(snapshot) -> MultiProgramAuditor:
+    """One auditor per catalog snapshot; rebuilt when the catalog reloads."""
+    global _auditor
+    if _auditor is None or _auditor[0] is not snapshot:
+        _auditor = (snapshot, MultiProgramAuditor(snapshot.programs.values()))
+    return _auditor[1]
@@ -0,0 +1,254 @@
+import os, threading, time
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from .scheduler import parse_meeting
+from .utils import DATA_DIR, load_json
+
+# Section offerings for every term, kept current during registration.
+#   OFFERINGS_PATH   offerings.json, one term ({"term", "sections": {course: [section]}})
+#   OFFERINGS_DIR    more terms, one file per term in the same format (optional)
+#   OFFERINGS_DELTAS JSON lines of deltas, appended by whatever feeds seat counts (optional)
+# Deltas also come in through apply() (POST /offerings/deltas):
+#   {"op": "seats", "term", "course", "crn", "enrolled"?, "cap"?}
+#   {"op": "add", "term", "course", "section": {...}}     (replaces a section with that crn)
+#   {"op": "remove", "term", "course", "crn"}
+# Every change builds new per-term documents (copy-on-write, untouched courses shared) and
+# swaps the whole snapshot in one assignment, so a request that grabbed snapshot() sees
+# one consistent set of seats, and the scheduler's per-document caches never go stale.
+# Sections are kept sorted by start time; "open" counts the open sections per course.
+# When a base file changes on disk the terms are rebuilt from it and the deltas file is
+# replayed; deltas that only came in through the API are assumed to be in the new file.
+OFFERINGS_PATH = os.getenv("OFFERINGS_PATH", os.path.join(DATA_DIR, "offerings.json"))
+OFFERINGS_DIR = os.getenv("OFFERINGS_DIR", os.path.join(DATA_DIR, "offerings"))
+OFFERINGS_DELTAS = os.getenv("OFFERINGS_DELTAS", os.path.join(DATA_DIR, "offerings.deltas.jsonl"))
+CHECK_INTERVAL = float(os.getenv("OFFERINGS_CHECK_INTERVAL", "2"))
+OPS = ("seats", "add", "remove")
+
+
+def _start(sec: Dict) -> Tuple[int, str]:
+    bits, start, _ = parse_meeting(sec.get("days", ""), sec.get("start", ""), sec.get("end", ""))
+    return (start if bits else 24 * 60, str(sec.get("crn", "")))
+
+
+def _is_open(sec: Dict) -> bool:
+    return sec["enrolled"] < sec["cap"]
+
+
+def term_document(term: str, sections: Dict[str, List[Dict]], version: int = 0) -> Dict:
+    """Scheduler-ready offerings for one term: sections sorted by start time, open counts per course."""
+    sections = {c: sorted(secs, key=_start) for c, secs in sections.items()}
+    return {"term": term, "version": version, "sections": sections,
+            "open": {c: sum(map(_is_open, secs)) for c, secs in sections.items()}}
+
+
+def _seat_count(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _validate(delta: Dict):
+    if not isinstance(delta, dict):
+        raise ValueError(f"a delta must be an object, got {type(delta).__name__}")
+    op = delta.get("op")
+    if op not in OPS:
+        raise ValueError(f"unknown op {op!r}; expected one of {list(OPS)}")
+    if not delta.get("term") or not delta.get("course"):
+        raise ValueError(f"{op}: term and course are required")
+    if op == "add":
+        sec = delta.get("section")
+        if not isinstance(sec, dict) or not all(k in sec for k in ("crn", "days", "start", "end", "cap", "enrolled")):
+            raise ValueError("add: section needs crn, days, start, end, cap and enrolled")
+        if not (_seat_count(sec["cap"]) and _seat_count(sec["enrolled"])):
+            raise ValueError("add: cap and enrolled must be non-negative integers")
+    else:
+        if "crn" not in delta:
+            raise ValueError(f"{op}: crn is required")
+        if op == "seats" and "enrolled" not in delta and "cap" not in delta:
+            raise ValueError("seats: enrolled or cap is required")
+        if not all(_seat_count(delta[k]) for k in ("enrolled", "cap") if k in delta):
+            raise ValueError(f"{op}: enrolled and cap must be non-negative integers")
+
+
+def apply_deltas(terms: Dict[str, Dict], deltas: List[Dict], version: int) -> Tuple[Dict[str, Dict], int]:
+    """New term documents with `deltas` applied (inputs untouched); returns (terms, deltas applied).
+    Only terms an applied delta touched are rebuilt (or created, for an add). Raises
+    ValueError, before changing anything, if any delta is malformed."""
+    for d in deltas:
+        _validate(d)
+    changed: Dict[str, Dict[str, List[Dict]]] = {}  # term -> course -> new section list
+    applied = 0
+    for d in deltas:
+        term, course = d["term"], d["course"]
+        courses = changed.get(term, {})
+        secs = courses[course] if course in courses else terms.get(term, {}).get("sections", {}).get(course, [])
+        crn = str(d["section"]["crn"] if d["op"] == "add" else d["crn"])
+        at = next((k for k, s in enumerate(secs) if str(s["crn"]) == crn), None)
+        if at is None and d["op"] != "add":
+            continue  # unknown section: skipped, not an error (the feed may be ahead of the file)
+        if course not in courses:
+            secs = changed.setdefault(term, {})[course] = [dict(s) for s in secs]
+        if d["op"] == "seats":
+            secs[at].update({k: d[k] for k in ("enrolled", "cap") if k in d})
+        elif d["op"] == "add":
+            if at is None:
+                secs.append(dict(d["section"]))
+            else:
+                secs[at] = dict(d["section"])
+        else:
+            del secs[at]
+        applied += 1
+    if not changed:
+        return terms, 0
+    out = dict(terms)
+    for term, courses in changed.items():
+        sections = dict(terms[term]["sections"]) if term in terms else {}
+        for course, secs in courses.items():
+            if secs:
+                sections[course] = secs
+            else:
+                sections.pop(course, None)
+        out[term] = term_document(term, sections, version)
+    return out, applied
+
+
+class OfferingsStore:
+    """Offerings per term. Grab `snapshot()` (term -> document) once per request.
+
+    Published documents are immutable: every change builds new term documents carrying a new
+    "version", and callers must not edit a snapshot in place (scheduler.slot_groups caches
+    per document and version)."""
+
+    def __init__(self, path: str = OFFERINGS_PATH, directory: Optional[str] = OFFERINGS_DIR,
+                 deltas_path: Optional[str] = OFFERINGS_DELTAS, check_interval: float = CHECK_INTERVAL):
+        self.path = path
+        self.directory = directory
+        self.deltas_path = deltas_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._version = 0
+        self._base_stat = None
+        self._deltas_offset = 0
+        self._terms: Dict[str, Dict] = {}
+        self.default_term: Optional[str] = None
+        with self._lock:
+            self._reload()
+
+    def _files(self) -> List[str]:
+        files = [self.path] if os.path.exists(self.path) else []
+        if self.directory and os.path.isdir(self.directory):
+            files += sorted(os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.endswith(".json"))
+        return files
+
+    def _stat(self):
+        return tuple((f, st.st_mtime_ns, st.st_size) for f, st in ((f, os.stat(f)) for f in self._files()))
+
+    def _reload(self):
+        """Rebuild every term from the base files, then replay the deltas file. Caller holds the lock."""
+        stat = self._stat()
+        terms: Dict[str, Dict] = {}
+        default = None
+        for f in self._files():
+            doc = load_json(f)
+            terms[doc["term"]] = term_document(doc["term"], doc.get("sections", {}), self._version + 1)
+            default = default or doc["term"]
+        self._base_stat, self._deltas_offset = stat, 0
+        self._publish(terms)
+        self.default_term = default
+        self._read_deltas()
+
+    def _read_deltas(self):
+        """Apply the complete lines appended to the deltas file since the last read. Caller holds the lock."""
+        if not self.deltas_path or not os.path.exists(self.deltas_path):
+            return
+        size = os.path.getsize(self.deltas_path)
+        if size < self._deltas_offset:
+            self._deltas_offset = 0  # truncated or rotated: the base reload below replays it all
+            return self._reload()
+        if size == self._deltas_offset:
+            return
+        with open(self.deltas_path, "rb") as f:
+            f.seek(self._deltas_offset)
+            chunk = f.read(size - self._deltas_offset)
+        end = chunk.rfind(b"\n") + 1  # a line still being written waits for the next check
+        deltas = []
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                deltas.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue
+        self._deltas_offset += end
+        try:
+            self._apply(deltas)
+        except ValueError:
+            # One bad line shouldn't block the feed: apply the good ones one by one.
+            for d in deltas:
+                try:
+                    self._apply([d])
+                except ValueError:
+                    pass
+
+    def _apply(self, deltas: List[Dict]) -> int:
+        if not deltas:
+            return 0
+        terms, applied = apply_deltas(self._terms, deltas, self._version + 1)
+        if applied:
+            self._publish(terms)
+        return applied
+
+    def _publish(self, terms: Dict[str, Dict]):
+        self._version += 1
+        self._terms = terms
+
+    def _maybe_reload(self):
+        try:
+            stat = self._stat()
+        except OSError:
+            return
+        with self._lock:
+            try:
+                if stat != self._base_stat:
+                    self._reload()
+                else:
+                    self._read_deltas()
+            except (OSError, ValueError, KeyError, TypeError):
+                pass  # half-written file: keep serving the current snapshot and retry later
+
+    def snapshot(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._maybe_reload()
+        return self._terms
+
+    def get(self, term: str) -> Optional[Dict]:
+        return self.snapshot().get(term)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def apply(self, deltas: List[Dict]) -> Dict:
+        """Apply deltas atomically (all or none); returns {"applied", "version", "terms"}."""
+        with self._lock:
+            applied = self._apply(deltas)
+            return {"applied": applied, "version": self._version, "terms": sorted({d["term"] for d in deltas})}
+
+    def summary(self) -> Dict:
+        terms = self.snapshot()
+        return {"version": self._version, "default_term": self.default_term,
+                "terms": {t: {"courses": len(doc["sections"]), "sections": sum(map(len, doc["sections"].values())),
+                              "open_sections": sum(doc["open"].values())} for t, doc in terms.items()}}
+
+
+_store: Optional[OfferingsStore] = None
+
+
+def get_offerings() -> OfferingsStore:
+    global _store
+    if _store is None:
+        _store = OfferingsStore()
+    return _store
@@ -1,37 +1,135 @@
-import io, re
-from typing import List, Dict
-import pdfplumber
-from pdf2image import convert_from_bytes
-import pytesseract
-
-# --- UPDATED REGEX ---
-# 1. Matches "2205" (Term) first
-# 2. Matches "EGN 4950 C" or "COP2220"
-# 3. CRITICAL FIX: Uses [ \t]* instead of \s* for the suffix to prevent 
-#    matching newlines (which was eating the next course's first letter).
-COURSE_ROW_REGEX = re.compile(
-    r"[\"']?(?P<term>\d{4})[\"']?"              # Term: Matches "2205"
-    r".*?"                                      # Junk chars
-    r"[\"']?(?P<code>[A-Z]{3,4}[ \t]*\d{3,4}(?:[ \t]*[A-Za-z])?)[\"']?" # Code: Matches "EGN 4950 C" but NOT "EGN 4950 \n E"
-    r".*?"                                      # Junk chars
-    r"[\"']?(?P<credits>\d+\.\d{1,2})[\"']?"    # Credits: Matches "3.00"
-    r".*?"                                      # Junk chars
-    r"[\"']?(?P<grade>(?:[A-Z]{1,2}[\+\-]?))[\"']?" # Grade: Matches "A", "IP", "B+"
-)
+import copy, hashlib, io, os, re, tempfile, threading
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Callable, List, Dict, Optional, Tuple
+from .cache import TieredCache, content_key
+from .metrics import span, timed
+from .utils import DATA_DIR
+
+# pdfplumber, pdf2image and pytesseract are imported where they are used: most API
+# workers never see a PDF, and the three cost ~90 ms of every cold start.
+# Pages are extracted / OCR'd in a process pool of PDF_WORKERS (1 = all in-process).
+# Text PDFs of up to PDF_INLINE_PAGES pages skip the pool; shipping them costs more than it saves.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+INLINE_PAGES = int(os.getenv("PDF_INLINE_PAGES", "4"))
+# Scanned pages are rasterized once at full resolution (the dpi argument) and OCR'd page by
+# page: first a downscale to OCR_SCAN_DPI to find the course table and header lines, then
+# only those bands, and any line read below OCR_MIN_CONF confidence, again at full resolution.
+OCR_SCAN_DPI = int(os.getenv("OCR_SCAN_DPI", "100"))
+OCR_MIN_CONF = float(os.getenv("OCR_MIN_CONF", "60"))
+
+# Parsed transcripts are cached by SHA-256 of the PDF bytes. Bump EXTRACTOR_VERSION when
+# page extraction/OCR changes and PARSER_VERSION when the row/ID regexes change; the raw
+# text is keyed by the extractor version only, so a parser bump re-parses cached text.
+EXTRACTOR_VERSION = 3
+PARSER_VERSION = 1
+CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE", "1") != "0"
+CACHE_PATH = os.getenv("TRANSCRIPT_CACHE_PATH", os.path.join(DATA_DIR, "cache", "transcripts.sqlite"))
+
+# Optional progress callback: progress(stage, done, total), stage is "extracting" (text
+# pages), "ocr" (scanned pages) or "parsing". Used by background jobs (core/jobs.py).
+Progress = Optional[Callable[..., None]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_cache: Optional[TieredCache] = None
+
+# Course rows: term, code, credits, grade, in that order on one line, with any junk in
+# between and optional quotes around each field (the CSV-style rows built from tables):
+#   "2205" ... "EGN 4950 C" ... "3.00" ... "B+"
+# This used to be one regex with lazy .*? gaps between the groups, run over the whole
+# text, which backtracks polynomially on long noisy OCR lines. _scan_rows finds the same
+# matches from the runs of digits / capitals on each line, in linear time:
+#  - term: the first 4 digits on the line (from the search position) followed by a code;
+#  - code: 3-4 capitals, optional spaces/tabs, 3-4 digits, optional [ \t]*letter suffix,
+#    the longest form that still leaves a credits field after it;
+#  - credits: digits "." 1-2 digits with a capital letter somewhere after;
+#  - grade: the first 1-2 capitals after the credits, optional +/-.
+# Matching resumes after the grade (and its closing quote), like finditer.
+_DIGITS = re.compile(r"\d+")
+_CAPS = re.compile(r"[A-Z]+")
+_SPACES = re.compile(r"[ \t]*")
+_ASCII_LETTERS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+
+def _scan_rows(line: str):
+    """Yield (term, code, credits, grade) for every course row on one line."""
+    n = len(line)
+    digits = [m.span() for m in _DIGITS.finditer(line)]
+    caps = [m.span() for m in _CAPS.finditer(line)]
+    if not digits or not caps:
+        return
+    last_cap = caps[-1][1] - 1
+    run_end = dict(digits)
+
+    # Digit runs that can start a credits field: "<run>.<d>[d]" with a capital after it.
+    credits: List[tuple] = []
+    for ds, de in digits:
+        if de + 1 < n and line[de] == "." and de + 1 in run_end:
+            end = de + 3 if line[de + 2:de + 3].isdecimal() else de + 2
+            if end <= last_cap:
+                credits.append((ds, de, end))
+    if not credits:
+        return
+    credit_ends = [c[1] for c in credits]
+    last_credit = credits[-1][1] - 1  # a code must end at or before this position
+
+    # Capital runs that can end in a code: their last 3-4 letters, spaces, 3+ digits.
+    codes: List[tuple] = []
+    for us, ue in caps:
+        if ue - us < 3:
+            continue
+        p = _SPACES.match(line, ue).end() if line[ue:ue + 1] in " \t" else ue
+        de = run_end.get(p)
+        if de is not None and de - p >= 3 and p + 3 <= last_credit:
+            codes.append((max(us, ue - 4), p, de))
+    if not codes:
+        return
+    code_starts = [c[0] for c in codes]
+    cap_starts = [c[0] for c in caps]
+    last_term = code_starts[-1] - 4
+
+    pos, d = 0, 0
+    while d < len(digits):
+        ds, de = digits[d]
+        t = max(ds, pos)
+        if t > last_term:
+            return
+        if de - t < 4:
+            d += 1
+            continue
+        c, p, dend = codes[bisect_left(code_starts, t + 4)]
+        # Longest code form first: 4 digits + suffix, 4 digits, then 3 digits (+ suffix).
+        for nd in ((4, 3) if dend - p >= 4 else (3,)):
+            x = p + nd
+            y = _SPACES.match(line, x).end() if line[x:x + 1] in " \t" else x
+            if y < n and line[y] in _ASCII_LETTERS and y + 1 <= last_credit:
+                e = y + 1
+                break
+            if x <= last_credit:
+                e = x
+                break
+        k = bisect_right(credit_ends, e)
+        cs, cde, cend = credits[k]
+        g = caps[bisect_left(cap_starts, cend)][0]
+        ge = g + 2 if g + 1 < n and "A" <= line[g + 1] <= "Z" else g + 1
+        if ge < n and line[ge] in "+-":
+            ge += 1
+        grade = line[g:ge]
+        if ge < n and line[ge] in "\"'":
+            ge += 1
+        yield line[t:t + 4], line[c:e], line[max(cs, e):cend], grade
+        pos = ge
+        while d < len(digits) and digits[d][1] <= pos:
+            d += 1
 
 ID_REGEX       = re.compile(r"\b(Z\d{7,9})\b")
 NAME_REGEX     = re.compile(r"Name[:\s]+([A-Z][A-Za-z\-']+(?:\s[A-Z][A-Za-z\-']+)*)")
 TRANSFER_REGEX = re.compile(r"Transfer\s+Credits[:\s]+(\d+)", re.IGNORECASE)
-
-def _has_text(pdf_bytes: bytes) -> bool:
-    try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            for p in pdf.pages[:3]:
-                if (p.extract_text() or "").strip():
-                    return True
-    except Exception:
-        pass
-    return False
+# Loose "looks like a course row" hints for the low-DPI OCR pass.
+_TERM_HINT = re.compile(r"\b\d{4}\b")
+_CODE_HINT = re.compile(r"\b[A-Z]{3,4} ?\d{3,4}")
 
 def _explode_row(row: List[str]) -> List[List[str]]:
     """
@@ -57,44 +155,221 @@ def _explode_row(row: List[str]) -> List[List[str]]:
         new_rows.append(new_row)
     return new_rows
 
-def _extract_text(pdf_bytes: bytes) -> str:
-    out = []
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for p in pdf.pages:
-            # 1. Extract raw text for ID/Name search
-            t = p.extract_text() or ""
-            out.append(t)
-            try:
-                # 2. Extract tables to catch the course data
-                for tbl in (p.extract_tables() or []):
-                    for row in tbl:
-                        # Explode multiline rows into separate single lines
-                        sub_rows = _explode_row(row)
-                        for sub_row in sub_rows:
-                            # Reconstruct CSV-style row
-                            cleaned_row = [f'"{c}"' if c else "" for c in sub_row]
-                            out.append(",".join(cleaned_row))
-            except Exception:
-                pass
+def get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        _cache = TieredCache("transcripts", CACHE_PATH, max_items=256, ttl=30 * 24 * 3600)
+    return _cache
+
+def _page_text(page, text=None) -> str:
+    # 1. Raw text for ID/Name search
+    out = [(page.extract_text() or "") if text is None else text]
+    try:
+        # 2. Tables, to catch the course data
+        for tbl in (page.extract_tables() or []):
+            for row in tbl:
+                # Explode multiline rows into separate single lines
+                for sub_row in _explode_row(row):
+                    # Reconstruct CSV-style row
+                    out.append(",".join(f'"{c}"' if c else "" for c in sub_row))
+    except Exception:
+        pass
     return "\n".join(out)
 
-def _extract_ocr(pdf_bytes: bytes, dpi=200) -> str:
-    images = convert_from_bytes(pdf_bytes, dpi=dpi)
-    return "\n".join(pytesseract.image_to_string(img.convert("L")) for img in images)
+def _text_pages(pdf_bytes: bytes, first: int, last: int) -> List[str]:
+    """Pool worker: text + table rows for pages [first, last)."""
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return [_page_text(p) for p in pdf.pages[first:last]]
+
+def _rasterize(pdf_bytes: bytes, first: int, last: Optional[int], dpi: int, folder: str) -> List[str]:
+    """Image files of pages [first, last) (last=None: to the end) at `dpi` in `folder`:
+    one pdfinfo and one pdftoppm run for the whole range."""
+    from pdf2image import convert_from_bytes
+    return convert_from_bytes(pdf_bytes, dpi=dpi, first_page=first + 1, last_page=last, grayscale=True,
+                              output_folder=folder, paths_only=True)
+
+def _ocr_lines(data: Dict) -> List[tuple]:
+    """Words from pytesseract.image_to_data grouped into lines: (top, bottom, text, conf), top to
+    bottom, conf being the lowest word confidence on the line (0-100)."""
+    lines: Dict[tuple, list] = {}
+    for i, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        top, h = data["top"][i], data["height"][i]
+        conf = float(data["conf"][i]) if "conf" in data else 100.0
+        ln = lines.setdefault(key, [top, top + h, [], conf])
+        ln[0], ln[1], ln[3] = min(ln[0], top), max(ln[1], top + h), min(ln[3], conf)
+        ln[2].append((data["left"][i], word))
+    return sorted((t, b, " ".join(w for _, w in sorted(words)), c) for t, b, words, c in lines.values())
+
+def _is_key_line(text: str) -> bool:
+    """Course rows and the ID / name / transfer lines: the parts worth a full-resolution pass."""
+    if _TERM_HINT.search(text) and _CODE_HINT.search(text):
+        return True
+    return bool(ID_REGEX.search(text) or NAME_REGEX.search(text) or TRANSFER_REGEX.search(text))
+
+def _table_regions(lines: List[tuple], pad: int, min_conf: float = 0) -> List[tuple]:
+    """Full-width horizontal bands (top, bottom) around runs of key lines and of lines read with
+    a confidence below `min_conf` (a row the scan pass garbled), padded and merged."""
+    bands: List[list] = []
+    for top, bottom, text, conf in lines:
+        if not (_is_key_line(text) or conf < min_conf):
+            continue
+        top, bottom = max(0, top - pad), bottom + pad
+        if bands and top <= bands[-1][1]:
+            bands[-1][1] = max(bands[-1][1], bottom)
+        else:
+            bands.append([top, bottom])
+    return [tuple(b) for b in bands]
+
+def _ocr_page(full, dpi: int, scan_dpi: int) -> str:
+    """OCR one page rendered at `dpi`: a pass over a `scan_dpi` downscale of it, then the key
+    and low-confidence bands again on the full-resolution image."""
+    import pytesseract
+    from PIL import Image
+    scale = dpi / scan_dpi
+    low = full if scale <= 1 else full.resize((round(full.width / scale), round(full.height / scale)),
+                                             Image.Resampling.BOX)
+    lines = _ocr_lines(pytesseract.image_to_data(low, output_type=pytesseract.Output.DICT))
+    if scale <= 1:
+        return "\n".join(text for _, _, text, _ in lines)
+    bands = _table_regions(lines, pad=max(2, scan_dpi // 12), min_conf=OCR_MIN_CONF)
+    # Lines outside the bands keep their low-DPI text.
+    out = [(top, text) for top, bottom, text, _ in lines
+           if not any(b0 <= (top + bottom) / 2 <= b1 for b0, b1 in bands)]
+    for b0, b1 in bands:
+        crop = full.crop((0, int(b0 * scale), full.width, min(full.height, int(b1 * scale) + 1)))
+        out.append((b0, pytesseract.image_to_string(crop, config="--psm 6").strip()))
+    return "\n".join(text for _, text in sorted(out))
+
+def _ocr_pages(pdf_bytes: bytes, first: int, last: Optional[int], dpi: int) -> List[str]:
+    """Pool worker: OCR of pages [first, last); last=None means to the end. The range is
+    rasterized once to a temp dir and the pages are loaded one at a time, so memory is one
+    page's bitmaps."""
+    from PIL import Image
+    out: List[str] = []
+    with tempfile.TemporaryDirectory(prefix="ocr-") as folder:
+        for path in _rasterize(pdf_bytes, first, last, dpi, folder):
+            with Image.open(path) as img:
+                out.append(_ocr_page(img, dpi, OCR_SCAN_DPI))
+            os.remove(path)
+    return out
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if PDF_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the API process runs threads (uvicorn, threadpool).
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=get_context("spawn"))
+        return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+def _fan_out(fn, pdf_bytes: bytes, n: int, workers: int, *args, progress: Progress = None) -> List[str]:
+    """Run fn over contiguous page ranges in the pool; results come back in page order.
+
+    With `progress`, it is called with (pages done, n) as ranges finish (page by page
+    when running in-process)."""
+    pool = get_pool() if workers > 1 else None
+    if pool is None:
+        if progress is None:
+            return fn(pdf_bytes, 0, n, *args)
+        out: List[str] = []
+        for i in range(n):
+            out += fn(pdf_bytes, i, i + 1, *args)
+            progress(i + 1, n)
+        return out
+    step = -(-n // min(workers, n))
+    futures = {pool.submit(fn, pdf_bytes, i, min(i + step, n), *args): min(step, n - i) for i in range(0, n, step)}
+    try:
+        if progress is not None:
+            done = 0
+            for f in as_completed(futures):
+                f.result()
+                done += futures[f]
+                progress(done, n)
+        return [t for f in futures for t in f.result()]
+    except BrokenProcessPool:
+        # A worker died (OOM on a huge scan, killed); start a fresh pool next time.
+        shutdown_pool()
+        return _fan_out(fn, pdf_bytes, n, 1, *args, progress=progress)
+
+def _extract(pdf_bytes: bytes, dpi: int = 200, workers: Optional[int] = None, progress: Progress = None) -> str:
+    """Text of every page in order: pdfplumber text + tables, or OCR when the PDF has no text layer.
+
+    The document is opened once here to count pages and probe the first three for text;
+    small text PDFs are finished on that handle, everything else is split into page ranges
+    for the process pool (PDF_WORKERS). The two halves are the stages pdf.text (pdfplumber,
+    probe included) and pdf.ocr (pdfinfo, rasterizing and tesseract).
+    """
+    workers = PDF_WORKERS if workers is None else workers
+    with span("pdf.text"):
+        n, text = _extract_text(pdf_bytes, workers, progress)
+    if text is not None:
+        return text
+    with span("pdf.ocr"):
+        return _extract_ocr(pdf_bytes, n, dpi, workers, progress)
+
+def _report(progress: Progress, stage: str):
+    return (lambda done, total: progress(stage, done, total)) if progress else None
+
+def _extract_text(pdf_bytes: bytes, workers: int, progress: Progress) -> Tuple[int, Optional[str]]:
+    """(page count or 0, text), text being None when the PDF has no text layer to read."""
+    import pdfplumber
+    try:
+        pdf = pdfplumber.open(io.BytesIO(pdf_bytes))
+    except Exception:
+        return 0, None
+    with pdf:
+        n = len(pdf.pages)
+        try:
+            head = [p.extract_text() or "" for p in pdf.pages[:3]]
+        except Exception:
+            head = []
+        if not any(t.strip() for t in head):
+            return n, None
+        if workers <= 1 or n <= INLINE_PAGES:
+            text = "\n".join(_page_text(p, head[i] if i < len(head) else None) for i, p in enumerate(pdf.pages))
+            if progress:
+                progress("extracting", n, n)
+            return n, text
+    return n, "\n".join(_fan_out(_text_pages, pdf_bytes, n, workers, progress=_report(progress, "extracting")))
+
+def _extract_ocr(pdf_bytes: bytes, n: int, dpi: int, workers: int, progress: Progress) -> str:
+    from pdf2image import pdfinfo_from_bytes
+    if not n:
+        try:
+            n = int(pdfinfo_from_bytes(pdf_bytes)["Pages"])
+        except Exception:
+            # No page count (pdfinfo failed): OCR whatever poppler renders, in-process.
+            return "\n".join(_ocr_pages(pdf_bytes, 0, None, dpi))
+    if progress:
+        progress("ocr", 0, n)
+    # OCR is seconds per page, so even two pages are worth splitting.
+    return "\n".join(_fan_out(_ocr_pages, pdf_bytes, n, workers, dpi, progress=_report(progress, "ocr")))
 
 def _parse_courses(text: str) -> List[Dict]:
     recs: List[Dict] = []
-    for m in COURSE_ROW_REGEX.finditer(text):
-        # Normalize: "EGN 4950 C" -> "EGN4950C"
-        raw_code = m.group("code")
-        clean_code = raw_code.replace(" ", "")
-        
-        recs.append({
-            "code": clean_code, 
-            "term": m.group("term"), 
-            "grade": m.group("grade"), 
-            "credits": float(m.group("credits"))
-        })
+    for line in text.split("\n"):
+        if "." not in line:
+            continue
+        for term, raw_code, credits, grade in _scan_rows(line):
+            # Normalize: "EGN 4950 C" -> "EGN4950C"
+            recs.append({
+                "code": raw_code.replace(" ", ""),
+                "term": term,
+                "grade": grade,
+                "credits": float(credits)
+            })
     
     seen, uniq = set(), []
     for r in recs:
@@ -104,12 +379,8 @@ def _parse_courses(text: str) -> List[Dict]:
             uniq.append(r)
     return uniq
 
-def pdf_to_transcript(pdf_bytes: bytes) -> Dict:
-    text = _extract_text(pdf_bytes) if _has_text(pdf_bytes) else _extract_ocr(pdf_bytes)
-    
-    # DEBUG: View the first 500 characters to verify rows are split correctly
-    # print("DEBUG TEXT:", text[:500])
-    
+@timed("pdf.parse")
+def transcript_from_text(text: str) -> Dict:
     courses = _parse_courses(text)
     
     student_id = ID_REGEX.search(text).group(1) if ID_REGEX.search(text) else None
@@ -127,12 +398,42 @@ def pdf_to_transcript(pdf_bytes: bytes) -> Dict:
         "transfer_credits": transfer
     }
 
+def _cached_text(pdf_bytes: bytes, digest: str, dpi: int, cache: bool, progress: Progress = None) -> str:
+    if not cache:
+        return _extract(pdf_bytes, dpi=dpi, progress=progress)
+    key = content_key("text", EXTRACTOR_VERSION, dpi, digest)
+    text = get_cache().get(key)
+    if text is None:
+        text = _extract(pdf_bytes, dpi=dpi, progress=progress)
+        get_cache().set(key, text)
+    return text
+
+def pdf_to_transcript(pdf_bytes: bytes, dpi: int = 200, cache: bool = CACHE_ENABLED, progress: Progress = None) -> Dict:
+    """Parsed transcript for a PDF. Repeat uploads of the same bytes come from the cache."""
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    key = content_key("transcript", EXTRACTOR_VERSION, PARSER_VERSION, dpi, digest)
+    hit = get_cache().get(key) if cache else None
+    if hit is not None:
+        return copy.deepcopy(hit)
+    text = _cached_text(pdf_bytes, digest, dpi, cache, progress)
+
+    # DEBUG: View the first 500 characters to verify rows are split correctly
+    # print("DEBUG TEXT:", text[:500])
+
+    if progress:
+        progress("parsing", 0, 0)
+    transcript = transcript_from_text(text)
+    if cache:
+        get_cache().set(key, copy.deepcopy(transcript))
+    return transcript
+
 
-def extract_text_and_courses(pdf_bytes: bytes, dpi=200) -> Dict:
+def extract_text_and_courses(pdf_bytes: bytes, dpi=200, cache: bool = CACHE_ENABLED) -> Dict:
     """Dev helper: return the extracted raw text and the parsed course rows.
 
-    Use this via a debug endpoint to inspect what the parser sees from a PDF.
+    Use this via a debug endpoint to inspect what the parser sees from a PDF. The text is
+    cached per PDF, but courses are always re-parsed, so regex changes show up immediately.
     """
-    text = _extract_text(pdf_bytes) if _has_text(pdf_bytes) else _extract_ocr(pdf_bytes, dpi=dpi)
+    text = _cached_text(pdf_bytes, hashlib.sha256(pdf_bytes).hexdigest(), dpi, cache)
     courses = _parse_courses(text)
-    return {"text": text, "courses": courses}
\ No newline at end of file
+    return {"text": text, "courses": courses}
@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Optional
+from .audit import audit_program
+from .catalog import as_program
+from .planner import MAX_CREDITS, greedy_plan
+from .records import as_transcript
+from .scheduler import rank_schedules
+
+# One advising page in one call: parse -> audit -> plan -> schedule. Each stage runs at
+# most once and hands its result to the next (the plan reuses the audit, the schedule the
+# plan). A requested stage pulls in the stages it needs, and every stage that ran is in
+# the result. Parsing is the caller's job (PDF bytes in app.py); this starts from a
+# transcript, or from planned_terms when only a schedule is wanted.
+STAGES = ("audit", "plan", "schedule")
+NEEDS = {"audit": (), "plan": ("audit",), "schedule": ("plan",)}
+
+
+def resolve_stages(stages: List[str], have_plan: bool = False) -> List[str]:
+    """Requested stages plus their prerequisites, in pipeline order. With `have_plan` the plan
+    is only run when asked for by name. Raises ValueError on an unknown stage."""
+    unknown = [s for s in stages if s not in NEEDS]
+    if unknown:
+        raise ValueError(f"unknown stage(s) {unknown}; choose from {list(STAGES)}")
+    run = set()
+    todo = list(stages)
+    while todo:
+        s = todo.pop()
+        if s in run or (s == "plan" and have_plan and s not in stages):
+            continue
+        run.add(s)
+        todo.extend(NEEDS[s])
+    return [s for s in STAGES if s in run]
+
+
+def schedule_terms(planned_terms: List[Dict], offerings: Dict[str, Dict], terms: Optional[List[str]] = None,
+                   alternatives: int = 0) -> List[Dict]:
+    """Sections for each planned term in `terms` (default: the first planned term).
+    `offerings` maps term -> offerings document; terms without one are marked unavailable."""
+    by_term = {t["term"]: t for t in planned_terms}
+    wanted = terms if terms is not None else [t["term"] for t in planned_terms[:1]]
+    out = []
+    for term in wanted:
+        planned, doc = by_term.get(term), offerings.get(term)
+        if planned is None or doc is None:
+            out.append({"term": term, "available": False, "chosen_sections": [], "needs_overrides": [],
+                        "alternatives": []})
+            continue
+        schedules = rank_schedules(planned["courses"], doc, k=1 + max(0, alternatives))
+        chosen = schedules[0] if schedules else []
+        out.append({"term": term, "available": True, "chosen_sections": chosen,
+                    "needs_overrides": [x for x in chosen if x.get("note")], "alternatives": schedules[1:]})
+    return out
+
+
+def run_pipeline(transcript, program, stages: List[str], term_sequence: List[str],
+                 offerings: Dict[str, Dict], max_credits: int = MAX_CREDITS,
+                 planned_terms: Optional[List[Dict]] = None, terms: Optional[List[str]] = None,
+                 alternatives: int = 0) -> Dict[str, Any]:
+    """Run `stages` (see resolve_stages) and return {"stages": [...ran], "audit", "planned_terms", "schedules"}."""
+    run = resolve_stages(stages, have_plan=planned_terms is not None)
+    if transcript is None and ("audit" in run or "plan" in run):
+        raise ValueError("a transcript is required for the audit and plan stages")
+    program = as_program(program)
+    out: Dict[str, Any] = {"stages": run}
+    record = as_transcript(transcript) if transcript is not None else None
+    audit = None
+    if "audit" in run:
+        audit = out["audit"] = audit_program(record, program)
+    if "plan" in run:
+        _, planned_terms = greedy_plan(record, program, term_sequence, max_credits, audit=audit)
+        out["planned_terms"] = planned_terms
+    if "schedule" in run:
+        out["schedules"] = schedule_terms(planned_terms or [], offerings, terms, alternatives)
+    return out
@@ -0,0 +1,251 @@
+import os, time
+from typing import Dict, List, Optional, Tuple
+from .audit import audit_program
+from .catalog import Program, as_program
+from .metrics import timed
+from .planner import MAX_CREDITS, chain_lengths, collect_missing_courses, plan_courses, plannable
+from .records import as_transcript
+
+# Top-K alternative plans. greedy_plan commits to one plan and to the first `need`
+# electives of each choose_n pool; this searches elective choices and term assignments
+# together. It is a beam search over terms whose state is the bitset of satisfied or
+# planned courses: each state branches into a few maximal term loads, states reaching the
+# same bitset are merged (keeping the better one), and a bitset already reached in an
+# earlier term is dropped since it can only finish later. Plans are ranked by
+#   complete first (fewest courses still missing otherwise), then terms to graduate, seat
+#   problems, credit spread, total credits,
+# where a seat problem is a course planned in a term whose offerings have no open section
+# for it. A plan is complete only when it covers everything the audit reports missing;
+# requirement courses that can't be planned (a prereq outside the program) are listed in
+# "missing" instead. The greedy plan is always a candidate, so the best plan is never worse than it.
+# Once `budget_ms` is spent the beam narrows to K states and one load each to finish.
+BEAM_WIDTH = int(os.getenv("PLAN_SEARCH_BEAM", "24"))
+BRANCH = int(os.getenv("PLAN_SEARCH_BRANCH", "6"))  # term loads tried per state
+BUDGET_MS = float(os.getenv("PLAN_SEARCH_BUDGET_MS", "150"))
+NODE_LIMIT = 400  # include/exclude steps per state and term
+
+
+class _Goal:
+    """What the audit still asks for, as bitsets over the program's course index.
+
+    `all_required` / `all_groups` are the audit's full missing set and decide whether a plan
+    is complete; `required` / `groups` are the part that can be planned at all (see
+    planner.plannable) and are what the search aims for."""
+    __slots__ = ("all_required", "all_groups", "required", "support", "groups", "candidates", "chain",
+                 "electives")
+
+    def __init__(self, program: Program, audit: List[Dict], done: int):
+        required = program.mask(c for r in audit if r["type"] == "all_of" for c in r["details"]["missing"]) & ~done
+        pools = []
+        for r in audit:
+            if r["type"] == "choose_n" and not r["met"]:
+                pool = program.mask(c for c in r["details"]["pool"] if c not in r["details"]["done"]) & ~done
+                pools.append((pool, r["details"]["need"]))
+        self.all_required, self.all_groups = required, pools
+        cand = required
+        for pool, _ in pools:
+            cand |= pool
+        # Like plan_courses, only requirement courses are planned, and only once each direct
+        # prereq is done or plannable itself.
+        cand = sum(1 << i for i in plannable(program, done, set(_bits(cand))))
+        self.required = required & cand
+        self.groups = [(pool & cand, min(need, _popcount(pool & cand))) for pool, need in pools]
+        self.groups = [(pool, need) for pool, need in self.groups if need]
+        self.support = 0  # prereqs still to take on the way to a required course
+        todo = list(_bits(self.required))
+        while todo:
+            for p in program.prereq_idx[todo.pop()]:
+                if cand >> p & 1 and not self.support >> p & 1:
+                    self.support |= 1 << p
+                    todo.append(p)
+        self.candidates = cand
+        self.electives = cand & ~(self.required | self.support)
+        # Chains through required courses only, so terms-left stays a lower bound.
+        self.chain = chain_lengths(program, set(_bits(self.required | self.support)))
+
+    def needs(self, mask: int) -> List[int]:
+        return [max(0, need - _popcount(pool & mask)) for pool, need in self.groups]
+
+    def reached(self, mask: int) -> bool:
+        """Everything plannable is planned: nothing left for the search to add."""
+        return not self.required & ~mask and not any(self.needs(mask))
+
+    def met(self, mask: int) -> bool:
+        """Every missing requirement of the audit is covered."""
+        return not self.all_required & ~mask and all(_popcount(pool & mask) >= need for pool, need in self.all_groups)
+
+
+def _bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def _blocked(doc: Optional[Dict], code: str) -> bool:
+    return doc is not None and doc.get("open", {}).get(code, 0) == 0
+
+
+def _loads(program: Program, goal: _Goal, mask: int, doc: Optional[Dict], max_credits: int,
+           branch: int) -> List[List[int]]:
+    """Up to `branch` maximal term loads from the courses ready at `mask`, the first one being
+    what the greedy planner would take (longest chain first, seat-blocked courses last)."""
+    needs = goal.needs(mask)
+    open_groups = 0
+    for k, (pool, _) in enumerate(goal.groups):
+        if needs[k]:
+            open_groups |= pool
+    useful = (goal.required | goal.support | open_groups) & ~mask
+    ready = [i for i in _bits(useful) if all(mask >> p & 1 for p in program.prereq_idx[i])]
+    ready.sort(key=lambda i: (_blocked(doc, program.codes[i]), not (goal.required | goal.support) >> i & 1,
+                              -goal.chain.get(i, 1), program.codes[i]))
+    groups_of = [[k for k, (pool, _) in enumerate(goal.groups) if pool >> i & 1] for i in ready]
+    essential = [(goal.required | goal.support) >> i & 1 for i in ready]
+    credits = [program.credits[i] for i in ready]
+    blocked = [_blocked(doc, program.codes[i]) for i in ready]
+
+    out: List[List[int]] = []
+    picked: List[int] = []
+    steps = 0
+
+    def fits(j: int, room: int) -> bool:
+        return credits[j] <= room and (essential[j] or any(needs[k] for k in groups_of[j]))
+
+    def walk(j: int, room: int):
+        nonlocal steps
+        steps += 1
+        if len(out) >= branch or steps > NODE_LIMIT:
+            return
+        if j == len(ready):
+            # Maximal loads only: anything left out must not fit, not be needed, or have no
+            # open section this term.
+            chosen = set(picked)
+            if picked and not any(fits(x, room) and not blocked[x] for x in range(len(ready))
+                                  if ready[x] not in chosen):
+                out.append(list(picked))
+            return
+        if fits(j, room):
+            picked.append(ready[j])
+            for k in groups_of[j]:
+                needs[k] -= 1
+            walk(j + 1, room - credits[j])
+            for k in groups_of[j]:
+                needs[k] += 1
+            picked.pop()
+        walk(j + 1, room)
+
+    walk(0, max_credits)
+    return out
+
+
+def _describe(program: Program, goal: _Goal, terms: List[Tuple[str, List[int]]], done: int,
+              offerings: Dict[str, Dict]) -> Dict:
+    planned, seats, chosen = [], [], done
+    for term, idx in terms:
+        courses = sorted(program.codes[i] for i in idx)
+        planned.append({"term": term, "courses": courses, "credits": sum(program.credits[i] for i in idx)})
+        seats += [{"term": term, "course": c} for c in courses if _blocked(offerings.get(term), c)]
+        for i in idx:
+            chosen |= 1 << i
+    loads = [t["credits"] for t in planned[:-1]]
+    return {"planned_terms": planned, "complete": goal.met(chosen), "terms": len(planned),
+            "credits": sum(t["credits"] for t in planned), "credit_spread": max(loads) - min(loads) if loads else 0,
+            "seat_issues": seats, "electives": sorted(program.codes[i] for i in _bits(chosen & ~done & goal.electives)),
+            "missing": sorted(program.codes[i] for i in _bits(goal.all_required & ~chosen)),
+            "electives_short": sum(max(0, need - _popcount(pool & chosen)) for pool, need in goal.all_groups)}
+
+
+def _rank(plan: Dict):
+    return (not plan["complete"], len(plan["missing"]) + plan["electives_short"], plan["terms"], len(plan["seat_issues"]), plan["credit_spread"], plan["credits"],
+            [t["courses"] for t in plan["planned_terms"]])
+
+
+@timed("plan_search")
+def search_plans(transcript, program, term_sequence: List[str], k: int = 3, max_credits: int = MAX_CREDITS,
+                 offerings: Optional[Dict[str, Dict]] = None, audit: Optional[List[Dict]] = None,
+                 budget_ms: float = BUDGET_MS, beam_width: int = BEAM_WIDTH) -> Dict:
+    """{"audit", "plans": best `k` plans (see _describe), "timed_out", "states"}.
+    `offerings` maps term -> offerings document (OfferingsStore.snapshot())."""
+    program = as_program(program)
+    transcript = as_transcript(transcript)
+    offerings = offerings or {}
+    if audit is None:
+        audit = audit_program(transcript, program)
+    done = transcript.mask(program)
+    goal = _Goal(program, audit, done)
+    deadline = time.perf_counter() + budget_ms / 1000
+    timed_out = False
+
+    greedy = plan_courses(program, transcript.completed, collect_missing_courses(audit), term_sequence, max_credits)
+    plans = [_describe(program, goal, [(t["term"], [program.index[c] for c in t["courses"]]) for t in greedy],
+                       done, offerings)]
+
+    # state: (mask, [(term, [course idx])])
+    beam: List[Tuple[int, List]] = [(done, [])]
+    first_seen: Dict[int, int] = {done: -1}
+    states = 0
+    for depth, term in enumerate(term_sequence):
+        if not beam:
+            break
+        doc = offerings.get(term)
+        branch, width = BRANCH, beam_width
+        if timed_out or time.perf_counter() > deadline:
+            timed_out, branch, width = True, 1, k
+            beam = beam[:k]
+        merged: Dict[int, Tuple] = {}
+        for mask, terms in beam:
+            loads = _loads(program, goal, mask, doc, max_credits, branch)
+            if not loads:
+                plans.append(_describe(program, goal, terms, done, offerings))
+                continue
+            for load in loads:
+                states += 1
+                new = mask
+                for i in load:
+                    new |= 1 << i
+                if first_seen.get(new, depth) < depth:
+                    continue
+                first_seen[new] = depth
+                path = terms + [(term, load)]
+                if goal.reached(new):
+                    plans.append(_describe(program, goal, path, done, offerings))
+                    continue
+                key = _partial_rank(program, goal, new, path, offerings, max_credits)
+                if new not in merged or key < merged[new][0]:
+                    merged[new] = (key, new, path)
+        ranked = sorted(merged.values(), key=lambda s: s[0])
+        beam = [(m, p) for _, m, p in ranked[:width]]
+        finished = sorted(p["terms"] for p in plans if p["complete"])
+        if len(finished) >= k and ranked and finished[k - 1] < ranked[0][0][0]:
+            beam = []  # every state left needs more terms than the k plans already found
+    for mask, terms in beam:
+        plans.append(_describe(program, goal, terms, done, offerings))
+
+    seen, best = set(), []
+    for plan in sorted(plans, key=_rank):
+        key = tuple(tuple(t["courses"]) for t in plan["planned_terms"])
+        if key not in seen:
+            seen.add(key)
+            best.append(plan)
+    return {"audit": audit, "plans": best[:k], "timed_out": timed_out, "states": states}
+
+
+def _partial_rank(program: Program, goal: _Goal, mask: int, path: List, offerings: Dict[str, Dict],
+                  max_credits: int):
+    """Beam order: lower bound on terms to graduate, then seat problems and spread so far."""
+    left = goal.required & ~mask
+    credits = sum(program.credits[i] for i in _bits(left))
+    longest = max((goal.chain.get(i, 1) for i in _bits(left)), default=0)
+    for (pool, _), need in zip(goal.groups, goal.needs(mask)):
+        if need:
+            cheapest = sorted(program.credits[i] for i in _bits(pool & ~mask))[:need]
+            credits += sum(cheapest)
+            longest = max(longest, 1)
+    bound = len(path) + max(-(-credits // max_credits), longest)
+    seats = sum(_blocked(offerings.get(term), program.codes[i]) for term, idx in path for i in idx)
+    loads = [sum(program.credits[i] for i in idx) for _, idx in path]
+    return (bound, seats, max(loads) - min(loads), -sum(loads))
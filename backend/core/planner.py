@@ -1,5 +1,23 @@
-from typing import Dict, List, Set
+import heapq
+from typing import Dict, Iterable, List, Optional, Set
 from .audit import audit_program
+from .catalog import Program, as_program
+from .metrics import timed
+from .records import as_transcript
+
+MAX_CREDITS = 15
+CREDIT_RANGE = (1, 30)  # what a client-sent max_credits preference is clamped to
+
+def credit_limit(preferences) -> int:
+    """The `max_credits` preference (client JSON) as a term load: MAX_CREDITS when it is
+    missing or not a number, otherwise clamped to CREDIT_RANGE."""
+    value = preferences.get("max_credits") if isinstance(preferences, dict) else None
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return MAX_CREDITS
+    return min(max(value, CREDIT_RANGE[0]), CREDIT_RANGE[1])
+
 def collect_missing_courses(audit_results) -> Set[str]:
     missing = set()
     for r in audit_results:
@@ -14,27 +32,69 @@ def collect_missing_courses(audit_results) -> Set[str]:
     return missing
 def eligible(course: str, prereqs: Dict[str, List[str]], satisfied: Set[str]) -> bool:
     return all(p in satisfied for p in prereqs.get(course, []))
-def greedy_plan(transcript, program, term_sequence: List[str]):
-    prereqs = program.get("prereqs", {})
-    meta = program["course_meta"]
-    satisfied = {t["code"] for t in transcript["taken"]}
-    audit = audit_program(transcript, program)
-    remaining = list(collect_missing_courses(audit))
+def plannable(program: Program, done_mask: int, todo: Set[int]) -> Set[int]:
+    """Courses of `todo` whose direct prereqs are each satisfied or plannable themselves.
+    Only unsatisfied prereqs are followed: a taken course counts whatever its own prereqs."""
+    ok: Set[int] = set()
+    for i in program.topo:
+        if i in todo and all(done_mask >> p & 1 or p in ok for p in program.prereq_idx[i]):
+            ok.add(i)
+    return ok
+def chain_lengths(program: Program, todo: Set[int]) -> Dict[int, int]:
+    """Longest chain of still-to-plan courses that each course unlocks (itself included)."""
+    chain: Dict[int, int] = {}
+    for i in reversed(program.topo):
+        if i in todo:
+            chain[i] = 1 + max((chain[d] for d in program.dependents_idx[i] if d in todo), default=0)
+    return chain
+@timed("plan")
+def plan_courses(program: Program, satisfied: Iterable[str], remaining: Iterable[str],
+                 term_sequence: List[str], max_credits: int = MAX_CREDITS) -> List[Dict]:
+    """Topological layering with critical-path priority.
+
+    A course is ready once every prereq is satisfied or planned in an earlier term; each
+    term is filled from the ready set by longest remaining prereq chain first, so long
+    chains start early. Courses whose prereqs can never be met are left unplanned.
+    """
+    index = program.index
+    done_mask = program.mask(satisfied)
+    todo = plannable(program, done_mask, {index[c] for c in remaining if c in index and not done_mask >> index[c] & 1})
+    chain = chain_lengths(program, todo)
+    pending = {i: sum(1 for p in program.prereq_idx[i] if p in todo) for i in todo}
+    ready = [(-chain[i], program.codes[i], i) for i in todo if pending[i] == 0]
+    heapq.heapify(ready)
+
     planned_terms = []
-    already_planned = set()
-    # Only plan as many terms as needed to finish all missing courses.
+    left = len(todo)
     for term in term_sequence:
-        bucket, credits = [], 0
-        for c in sorted(list(remaining)):
-            if c in already_planned:
-                continue
-            cr = meta[c]["credits"]
-            if eligible(c, prereqs, satisfied) and credits + cr <= 15:
-                bucket.append(c); credits += cr; satisfied.add(c); already_planned.add(c)
-        remaining = [c for c in remaining if c not in bucket]
-        if bucket:
-            planned_terms.append({"term": term, "courses": bucket, "credits": credits})
-        if not remaining:
-            # Early exit: all requirements are planned, so stop adding terms.
+        if not left or not ready:
             break
-    return audit, planned_terms
+        bucket, credits, skipped, unlocked = [], 0, [], []
+        while ready and credits < max_credits:
+            item = heapq.heappop(ready)
+            cr = program.credit(item[1])
+            if credits + cr > max_credits:
+                skipped.append(item); continue
+            bucket.append(item[1]); credits += cr; unlocked.append(item[2])
+        for item in skipped:
+            heapq.heappush(ready, item)
+        for i in unlocked:
+            for d in program.dependents_idx[i]:
+                if d in pending:
+                    pending[d] -= 1
+                    if pending[d] == 0:
+                        heapq.heappush(ready, (-chain[d], program.codes[d], d))
+        left -= len(bucket)
+        if bucket:
+            planned_terms.append({"term": term, "courses": sorted(bucket), "credits": credits})
+    return planned_terms
+def greedy_plan(transcript, program, term_sequence: List[str], max_credits: int = MAX_CREDITS,
+                audit: Optional[List[Dict]] = None):
+    """(audit, planned terms); pass `audit` when the transcript was just audited to skip re-auditing."""
+    program = as_program(program)
+    transcript = as_transcript(transcript)
+    satisfied = transcript.completed
+    if audit is None:
+        audit = audit_program(transcript, program)
+    remaining = collect_missing_courses(audit)
+    return audit, plan_courses(program, satisfied, remaining, term_sequence, max_credits)
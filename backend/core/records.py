@@ -0,0 +1,58 @@
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterator, Optional, Tuple
+
+# Engine-side transcript: requests carry JSON dicts, endpoints convert them once with
+# as_transcript() and the audit/planner/batch engines read the record. The rows are held
+# as columns (one tuple per field, in transcript order) with codes, terms and grades
+# interned, so a cohort shares one string per course and a transcript is four tuples
+# instead of a dict per row. The course bitset is kept for the last program it was asked
+# for; the completed-code set is built on demand, since at cohort scale stored sets would
+# be half the memory. Engines still accept plain dicts (converted on entry).
+
+
+@dataclass(slots=True, eq=False)
+class TranscriptRecord:
+    codes: Tuple[str, ...]
+    terms: Tuple[Optional[str], ...]
+    grades: Tuple[Optional[str], ...]
+    credits: Tuple[Optional[float], ...]
+    student: Optional[Dict[str, Any]] = None
+    transfer_credits: int = 0
+    _mask: Optional[Tuple[object, int]] = None
+
+    @classmethod
+    def from_dict(cls, transcript: Dict) -> "TranscriptRecord":
+        rows = transcript["taken"]
+        intern = sys.intern
+        return cls(tuple([intern(t["code"]) for t in rows]),
+                   tuple([_intern(t.get("term")) for t in rows]),
+                   tuple([_intern(t.get("grade")) for t in rows]),
+                   tuple([t.get("credits") for t in rows]),
+                   transcript.get("student"), transcript.get("transfer_credits", 0))
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        for code, term, grade, credits in zip(self.codes, self.terms, self.grades, self.credits):
+            yield {"code": code, "term": term, "grade": grade, "credits": credits}
+
+    def to_dict(self) -> Dict:
+        return {"student": self.student, "taken": list(self.rows()), "transfer_credits": self.transfer_credits}
+
+    @property
+    def completed(self) -> FrozenSet[str]:
+        return frozenset(self.codes)
+
+    def mask(self, program) -> int:
+        """Bitset of the completed codes over `program`'s course index (cached per program)."""
+        if self._mask is None or self._mask[0] is not program:
+            self._mask = (program, program.mask(self.codes))
+        return self._mask[1]
+
+
+def _intern(s):
+    return sys.intern(s) if type(s) is str else s
+
+
+def as_transcript(transcript) -> TranscriptRecord:
+    """Accept either a TranscriptRecord or a transcript dict (converted ad hoc)."""
+    return transcript if isinstance(transcript, TranscriptRecord) else TranscriptRecord.from_dict(transcript)
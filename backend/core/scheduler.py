@@ -1,19 +1,274 @@
-from typing import List, Dict
+import heapq, threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from .metrics import timed
+
+# Meetings are parsed once into (day bits, start minute, end minute). For a search the
+# time boundaries of the sections involved are coordinate-compressed per day, and every
+# slot becomes a small int bitmask over those elementary intervals: two sections overlap
+# iff their masks AND to non-zero (this also catches "MWF" vs "MW").
+DAY_INDEX = {"M": 0, "T": 1, "W": 2, "R": 3, "F": 4, "S": 5, "U": 6}
+MAX_NODES = 5000
+# When the ranked search spends MAX_NODES without finding any schedule, a feasibility search
+# (first conflict-free combination, no scoring) gets this much more before anyone is told
+# they need an override.
+FEASIBILITY_NODES = 200_000
+# Slot groups are built once per course per offerings document (kept for the last few
+# documents). Offerings are treated as immutable: replace the document to change them.
+COMPILED_LIMIT = 8
+
+def to_minutes(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+@lru_cache(maxsize=8192)
+def parse_meeting(days: str, start: str, end: str) -> Tuple[int, int, int]:
+    """(day bits, start, end) in minutes; unparseable times ("TBA", online) meet nowhere."""
+    try:
+        s, e = to_minutes(start), to_minutes(end)
+    except (ValueError, AttributeError):
+        return 0, 0, 0
+    if e <= s:
+        return 0, 0, 0
+    bits = 0
+    for d in days.upper():
+        if d in DAY_INDEX:
+            bits |= 1 << DAY_INDEX[d]
+    return bits, s, e
+
+def _meeting(sec: Dict) -> Tuple[int, int, int]:
+    return parse_meeting(sec["days"], sec["start"], sec["end"])
+
+def overlaps(a: Tuple[int, int, int], b: Tuple[int, int, int]) -> bool:
+    return bool(a[0] & b[0]) and a[1] < b[2] and b[1] < a[2]
+
 def conflict(a, b):
-    if a["days"] != b["days"]:
+    return overlaps(_meeting(a), _meeting(b))
+
+def _is_open(s: Dict) -> bool:
+    return s["enrolled"] < s["cap"]
+
+@dataclass(frozen=True, slots=True)
+class Section:
+    """An open section as the search sees it; `raw` is the offerings entry, echoed in responses."""
+    meeting: Tuple[int, int, int]
+    free: int
+    raw: Dict
+
+class _Grid:
+    """Exact per-day coordinate compression of all meeting boundaries in one search."""
+
+    def __init__(self, meetings):
+        per_day: List[set] = [set() for _ in DAY_INDEX]
+        for bits, s, e in meetings:
+            for d in range(7):
+                if bits >> d & 1:
+                    per_day[d].update((s, e))
+        self.index: List[Dict[int, int]] = []
+        offset = 0
+        for d in range(7):
+            points = sorted(per_day[d])
+            self.index.append({p: offset + i for i, p in enumerate(points)})
+            offset += len(points)
+
+    def mask(self, meeting: Tuple[int, int, int]) -> int:
+        bits, s, e = meeting
+        m = 0
+        for d in range(7):
+            if bits >> d & 1:
+                lo, hi = self.index[d][s], self.index[d][e]
+                m |= ((1 << (hi - lo)) - 1) << lo
+        return m
+
+def _slot_groups(secs: List[Dict]) -> Tuple[Tuple[Tuple[int, int, int], Section], ...]:
+    """Open sections grouped by identical meeting time; each group keeps the one with most free seats.
+
+    Sections at the same time are interchangeable for conflicts, so the search only branches
+    per distinct time slot, which keeps big offerings files tractable.
+    """
+    best: Dict[Tuple[int, int, int], Section] = {}
+    for s in secs:
+        if not _is_open(s):
+            continue
+        m = _meeting(s)
+        free = s["cap"] - s["enrolled"]
+        if m not in best or free > best[m].free:
+            best[m] = Section(m, free, s)
+    # Roomiest sections first, so a budget-limited search sees them early.
+    return tuple(sorted(best.items(), key=lambda kv: -kv[1].free))
+
+# Keyed on the document and its "version": OfferingsStore never mutates a published
+# document (a change is a new dict with a new version), and a caller that edits one in place
+# must bump its "version" too, or it keeps getting the old groups.
+_compiled: Dict[Tuple[int, object], Tuple[Dict, Dict[str, Tuple]]] = {}
+_compiled_lock = threading.Lock()
+
+def slot_groups(offerings: Dict, course: str) -> Tuple[Tuple[Tuple[int, int, int], Section], ...]:
+    """_slot_groups for one course of `offerings`, cached per offerings document and version."""
+    key = (id(offerings), offerings.get("version"))
+    with _compiled_lock:
+        entry = _compiled.get(key)
+        if entry is None or entry[0] is not offerings:
+            if len(_compiled) >= COMPILED_LIMIT:
+                _compiled.pop(next(iter(_compiled)))
+            entry = _compiled[key] = (offerings, {})
+    groups = entry[1].get(course)
+    if groups is None:
+        groups = entry[1][course] = _slot_groups(offerings["sections"][course])
+    return groups
+
+def _score(picks) -> Tuple[int, int, int]:
+    """Lower is better: days on campus, idle minutes between classes, then fewer spare seats."""
+    days, idle = 0, 0
+    for d in range(7):
+        first, last, busy = None, 0, 0
+        for _, (bits, s, e), _ in picks:
+            if bits >> d & 1:
+                first = s if first is None else min(first, s)
+                last = max(last, e); busy += e - s
+        if first is not None:
+            days += 1
+            idle += (last - first) - busy
+    seats = min((sec.free for _, _, sec in picks), default=0)
+    return days, idle, -seats
+
+def _search_complete(order, groups, k: int, max_nodes: int) -> List[Dict]:
+    """Backtracking over time slots, most-constrained course first, keeping the k best by score.
+
+    A branch is cut as soon as some later course has no open slot left that fits, or once
+    k schedules are known and the days already on campus can't beat the worst of them.
+    Stops after `max_nodes` slot tries with the best found so far; returns (schedules,
+    exhausted), exhausted meaning the budget ran out before the search space did.
+    """
+    found: List[Tuple] = []
+    nodes = 0
+
+    def search(i: int, occupied: int, day_bits: int, picks: Dict):
+        nonlocal nodes
+        if len(found) == k and day_bits.bit_count() > -found[0][0][0]:
+            return
+        if i == len(order):
+            item = (tuple(-x for x in _score(list(picks.values()))), -nodes, dict(picks))
+            if len(found) < k:
+                heapq.heappush(found, item)
+            elif item > found[0]:
+                heapq.heapreplace(found, item)
+            return
+        c = order[i]
+        for m, meeting, sec in groups[c]:
+            nodes += 1
+            if nodes > max_nodes:
+                return
+            if m & occupied:
+                continue
+            occ = occupied | m
+            if all(any(not m2 & occ for m2, _, _ in groups[c2]) for c2 in order[i + 1:]):
+                picks[c] = (m, meeting, sec)
+                search(i + 1, occ, day_bits | meeting[0], picks)
+                del picks[c]
+
+    search(0, 0, 0, {})
+    return [picks for _, _, picks in sorted(found, reverse=True)], nodes > max_nodes
+
+def _search_feasible(order, groups, max_nodes: int) -> Dict:
+    """The first conflict-free combination of open slots (same forward check as
+    _search_complete, no scoring), or {} if there is none within `max_nodes` tries."""
+    nodes = 0
+
+    def search(i: int, occupied: int, picks: Dict) -> bool:
+        nonlocal nodes
+        if i == len(order):
+            return True
+        c = order[i]
+        for slot in groups[c]:
+            nodes += 1
+            if nodes > max_nodes:
+                return False
+            if slot[0] & occupied:
+                continue
+            occ = occupied | slot[0]
+            if all(any(not m2 & occ for m2, _, _ in groups[c2]) for c2 in order[i + 1:]):
+                picks[c] = slot
+                if search(i + 1, occ, picks):
+                    return True
+                del picks[c]
         return False
-    return not (a["end"] <= b["start"] or b["end"] <= a["start"])
-def pick_sections(planned_courses: List[str], offerings: Dict):
+
+    picks: Dict = {}
+    return picks if search(0, 0, picks) else {}
+
+def _search_most_placed(order, groups, max_nodes: int) -> Dict:
+    """Largest set of courses that fit together in open sections (branch and bound).
+
+    Seeded with the first-fit answer, so it is never worse than the old greedy pick.
+    """
+    best: Dict = {}
+    occupied = 0
+    for c in order:
+        for slot in groups[c]:
+            if not slot[0] & occupied:
+                best[c] = slot; occupied |= slot[0]
+                break
+    nodes = 0
+
+    def search(i: int, occupied: int, picks: Dict):
+        nonlocal nodes, best
+        if len(picks) + (len(order) - i) <= len(best):
+            return
+        if i == len(order):
+            best = dict(picks)
+            return
+        c = order[i]
+        for slot in groups[c]:
+            nodes += 1
+            if nodes > max_nodes:
+                return
+            if not slot[0] & occupied:
+                picks[c] = slot
+                search(i + 1, occupied | slot[0], picks)
+                del picks[c]
+        search(i + 1, occupied, picks)
+
+    search(0, 0, {})
+    return best
+
+def _assemble(courses: List[str], offerings: Dict, picks: Dict) -> List[Dict]:
+    """Chosen sections in planned order; courses without an open fitting slot get an override note."""
+    taken = [meeting for _, meeting, _ in picks.values()]
     chosen = []
-    for c in planned_courses:
-        secs = offerings["sections"].get(c, [])
-        picked = None
-        for s in secs:
-            if s["enrolled"] < s["cap"] and all(not conflict(s, x) for x in chosen):
-                picked = {"course": c, **s}; break
-        if not picked and secs:
-            picked = {"course": c, **secs[0], "note": "full/overlap → needs override"}
-        if picked:
-            chosen.append(picked)
+    for c in courses:
+        if c in picks:
+            chosen.append({"course": c, **picks[c][2].raw})
+            continue
+        secs = offerings["sections"][c]
+        # Prefer a section that at least fits the week, so only a seat override is needed.
+        fitting = [x for x in secs if not any(overlaps(_meeting(x), t) for t in taken)]
+        sec = fitting[0] if fitting else secs[0]
+        taken.append(_meeting(sec))
+        chosen.append({"course": c, **sec, "note": "full → needs override" if fitting else "full/overlap → needs override"})
+    return chosen
+
+@timed("schedule")
+def rank_schedules(planned_courses: List[str], offerings: Dict, k: int = 5, max_nodes: int = MAX_NODES) -> List[List[Dict]]:
+    """Up to k schedules, best first. Only when no conflict-free combination of open sections
+    exists is a single fallback returned, with override notes on the courses that didn't fit.
+    If the ranked search runs out of budget empty-handed, a larger feasibility search decides."""
+    courses = [c for c in dict.fromkeys(planned_courses) if offerings["sections"].get(c)]
+    open_groups = {c: slot_groups(offerings, c) for c in courses}
+    grid = _Grid(meeting for g in open_groups.values() for meeting, _ in g)
+    groups = {c: [(grid.mask(meeting), meeting, sec) for meeting, sec in g] for c, g in open_groups.items()}
+    order = sorted((c for c in courses if groups[c]), key=lambda c: len(groups[c]))
+    ranked, exhausted = _search_complete(order, groups, k, max_nodes)
+    if not ranked and exhausted:
+        feasible = _search_feasible(order, groups, max(FEASIBILITY_NODES, max_nodes))
+        ranked = [feasible] if feasible else []
+    if not ranked:
+        ranked = [_search_most_placed(order, groups, max_nodes)]
+    return [_assemble(courses, offerings, picks) for picks in ranked]
+
+def pick_sections(planned_courses: List[str], offerings: Dict):
+    schedules = rank_schedules(planned_courses, offerings, k=1)
+    chosen = schedules[0] if schedules else []
     needs = [x for x in chosen if x.get("note")]
     return chosen, needs
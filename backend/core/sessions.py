@@ -0,0 +1,145 @@
+import os, secrets, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+from .utils import DATA_DIR
+
+# Advising sessions hold the transcript, audit, plan, chat history and prompt state, so a
+# chat turn only sends the new message. SESSION_STORE=memory (default, per process) or
+# sqlite (shared by workers, survives restarts). Both evict idle sessions after
+# SESSION_TTL seconds and the least recently used ones beyond SESSION_MAX (the SQLite
+# store checks both every 64 writes).
+# Every put bumps the session's version (get_versioned returns it with the session).
+# put(..., expect=version) is a compare-and-set: it writes only if nobody else has since, and
+# returns False otherwise, so two concurrent turns can't silently overwrite each other.
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(DATA_DIR, "cache", "sessions.sqlite"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(24 * 3600)))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class MemorySessionStore:
+    def __init__(self, max_sessions: int = SESSION_MAX, ttl: float = SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        hit = self.get_versioned(sid)
+        return hit and hit[0]
+
+    def get_versioned(self, sid: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        now = time.time()
+        with self._lock:
+            hit = self._items.get(sid)
+            if hit is None:
+                return None
+            used, data, version = hit
+            if now - used > self.ttl:
+                del self._items[sid]
+                return None
+            self._items[sid] = (now, data, version)
+            self._items.move_to_end(sid)
+            # Callers get their own copy; changes only land through put().
+            return orjson.loads(data), version
+
+    def put(self, sid: str, session: Dict[str, Any], expect: Optional[int] = None) -> bool:
+        data = orjson.dumps(session)
+        with self._lock:
+            hit = self._items.get(sid)
+            version = hit[2] if hit else 0
+            if expect is not None and version != expect:
+                return False
+            self._items[sid] = (time.time(), data, version + 1)
+            self._items.move_to_end(sid)
+            while len(self._items) > self.max_sessions:
+                self._items.popitem(last=False)
+            return True
+
+    def delete(self, sid: str) -> bool:
+        with self._lock:
+            return self._items.pop(sid, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SQLiteSessionStore:
+    def __init__(self, path: str = SESSION_DB_PATH, max_sessions: int = SESSION_MAX, ttl: float = SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB, used REAL, version INTEGER DEFAULT 0)")
+        if "version" not in {r[1] for r in self._db.execute("PRAGMA table_info(sessions)")}:
+            self._db.execute("ALTER TABLE sessions ADD COLUMN version INTEGER DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_used ON sessions(used)")
+        self._writes = 0
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        hit = self.get_versioned(sid)
+        return hit and hit[0]
+
+    def get_versioned(self, sid: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT data, used, version FROM sessions WHERE id = ?", (sid,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM sessions WHERE id = ?", (sid,))
+                return None
+            self._db.execute("UPDATE sessions SET used = ? WHERE id = ?", (now, sid))
+            return orjson.loads(row[0]), row[2]
+
+    def put(self, sid: str, session: Dict[str, Any], expect: Optional[int] = None) -> bool:
+        now = time.time()
+        data = orjson.dumps(session)
+        with self._lock:
+            if expect is None:
+                self._db.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?, 1) ON CONFLICT(id) DO UPDATE SET "
+                    "data = excluded.data, used = excluded.used, version = version + 1", (sid, data, now))
+            # One statement, so the check holds across worker processes sharing the file too.
+            elif not self._db.execute("UPDATE sessions SET data = ?, used = ?, version = version + 1 "
+                                      "WHERE id = ? AND version = ?", (data, now, sid, expect)).rowcount:
+                return False
+            self._writes += 1
+            if self._writes % 64 == 0:
+                self._evict(now)
+            return True
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM sessions WHERE used < ?", (now - self.ttl,))
+        extra = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_sessions
+        if extra > 0:
+            self._db.execute("DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY used LIMIT ?)", (extra,))
+
+    def delete(self, sid: str) -> bool:
+        with self._lock:
+            return self._db.execute("DELETE FROM sessions WHERE id = ?", (sid,)).rowcount > 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+_store = None
+
+
+def get_session_store():
+    global _store
+    if _store is None:
+        _store = SQLiteSessionStore() if SESSION_STORE == "sqlite" else MemorySessionStore()
+    return _store
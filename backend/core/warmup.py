@@ -0,0 +1,46 @@
+import os
+from typing import List
+
+from .metrics import span, timed
+
+# Optional warm-up before a worker takes traffic (run from the app's lifespan, so the
+# first /health answers once it is done):
+#   WARMUP=0      nothing; every first use pays for itself (default, fastest scale-out)
+#   WARMUP=1      engines: program blocks, one audit -> plan -> schedule on the sample
+#                 transcript, the scheduler's section tables for every offered term
+#   WARMUP=full   also the PDF libraries and the LLM client (openai + httpx imports)
+WARMUP = os.getenv("WARMUP", "0")
+SAMPLE_TRANSCRIPT = "transcript.sample.json"
+
+
+@timed("warmup")
+def warm_up(catalog, offerings, level: str = WARMUP) -> List[str]:
+    """Do the first-use work now; returns the steps that ran (each is also a metrics stage)."""
+    if level in ("", "0"):
+        return []
+    from .context_builder import program_block
+    from .pipeline import run_pipeline
+    from .scheduler import slot_groups
+    from .utils import load_json
+
+    done = []
+    with span("warmup.engines"):
+        snapshot = catalog.snapshot()
+        for program in snapshot.programs.values():
+            program_block(program)
+        terms = offerings.snapshot()
+        run_pipeline(load_json(SAMPLE_TRANSCRIPT), snapshot.programs[catalog.default_program_id], ["schedule"],
+                     list(terms) or ["2026S"], terms)
+        for doc in terms.values():
+            for course in doc["sections"]:
+                slot_groups(doc, course)
+    done.append("engines")
+    if level == "full":
+        with span("warmup.libraries"):
+            import pdfplumber, pdf2image, pytesseract  # noqa: F401
+            from . import llm
+            llm.retryable()  # imports the SDK
+            if os.getenv("OPENAI_API_KEY"):
+                llm.get_client()
+        done.append("libraries")
+    return done
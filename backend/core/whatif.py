@@ -0,0 +1,154 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .audit import area_credits, audit_program, evaluate_requirement
+from .catalog import Program, as_program
+from .metrics import timed
+from .planner import MAX_CREDITS, collect_missing_courses, plan_courses, plannable
+from .records import as_transcript
+
+# What-if questions ("drop X", "take Y over the summer", "what if I get a C") start from a
+# base audit + plan and only redo what a change can reach: the requirements listed for the
+# changed courses in program.requirements_by_course, and the plan from the first term the
+# change touches. Terms before that are kept exactly as they were.
+KNOWN_TYPES = ("all_of", "choose_n", "credits_at_least")
+
+
+def apply_changes(transcript: Dict, changes: List[Dict], program: Program) -> Tuple[Dict, Set[str]]:
+    """New transcript plus the codes whose taken/not-taken status changed.
+
+    Changes are {"op": "add" | "drop" | "grade", "code", ["term", "grade"]}. Grades are
+    recorded but the audit counts any transcript row, so a grade change alone moves nothing.
+    """
+    taken = [dict(t) for t in transcript.get("taken", [])]
+    before = {t["code"] for t in taken}
+    for ch in changes:
+        op, code = ch.get("op"), ch["code"].upper().replace(" ", "")
+        if op == "drop":
+            taken = [t for t in taken if t["code"] != code]
+        elif op == "add":
+            if not any(t["code"] == code for t in taken):
+                taken.append({"code": code, "term": ch.get("term", "WHATIF"), "grade": ch.get("grade", "IP"),
+                              "credits": float(program.credit(code))})
+        elif op == "grade":
+            for t in taken:
+                if t["code"] == code:
+                    t["grade"] = ch["grade"]
+        else:
+            raise ValueError(f"unknown what-if op: {op!r}")
+    after = {t["code"] for t in taken}
+    return {**transcript, "taken": taken}, before ^ after
+
+
+def update_audit(program: Program, base_audit: List[Dict], transcript: Dict, changed: Set[str]) -> Tuple[List[Dict], List[str]]:
+    """Re-evaluate only the requirements that list a changed course; returns (audit, re-evaluated ids)."""
+    positions = [r.pos for r in program.requirements if r.type in KNOWN_TYPES]
+    if len(positions) != len(base_audit):
+        # Base audit doesn't line up with this program version; start over.
+        audit = audit_program(transcript, program)
+        return audit, [r["id"] for r in audit]
+    slot = {p: k for k, p in enumerate(positions)}
+    affected = sorted({p for c in changed for p in program.requirements_by_course.get(c, ()) if p in slot})
+    audit = list(base_audit)
+    if affected:
+        record = as_transcript(transcript)
+        completed = record.completed
+        earned = area_credits(record, program) if any(
+            program.requirements[p].type == "credits_at_least" for p in affected) else {}
+        for p in affected:
+            audit[slot[p]] = evaluate_requirement(program.requirements[p], completed, earned)
+    return audit, [program.requirements[p].id for p in affected]
+
+
+def first_touched_term(program: Program, base_plan: List[Dict], term_sequence: List[str],
+                       completed_before: Set[str], completed_after: Set[str],
+                       missing_before: Set[str], missing_after: Set[str]) -> int:
+    """Index into term_sequence of the earliest term whose contents the change can affect."""
+    term_idx = {t: i for i, t in enumerate(term_sequence)}
+    if any(t["term"] not in term_idx for t in base_plan):
+        return 0
+    planned_at = {c: term_idx[t["term"]] for t in base_plan for c in t.get("courses", [])}
+    index = program.index
+    todo = (missing_after - completed_after)
+    reachable = plannable(program, program.mask(completed_after), {index[c] for c in todo if c in index})
+
+    def earliest(code: str) -> int:
+        # First term after every prereq that is still planned (not completed by the change).
+        closure = program.prereq_closure[index[code]]
+        return max((planned_at[p] + 1 for p in planned_at
+                    if p in index and closure >> index[p] & 1 and p not in completed_after), default=0)
+
+    touched = [len(term_sequence)]
+    status = (completed_before ^ completed_after) | (missing_before ^ missing_after)
+    touched += [planned_at[c] for c in status if c in planned_at]
+    for c in completed_before - completed_after:
+        # Planned courses that needed the dropped course.
+        if c in index:
+            touched += [planned_at[d] for d in planned_at
+                        if d in index and program.prereq_closure[index[d]] >> index[c] & 1]
+    for d in todo:
+        if d not in index:
+            continue
+        if d not in planned_at and index[d] in reachable:
+            touched.append(earliest(d))
+        elif d in planned_at and completed_after - completed_before and earliest(d) < planned_at[d]:
+            # A new completion may let an already planned course move earlier.
+            touched.append(earliest(d))
+    return min(touched)
+
+
+def _plan_diff(before: List[Dict], after: List[Dict]) -> List[Dict]:
+    b = {t["term"]: t for t in before}
+    a = {t["term"]: t for t in after}
+    out = []
+    for term in list(dict.fromkeys([*b, *a])):
+        cb, ca = set(b.get(term, {}).get("courses", [])), set(a.get(term, {}).get("courses", []))
+        if cb != ca:
+            out.append({"term": term, "added": sorted(ca - cb), "removed": sorted(cb - ca),
+                        "credits_before": b.get(term, {}).get("credits", 0),
+                        "credits_after": a.get(term, {}).get("credits", 0)})
+    return out
+
+
+@timed("whatif")
+def what_if(transcript: Dict, program, changes: List[Dict], term_sequence: List[str],
+            max_credits: int = MAX_CREDITS, base_audit: Optional[List[Dict]] = None,
+            base_plan: Optional[List[Dict]] = None) -> Dict[str, Any]:
+    """Audit and plan after `changes`, with the diff against the base (computed if not given)."""
+    program = as_program(program)
+    if base_audit is None:
+        base_audit = audit_program(transcript, program)
+    missing_before = collect_missing_courses(base_audit)
+    completed_before = {t["code"] for t in transcript.get("taken", [])}
+    if base_plan is None:
+        base_plan = plan_courses(program, completed_before, missing_before, term_sequence, max_credits)
+
+    new_transcript, changed = apply_changes(transcript, changes, program)
+    audit, reevaluated = update_audit(program, base_audit, new_transcript, changed)
+    completed_after = {t["code"] for t in new_transcript["taken"]}
+    missing_after = collect_missing_courses(audit)
+
+    start = first_touched_term(program, base_plan, term_sequence, completed_before, completed_after,
+                               missing_before, missing_after)
+    if start >= len(term_sequence):
+        planned = base_plan
+    else:
+        keep = set(term_sequence[:start])
+        prefix = [t for t in base_plan if t["term"] in keep]
+        fixed = {c for t in prefix for c in t.get("courses", [])}
+        planned = prefix + plan_courses(program, completed_after | fixed, missing_after - fixed,
+                                        term_sequence[start:], max_credits)
+
+    return {
+        "transcript": new_transcript,
+        "audit": audit,
+        "planned_terms": planned,
+        "replanned_from": term_sequence[start] if start < len(term_sequence) else None,
+        "reevaluated": reevaluated,
+        "diff": {
+            "audit": [{"id": a["id"], "met_before": b["met"], "met_after": a["met"],
+                       "before": b["details"], "after": a["details"]}
+                      for b, a in zip(base_audit, audit) if a != b],
+            "plan": _plan_diff(base_plan, planned),
+            "terms_before": len(base_plan),
+            "terms_after": len(planned),
+        },
+    }
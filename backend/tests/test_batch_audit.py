@@ -0,0 +1,32 @@
+import random
+from core.audit import audit_program
+from core.batch_audit import audit_batch
+from core.utils import load_json
+
+
+def test_batch_matches_single_audit():
+    program = load_json("catalog.json")["programs"]["BS_CS"]
+    # Add an area rule so credits_at_least is covered too.
+    for i, code in enumerate(program["course_meta"]):
+        program["course_meta"][code]["area"] = "core" if i % 3 else "elective"
+    program["requirements"].append({"id": "Electives", "type": "credits_at_least", "area": "elective", "credits": 12})
+
+    rnd = random.Random(7)
+    codes = list(program["course_meta"]) + ["ENC1101"]
+    cohort = [{"taken": [{"code": rnd.choice(codes)} for _ in range(rnd.randint(0, 45))]} for _ in range(500)]
+
+    results = [a for chunk in audit_batch(cohort, program, chunk_size=64) for a in chunk]
+    assert results == [audit_program(t, program) for t in cohort]
+
+
+def test_batch_endpoint_reports_bad_lines_and_keeps_going():
+    import json
+    from fastapi.testclient import TestClient
+    import app
+    good = json.dumps({"student": {"id": "1"}, "taken": [{"code": "COP3530"}]})
+    body = "\n".join([good, "{not json", "[1, 2]", json.dumps({"taken": 5}), good]) + "\n"
+    r = TestClient(app.app).post("/audit/batch?program_id=BS_CS&chunk_size=2", content=body)
+    lines = [json.loads(l) for l in r.text.splitlines()]
+    assert r.status_code == 200 and [l["index"] for l in lines] == [0, 1, 2, 3, 4]
+    assert [("error" in l) for l in lines] == [False, True, True, True, False]
+    assert lines[4]["audit"] == lines[0]["audit"]
@@ -0,0 +1,25 @@
+from bench.suite import compare, percentile
+from bench.synth import synth_cohort, synth_program
+from core.catalog import Program
+
+
+def test_synth_program_has_deep_chains_and_cohort_respects_prereqs():
+    raw = synth_program(n_courses=120, depth=10, seed=3)
+    assert raw == synth_program(n_courses=120, depth=10, seed=3)
+    program = Program("S", raw)
+    assert len(program.codes) == 120
+    # Kahn order covers everything (no cycles) and the longest chain is `depth` long.
+    longest = {}
+    for i in program.topo:
+        longest[i] = 1 + max((longest[p] for p in program.prereq_idx[i]), default=0)
+    assert max(longest.values()) == 10
+    for t in synth_cohort(raw, 30, seed=1):
+        taken = {r["code"] for r in t["taken"]}
+        assert all(set(raw["prereqs"].get(c, ())) <= taken for c in taken)
+
+
+def test_compare_flags_only_real_regressions():
+    base = {"a": {"p50_ms": 1.0}, "b": {"p50_ms": 0.01}, "c": {"p50_ms": 2.0}}
+    now = {"a": {"p50_ms": 1.3}, "b": {"p50_ms": 0.04}, "c": {"p50_ms": 2.2}, "new": {"p50_ms": 9.0}}
+    assert [line.split(":")[0] for line in compare(now, base, threshold=0.25)] == ["a"]
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([1, 2, 3, 4], 99) == 4
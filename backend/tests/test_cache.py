@@ -0,0 +1,50 @@
+from core.cache import TieredCache, content_key
+
+
+def test_memory_lru_and_disk_tier(tmp_path):
+    path = str(tmp_path / "c.sqlite")
+    cache = TieredCache("t", path, max_items=2)
+    for k in "abc":
+        cache.set(k, {"v": k})
+    assert cache.get("c") == {"v": "c"}
+    # "a" fell out of the memory LRU but is still on disk.
+    assert cache.get("a") == {"v": "a"}
+    assert cache.stats["memory_hits"] == 1 and cache.stats["disk_hits"] == 1
+
+    reopened = TieredCache("t", path)
+    assert reopened.get("b") == {"v": "b"}
+    assert reopened.get("missing") is None
+    assert reopened.stats["misses"] == 1
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    cache = TieredCache("t", str(tmp_path / "c.sqlite"), ttl=-1)
+    cache.set("k", "v")
+    assert cache.get("k") is None
+
+    cache = TieredCache("t", str(tmp_path / "d.sqlite"), max_items=1, max_disk_bytes=200)
+    for i in range(20):
+        cache.set(str(i), "x" * 50)
+    assert cache._disk_bytes <= 200
+    assert cache.get("19") == "x" * 50
+    assert cache.get("0") is None
+
+
+def test_content_key_is_order_independent_for_dicts():
+    assert content_key("m", [{"role": "user", "content": "hi"}], {"a": 1, "b": 2}) == \
+        content_key("m", [{"content": "hi", "role": "user"}], {"b": 2, "a": 1})
+
+
+def test_async_tiers_and_split_eviction_stats(tmp_path):
+    import asyncio
+    cache = TieredCache("t", str(tmp_path / "a.sqlite"), max_items=1, max_disk_bytes=200)
+
+    async def run():
+        for i in range(20):
+            await cache.aset(str(i), "x" * 50)
+        return await cache.aget("19"), await cache.aget("0"), await cache.aget("18")
+
+    assert asyncio.run(run()) == ("x" * 50, None, "x" * 50)
+    s = cache.stats
+    assert (s["memory_hits"], s["disk_hits"], s["misses"]) == (1, 1, 1)
+    assert s["memory_evictions"] == 20 and s["disk_evictions"] > 0 and s["expired"] == 0
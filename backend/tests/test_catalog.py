@@ -0,0 +1,30 @@
+import json, os
+from core.catalog import CatalogStore
+from core.utils import load_json
+
+
+def test_compiled_program_indexes():
+    store = CatalogStore()
+    program = store.get(store.default_program_id)
+    raw = load_json("catalog.json")["programs"][store.default_program_id]
+
+    for code, meta in raw["course_meta"].items():
+        assert program.credits[program.index[code]] == meta["credits"]
+    core = next(r for r in program.requirements if r.id == "CS_Core")
+    assert "COP3530" in core.pool_set
+    assert core.pos in program.requirements_by_course["COP3530"]
+    i = program.index["COP3530"]
+    assert {program.codes[p] for p in program.prereq_idx[i]} == set(raw["prereqs"]["COP3530"])
+
+
+def test_store_swaps_snapshot_when_file_changes(tmp_path):
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps({"programs": {"A": {"requirements": [], "course_meta": {}}}}))
+    store = CatalogStore(str(path), check_interval=0)
+    before = store.snapshot()
+    assert list(store.programs) == ["A"]
+
+    path.write_text(json.dumps({"programs": {"B": {"requirements": [], "course_meta": {}}}}))
+    os.utime(path, ns=(before.version[0] + 10**9, before.version[0] + 10**9))
+    assert list(store.programs) == ["B"]
+    assert list(before.programs) == ["A"]
@@ -0,0 +1,96 @@
+import json, os
+
+from core import catalog_compiler as cc
+from core.catalog import CatalogStore
+
+
+def test_parse_prereqs():
+    assert cc.parse_prereqs("(MAP 3305 OR MAP 2302) AND EGN 3311") == (
+        [["MAP3305", "EGN3311"], ["MAP2302", "EGN3311"]], "")
+    assert cc.parse_prereqs("EEL 3118 AND STA 4821 OR EEE 4541")[0] == [["EEL3118", "STA4821"], ["EEE4541"]]
+    assert cc.parse_prereqs("Senior Standing") == ([], "Senior Standing")
+    assert cc.parse_prereqs(None) == ([], "")
+
+
+def _export(rows):
+    header = {f"Unnamed: {i}": h for i, h in enumerate(cc.COLUMNS)}
+    return [header] + [{f"Unnamed: {i}": v for i, v in enumerate(r)} for r in rows]
+
+
+ROWS = [
+    ["MAC 2311", "Calc 1", "4", None, None, "Math", "All Terms", None, "Math", None],
+    ["MAC 2312", "Calc 2", "4", "MAC 2311", None, "Math", "All Terms", None, "Math", None],
+    ["COP 3014", "Programming", "3", "COP 3530 OR MAC 2312", None, "Core", None, None, None, None],
+    ["COP 3530", "Data Structures", "3", "COP 3014", None, "Core", None, None, None, None],
+    ["CAP 4630", "AI", "3", "COP 3530", None, "Elective", None, None, None, "Choose 1 from electives"],
+    ["CAP 4770", "Data Mining", "3-4", "Junior Standing", None, "Elective", None, None, None, None],
+    [None, "Technical Elective", "3", None, None, "Elective", None, None, None, None],
+]
+
+
+def test_compile_export_and_cycle_check():
+    program, report = cc.compile_export("X", [dict(zip(cc.COLUMNS, r)) for r in ROWS])
+    reqs = {r["id"]: r for r in program["requirements"]}
+    assert reqs["Math"]["courses"] == ["MAC2311", "MAC2312"]
+    assert reqs["Elective"] == {"id": "Elective", "label": "Elective", "type": "choose_n", "n": 1,
+                                "from": ["CAP4630", "CAP4770"]}
+    assert program["course_meta"]["CAP4770"] == {"credits": 3, "name": "Data Mining", "standing": "Junior Standing"}
+    assert program["placeholders"][0]["label"] == "Technical Elective"
+    # COP3014 picks the alternative the program lists most of: COP3530 (which needs COP3014) -> cycle.
+    assert program["prereqs"]["COP3014"] == ["COP3530"]
+    graph = cc.check_graph(program)
+    assert graph["errors"] == ["prereq cycle COP3530 -> COP3014 -> COP3530; dropped COP3014 -> COP3530"]
+    assert program["prereqs"]["COP3014"] == [] and program["prereqs"]["COP3530"] == ["COP3014"]
+    assert report["errors"] == []
+
+
+def test_store_serves_exports_from_artifact_and_recompiles(tmp_path):
+    base = tmp_path / "catalog.json"
+    base.write_text(json.dumps({"programs": {"A": {"requirements": [], "course_meta": {}}}}))
+    src = tmp_path / "exports"
+    src.mkdir()
+    export = src / "catalog - BSTest.json"
+    export.write_text(json.dumps(_export(ROWS[:2])))
+    artifact = str(tmp_path / "catalog.pkl")
+
+    store = CatalogStore(str(base), check_interval=0, exports_dir=str(src), artifact=artifact)
+    assert list(store.programs) == ["A", "BSTest"]
+    assert os.path.exists(artifact)
+    version = store.snapshot().version
+    assert cc.load_artifact(artifact, version)["BSTest"].index["MAC2312"] == 1
+
+    export.write_text(json.dumps(_export(ROWS[:2] + ROWS[3:4])))  # ROWS[:4] has a cycle: an error
+    os.utime(export, ns=(10**18, 10**18))
+    assert "COP3530" in store.get("BSTest").index
+    assert cc.load_artifact(artifact, version) is None
+
+
+def test_exports_with_errors_are_reported_but_not_served(tmp_path):
+    base = tmp_path / "catalog.json"
+    base.write_text(json.dumps({"programs": {"A": {"requirements": [], "course_meta": {}}}}))
+    src = tmp_path / "exports"
+    src.mkdir()
+    (src / "catalog - BSGood.json").write_text(json.dumps(_export(ROWS[:2])))
+    (src / "catalog - BSBad.json").write_text(json.dumps(_export(ROWS[:4])))  # COP3014 <-> COP3530 cycle
+    artifact = str(tmp_path / "catalog.pkl")
+
+    programs, version, report = cc.build(str(base), str(src), artifact)
+    assert list(programs) == ["A", "BSGood"] and report["BSBad"]["errors"]
+    assert list(cc.load_artifact(artifact, version)) == ["A", "BSGood"]
+    store = CatalogStore(str(base), check_interval=0, exports_dir=str(src))
+    assert list(store.programs) == ["A", "BSGood"]
+    assert cc.main(["--base", str(base), "--src", str(src), "--out", artifact, "--strict"]) == 1
+
+
+def test_every_shipped_export_compiles_cleanly_and_is_served(tmp_path):
+    exports = cc.export_files(cc.EXPORTS_DIR)
+    assert len(exports) == 10
+    store = CatalogStore("catalog.json", check_interval=0, exports_dir=cc.EXPORTS_DIR,
+                         artifact=str(tmp_path / "catalog.pkl"))
+    served = set(store.programs)
+    assert all(cc.ALIASES.get(pid, pid) in served for pid in exports)
+    _, report = cc.compile_catalog("catalog.json", cc.EXPORTS_DIR)
+    assert {pid: r["errors"] for pid, r in report.items() if r["errors"]} == {}
+    # Repaired noise is a warning: BSCivil's malformed row is dropped, the rest is kept.
+    assert any("TTE 30004C" in w for w in report["BSCivil"]["warnings"])
+    assert "MAC2312" not in store.get("BSElectrical").prereqs.get("MAC2312", ())
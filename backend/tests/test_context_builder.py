@@ -0,0 +1,49 @@
+from core.catalog import Program
+from core.context_builder import KEEP_RECENT, build_messages, snapshot
+
+
+def _program():
+    return Program("T", {
+        "requirements": [{"id": "core", "type": "all_of", "courses": ["A", "B", "C"]}],
+        "prereqs": {"B": ["A"]},
+        "course_meta": {c: {"credits": 3} for c in "ABC"},
+    })
+
+
+def _snap(plan):
+    audit = [{"id": "core", "type": "all_of", "met": False, "details": {"missing": ["B", "C"], "courses": ["A", "B", "C"]}}]
+    return snapshot({"taken": [{"code": "A", "term": "2208", "grade": "B", "credits": 3.0}]}, audit, plan)
+
+
+def test_prefix_is_stable_and_only_changes_are_resent():
+    program = _program()
+    plan = [{"term": "T1", "courses": ["B", "C"], "credits": 6}]
+    first, state, usage = build_messages("SYS", program, _snap(plan), [{"role": "user", "content": "hi"}], "goals")
+    assert [m["role"] for m in first] == ["system", "assistant", "user", "user"]
+    assert '"courses":["A","B","C"]' not in first[1]["content"]  # pools live in the program block only
+
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"},
+               {"role": "user", "content": "move C later"}]
+    plan2 = [{"term": "T1", "courses": ["B"], "credits": 3}, {"term": "T2", "courses": ["C"], "credits": 3}]
+    second, state2, usage2 = build_messages("SYS", program, _snap(plan2), history, "goals", state)
+    assert second[:3] == first[:3]  # byte-identical prefix for prompt caching
+    update = second[-2]["content"]
+    assert update.startswith("CONTEXT_UPDATE") and '"T2"' in update and "audit_changed" not in update
+    assert usage2["blocks"]["update"] > 0 and state2["baseline"] == state["baseline"]
+
+
+def test_old_history_is_summarized_within_budget():
+    program = _program()
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"Message {i}. " + "x" * 400}
+               for i in range(30)]
+    messages, state, usage = build_messages("SYS", program, _snap([]), history, "goals", budget=1500)
+    assert usage["estimated_prompt_tokens"] <= 1500
+    n = state["summarized"]
+    assert 0 < n <= len(history) - KEEP_RECENT
+    assert messages[2]["content"].startswith("Earlier conversation (summarized):\n- user: Message 0.")
+    assert [m["content"] for m in messages[3:-1]] == [m["content"] for m in history[n:]]
+
+    # Next turn: the same summary is reused, so the prefix up to the kept history is unchanged.
+    history += [{"role": "assistant", "content": "ok"}, {"role": "user", "content": "and now?"}]
+    again, state2, _ = build_messages("SYS", program, _snap([]), history, "goals", state, budget=1500)
+    assert state2["summarized"] == n and again[:3] == messages[:3]
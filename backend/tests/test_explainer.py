@@ -0,0 +1,29 @@
+from core.catalog import Program
+from core.explainer_agent import explain_locally
+
+PLAN = [{"term": "T1", "courses": ["A"], "credits": 3}, {"term": "T2", "courses": ["B"], "credits": 3},
+        {"term": "T3", "courses": ["C"], "credits": 3}]
+
+
+def _program():
+    return Program("T", {
+        "requirements": [{"id": "core", "type": "all_of", "courses": ["A", "B", "C"]}],
+        "prereqs": {"B": ["A"], "C": ["B"]},
+        "course_meta": {c: {"credits": 3} for c in "ABC"},
+    })
+
+
+def test_course_in_another_term_is_reported_where_it_is():
+    d = explain_locally(_program(), PLAN, "C", "T1")
+    assert (d["reason"], d["planned_term"]) == ("wrong_term", "T3")
+    assert d["text"].startswith("C (3 cr) is planned for T3, not T1.")
+    d = explain_locally(_program(), PLAN, "c", "T3")
+    assert (d["reason"], d["planned_term"], d["blocked_by"]) == ("eligible", "T3", ["B"])
+
+
+def test_unknown_and_unplanned_courses():
+    d = explain_locally(_program(), PLAN, "ZZZ9999", "T1")
+    assert d["reason"] == "unknown_course" and d["planned_term"] is None
+    assert "not a course" in d["text"]
+    d = explain_locally(_program(), PLAN[:2], "C", "T1")
+    assert d["reason"] == "not_in_plan" and "not in the current plan" in d["text"]
@@ -0,0 +1,78 @@
+import asyncio, threading, time
+
+import pytest
+
+from bench.pdf_fixtures import fixture
+from core.jobs import JobQueue, QueueFull
+from core.pdf_parser import pdf_to_transcript
+
+
+def _wait(queue, jid, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(jid)
+        if job["status"] in ("done", "error"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_progress_result_and_error():
+    queue = JobQueue(workers=1)
+
+    def work(x, progress):
+        progress("ocr", 1, 2)
+        progress("ocr", 2, 2)
+        if x < 0:
+            raise ValueError("bad input")
+        return {"x": x}
+
+    ok = _wait(queue, queue.submit("t", work, 3))
+    assert ok["result"] == {"x": 3} and ok["progress"] == {"stage": "ocr", "done": 2, "total": 2}
+    failed = _wait(queue, queue.submit("t", work, -1))
+    assert failed["status"] == "error" and failed["error"] == "bad input"
+
+    async def collect(jid):
+        return [e async for e in queue.subscribe(jid)]
+    events = asyncio.run(collect(ok["id"]))
+    assert [e for e, _ in events] == ["status", "status", "progress", "progress", "done"]
+    queue.shutdown()
+
+
+def test_queue_limit_ttl_and_live_subscription():
+    queue = JobQueue(workers=1, max_queued=1, ttl=0.05)
+    gate = threading.Event()
+
+    def blocked(progress):
+        progress("waiting")
+        gate.wait(5)
+        return "ok"
+
+    first = queue.submit("t", blocked)
+    while queue.get(first)["status"] != "running":
+        time.sleep(0.01)
+    queue.submit("t", blocked)  # waits behind the running job
+    with pytest.raises(QueueFull):
+        queue.submit("t", blocked)
+
+    async def follow():
+        events = []
+        async for event, data in queue.subscribe(first):
+            events.append(event)
+            if event == "progress":
+                gate.set()
+        return events, data
+    events, result = asyncio.run(follow())
+    assert events[-1] == "done" and result == "ok"
+
+    time.sleep(0.1)
+    assert queue.get(first) is None
+    queue.shutdown()
+
+
+def test_pdf_progress_events():
+    seen = []
+    transcript = pdf_to_transcript(fixture("transcript_1p.pdf"), cache=False,
+                                   progress=lambda stage, done=0, total=0: seen.append((stage, done, total)))
+    assert transcript["taken"]
+    assert seen == [("extracting", 1, 1), ("parsing", 0, 0)]
@@ -0,0 +1,46 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core import metrics
+from core.cache import TieredCache
+
+
+def test_span_histogram_and_render(tmp_path):
+    metrics.reset()
+    with metrics.span("audit"):
+        pass
+    metrics.observe("advisor_stage_seconds", 0.3, stage="audit")
+    metrics.inc("advisor_llm_tokens_total", 120, model="m", kind="prompt")
+    cache = TieredCache("metrics-test", str(tmp_path / "c.sqlite"))
+    cache.set("k", 1)
+    cache.get("k")
+    cache.get("missing")
+
+    text = metrics.render()
+    assert "# TYPE advisor_stage_seconds histogram" in text
+    assert 'advisor_stage_seconds_bucket{stage="audit",le="0.0005"} 1' in text
+    assert 'advisor_stage_seconds_bucket{stage="audit",le="+Inf"} 2' in text
+    assert 'advisor_stage_seconds_count{stage="audit"} 2' in text
+    assert 'advisor_llm_tokens_total{kind="prompt",model="m"} 120' in text
+    assert 'advisor_cache_requests_total{cache="metrics-test",result="memory_hit"} 1' in text
+    assert 'advisor_cache_hit_ratio{cache="metrics-test"} 0.5' in text
+
+
+def test_middleware_route_labels_and_server_timing():
+    metrics.reset()
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        with metrics.span("audit"):
+            pass
+        with metrics.span("plan"):
+            pass
+        return {"id": item_id}
+
+    client = TestClient(app)
+    assert "server-timing" not in client.get("/items/1").headers
+    timing = client.get("/items/2", headers={"x-server-timing": "1"}).headers["server-timing"]
+    assert [p.split(";")[0] for p in timing.split(", ")] == ["audit", "plan", "total"]
+    assert 'advisor_http_requests_total{method="GET",route="/items/{item_id}",status="200"} 2' in metrics.render()
@@ -0,0 +1,54 @@
+import random
+
+from core.audit import audit_program
+from core.catalog import Program
+from core.multi_audit import MultiProgramAuditor
+
+
+def _programs(n=6, seed=3):
+    rnd = random.Random(seed)
+    codes = [f"C{i:03d}" for i in range(80)]
+    out = []
+    for k in range(n):
+        pool = rnd.sample(codes, 30)
+        out.append(Program(f"P{k}", {
+            "requirements": [
+                {"id": "core", "type": "all_of", "courses": pool[:8]},
+                {"id": "electives", "type": "choose_n", "n": 3, "from": pool[8:16]},
+                {"id": "area", "type": "credits_at_least", "area": "sci", "credits": 9},
+            ],
+            "prereqs": {pool[i]: [pool[i - 1]] for i in range(1, 6)},
+            "course_meta": {c: {"credits": rnd.choice([3, 4]), **({"area": "sci"} if c in pool[16:] else {})}
+                            for c in pool},
+        }))
+    return out, codes
+
+
+def test_matches_single_program_audit():
+    programs, codes = _programs()
+    auditor = MultiProgramAuditor(programs)
+    by_id = {p.id: p for p in programs}
+    rnd = random.Random(0)
+    for _ in range(50):
+        transcript = {"taken": [{"code": c} for c in rnd.sample(codes, rnd.randint(0, 30))]}
+        ranked = auditor.audit(transcript)
+        assert [r["remaining_credits"] for r in ranked] == sorted(r["remaining_credits"] for r in ranked)
+        for r in ranked:
+            audit = audit_program(transcript, by_id[r["program_id"]])
+            assert r["requirements_met"] == sum(a["met"] for a in audit)
+            assert (r["remaining_credits"] == 0) == all(a["met"] for a in audit)
+            missing = {c for a in audit if a["type"] == "all_of" for c in a["details"]["missing"]}
+            assert missing <= set(r["remaining_courses"])
+
+
+def test_untouched_programs_reuse_empty_result_and_chain_bounds_terms():
+    programs, _ = _programs()
+    auditor = MultiProgramAuditor(programs)
+    empty = {r["program_id"]: r for r in auditor.audit({"taken": []})}
+    only = programs[0].requirements[0].pool[0]
+    for r in auditor.audit({"taken": [{"code": "ZZZ9999"}]}):
+        assert r == empty[r["program_id"]]
+        # The 6-course prereq chain can't be done in fewer than 6 terms.
+        assert r["estimated_terms"] >= 6
+    touched = {r["program_id"]: r for r in auditor.audit({"taken": [{"code": only}]})}
+    assert touched["P0"]["remaining_credits"] < empty["P0"]["remaining_credits"]
@@ -0,0 +1,95 @@
+import json, os
+
+import pytest
+
+from core.offerings import OfferingsStore
+from core.pipeline import schedule_terms
+
+SEC = {"days": "MW", "start": "10:00", "end": "10:50", "cap": 30, "enrolled": 10}
+
+
+def _write(path, doc):
+    path.write_text(json.dumps(doc))
+    os.utime(path, ns=(os.stat(path).st_mtime_ns + 10**9,) * 2)
+
+
+def _store(tmp_path):
+    _write(tmp_path / "offerings.json", {"term": "2026S", "sections": {
+        "A": [{**SEC, "crn": "2", "start": "13:00", "end": "13:50"}, {**SEC, "crn": "1"}]}})
+    terms = tmp_path / "terms"
+    terms.mkdir()
+    _write(terms / "2026F.json", {"term": "2026F", "sections": {"A": [{**SEC, "crn": "9"}]}})
+    deltas = tmp_path / "deltas.jsonl"
+    deltas.write_text("")
+    return OfferingsStore(str(tmp_path / "offerings.json"), str(terms), str(deltas), check_interval=0), deltas
+
+
+def test_terms_indexed_and_api_deltas_swap_atomically(tmp_path):
+    store, _ = _store(tmp_path)
+    before = store.snapshot()
+    assert store.default_term == "2026S" and sorted(before) == ["2026F", "2026S"]
+    assert [s["crn"] for s in before["2026S"]["sections"]["A"]] == ["1", "2"]  # by start time
+
+    with pytest.raises(ValueError):
+        store.apply([{"op": "seats", "term": "2026S", "course": "A", "crn": "1", "enrolled": 30},
+                     {"op": "bogus", "term": "2026S", "course": "A"}])
+    assert store.snapshot() is before
+
+    out = store.apply([{"op": "seats", "term": "2026S", "course": "A", "crn": "1", "enrolled": 30},
+                       {"op": "add", "term": "2026S", "course": "B", "section": {**SEC, "crn": "5"}}])
+    now = store.snapshot()
+    assert out["applied"] == 2 and now["2026F"] is before["2026F"]
+    assert before["2026S"]["sections"]["A"][0]["enrolled"] == 10  # old snapshot untouched
+    assert now["2026S"]["open"] == {"A": 1, "B": 1}
+
+    planned = [{"term": "2026S", "courses": ["A"]}, {"term": "2026F", "courses": ["A"]},
+               {"term": "2027S", "courses": ["A"]}]
+    spring, fall, later = schedule_terms(planned, now, [p["term"] for p in planned])
+    assert spring["chosen_sections"][0]["crn"] == "2" and fall["chosen_sections"][0]["crn"] == "9"
+    assert later["available"] is False
+
+
+def test_watched_deltas_file_and_base_reload(tmp_path):
+    store, deltas = _store(tmp_path)
+    line = json.dumps({"op": "seats", "term": "2026F", "course": "A", "crn": "9", "enrolled": 30})
+    deltas.write_text(line + "\n" + line[:10])  # second line still being written
+    assert store.get("2026F")["open"]["A"] == 0
+    with open(deltas, "a") as f:
+        f.write(line[10:].replace("30", "12") + "\n")
+    assert store.get("2026F")["sections"]["A"][0]["enrolled"] == 12
+
+    # A new base file replaces the terms; the deltas file is replayed on top.
+    _write(tmp_path / "offerings.json", {"term": "2026S", "sections": {"C": [{**SEC, "crn": "7"}]}})
+    snap = store.snapshot()
+    assert list(snap["2026S"]["sections"]) == ["C"]
+    assert snap["2026F"]["sections"]["A"][0]["enrolled"] == 12
+
+
+def test_skipped_deltas_leave_terms_alone_and_bad_counts_are_rejected(tmp_path):
+    store, _ = _store(tmp_path)
+    before = store.snapshot()
+    out = store.apply([{"op": "seats", "term": "2099X", "course": "A", "crn": "1", "enrolled": 3},
+                       {"op": "remove", "term": "2026S", "course": "A", "crn": "404"}])
+    assert out["applied"] == 0 and "2099X" not in store.snapshot()
+    assert store.snapshot()["2026S"] is before["2026S"]
+    for bad in ({"op": "seats", "term": "2026S", "course": "A", "crn": "1", "enrolled": None},
+                {"op": "seats", "term": "2026S", "course": "A", "crn": "1", "cap": "x"},
+                {"op": "seats", "term": "2026S", "course": "A", "crn": "1", "enrolled": -1},
+                {"op": "add", "term": "2026S", "course": "B", "section": {**SEC, "crn": "5", "cap": "30"}},
+                ["not", "a", "delta"]):
+        with pytest.raises(ValueError):
+            store.apply([bad])
+    assert store.snapshot() is before
+
+
+def test_delta_endpoint_is_closed_without_a_token(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+    client = TestClient(app.app)
+    body = {"deltas": [{"op": "seats", "term": "2099X", "course": "A", "crn": "1", "enrolled": 1}]}
+    monkeypatch.delenv("OFFERINGS_DELTA_TOKEN", raising=False)
+    assert client.post("/offerings/deltas", json=body).status_code == 403
+    monkeypatch.setenv("OFFERINGS_DELTA_TOKEN", "s3cret")
+    assert client.post("/offerings/deltas", json=body, headers={"X-Offerings-Token": "nope"}).status_code == 403
+    r = client.post("/offerings/deltas", json=body, headers={"X-Offerings-Token": "s3cret"})
+    assert r.status_code == 200 and r.json()["applied"] == 0
@@ -0,0 +1,158 @@
+import os, random, sys, time, types
+
+from PIL import Image
+
+from bench.bench_rows import ADVERSARIAL, LEGACY_ROW_REGEX, typical
+from bench.pdf_fixtures import make_pdf
+from core import pdf_parser
+from core.cache import TieredCache
+
+
+def test_pool_extraction_matches_in_process(monkeypatch):
+    pdf = make_pdf(3, rows_per_page=6, seed=1)
+    inline = pdf_parser._extract(pdf, workers=1)
+    monkeypatch.setattr(pdf_parser, "INLINE_PAGES", 0)
+    monkeypatch.setattr(pdf_parser, "PDF_WORKERS", 2)
+    try:
+        pooled = pdf_parser._extract(pdf, workers=2)
+    finally:
+        pdf_parser.shutdown_pool()
+    assert pooled == inline
+    assert inline.index("Page 1 of 3") < inline.index("Page 2 of 3") < inline.index("Page 3 of 3")
+
+
+def test_pdf_to_transcript_reads_generated_pdf():
+    t = pdf_parser.pdf_to_transcript(make_pdf(1, rows_per_page=4), cache=False)
+    assert t["student"]["id"] == "Z12345678"
+    # Each row shows up from the text layer and the table; the text copy may carry a suffix
+    # letter picked up from the course title, so compare the base codes.
+    assert len({c["code"][:7] for c in t["taken"]}) == 4
+
+
+def test_repeat_upload_is_served_from_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_parser, "_cache", TieredCache("t", str(tmp_path / "t.sqlite")))
+    calls = []
+    extract = pdf_parser._extract
+    monkeypatch.setattr(pdf_parser, "_extract", lambda *a, **kw: calls.append(1) or extract(*a, **kw))
+    pdf = make_pdf(1, rows_per_page=4)
+    first = pdf_parser.pdf_to_transcript(pdf)
+    first["taken"].clear()  # callers mutating the result must not poison the cache
+    again = pdf_parser.pdf_to_transcript(pdf)
+    assert len(again["taken"]) >= 4 and len(calls) == 1
+
+    # A parser version bump re-parses the cached text instead of re-extracting the PDF.
+    monkeypatch.setattr(pdf_parser, "PARSER_VERSION", pdf_parser.PARSER_VERSION + 1)
+    assert pdf_parser.pdf_to_transcript(pdf) == again
+    assert pdf_parser.extract_text_and_courses(pdf)["courses"] == again["taken"]
+    assert len(calls) == 1
+
+
+def _legacy_rows(text):
+    return [(m["term"], m["code"], m["credits"], m["grade"]) for m in LEGACY_ROW_REGEX.finditer(text)]
+
+
+def _rows(text):
+    return [r for line in text.split("\n") if "." in line for r in pdf_parser._scan_rows(line)]
+
+
+def test_row_scanner_matches_legacy_regex():
+    corpus = [typical(200, seed=s) for s in range(3)]
+    corpus += [pdf_parser._extract(make_pdf(2, seed=s), workers=1) for s in range(3)]
+    rnd = random.Random(0)
+    pieces = ["2205", "COP", "2220", "3.00", "4.5", "A", "B+", "IP", "A-", " ", "\t", '"', "'", ",", ".",
+              "EGN 4950 C", "MAC\t2311c", "12345", "ABCDE", "\n", "x", "7", "Z", "\u0663"]
+    for _ in range(5000):
+        corpus.append("".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 40))))
+    for text in corpus:
+        assert _rows(text) == _legacy_rows(text), text
+
+
+def test_row_scanner_is_linear_on_adversarial_lines():
+    # The legacy regex needs ~40 s for 4k chars of the first pattern.
+    for make in ADVERSARIAL.values():
+        line = make(64000)
+        t0 = time.perf_counter()
+        pdf_parser._parse_courses(line)
+        assert time.perf_counter() - t0 < 1.0
+
+
+def _ocr_data(rows):
+    data = {k: [] for k in ("text", "block_num", "par_num", "line_num", "left", "top", "height", "conf")}
+    for line_num, (top, words, *conf) in enumerate(rows):
+        for j, w in enumerate(words.split()):
+            for k, v in zip(data, (w, 1, 1, line_num, 10 + 60 * j, top, 12, conf[0] if conf else 95)):
+                data[k].append(v)
+    return data
+
+
+def test_ocr_regions_cover_course_rows_and_header():
+    lines = pdf_parser._ocr_lines(_ocr_data([
+        (300, "2205 COP 2220 Intro 3.00 A"),
+        (10, "Name: Jordan Sample"),
+        (100, "Some unrelated paragraph of text"),
+        (318, "2205 MAC2311 Calc 4.00 B+"),
+        (600, "Footer 2024"),
+    ]))
+    assert [text for _, _, text, _ in lines][:2] == ["Name: Jordan Sample", "Some unrelated paragraph of text"]
+    bands = pdf_parser._table_regions(lines, pad=4)
+    # The two course rows merge into one band; the paragraph and footer stay low-DPI only.
+    assert bands == [(6, 26), (296, 334)]
+
+
+def test_ocr_rasterizes_once_and_rereads_key_and_low_confidence_bands(monkeypatch, tmp_path):
+    rows = [
+        (10, "Name: Jordan Sample"),
+        (100, "Some unrelated paragraph", 91),
+        (300, "2205 COP 2220 Intro 3.00 A"),
+        (318, "22O5 C0P 222O lntro 3.0O A", 31),  # garbled at scan DPI; only its confidence flags it
+        (600, "Footer 2024"),
+    ]
+    calls, scans, crops = [], [], []
+
+    def rasterize(pdf_bytes, first, last, dpi, folder):
+        calls.append((first, last, dpi))
+        paths = [os.path.join(folder, f"{i}.png") for i in range(first, last)]
+        for path in paths:
+            Image.new("L", (200, 1400), 255).save(path)
+        return paths
+
+    def image_to_data(img, output_type=None):
+        scans.append(img.size)
+        return _ocr_data(rows)
+
+    def image_to_string(img, config=""):
+        crops.append(img.size)
+        return f"full {len(crops)}"
+
+    monkeypatch.setattr(pdf_parser, "_rasterize", rasterize)
+    monkeypatch.setitem(sys.modules, "pytesseract", types.SimpleNamespace(
+        image_to_data=image_to_data, image_to_string=image_to_string, Output=types.SimpleNamespace(DICT="dict")))
+    monkeypatch.setattr(pdf_parser, "OCR_SCAN_DPI", 100)
+    pages = pdf_parser._ocr_pages(b"%PDF", 0, 2, 200)
+    assert calls == [(0, 2, 200)] and scans == [(100, 700)] * 2
+    # Bands (2, 30) and (292, 338) at 100 DPI, cropped from the 200 DPI page.
+    assert crops[:2] == [(200, 57), (200, 93)]
+    assert pages[0] == "full 1\nSome unrelated paragraph\nfull 2\nFooter 2024"
+
+
+def test_ocr_without_a_page_count_falls_back_to_the_whole_document(monkeypatch):
+    import pdf2image
+
+    def no_pdfinfo(pdf_bytes):
+        raise pdf2image.exceptions.PDFPageCountError("no pages")
+
+    monkeypatch.setattr(pdf2image, "pdfinfo_from_bytes", no_pdfinfo)
+    monkeypatch.setattr(pdf_parser, "_ocr_pages", lambda pdf_bytes, first, last, dpi: [f"{first}-{last}@{dpi}"])
+    assert pdf_parser._extract(b"not a pdf", dpi=150, workers=2) == "0-None@150"
+
+
+def test_text_layer_and_ocr_are_separate_stages(monkeypatch):
+    from core import metrics
+    metrics.reset()
+    pdf_parser._extract(make_pdf(1, rows_per_page=3), workers=1)
+    monkeypatch.setattr(pdf_parser, "_ocr_pages", lambda pdf_bytes, first, last, dpi: ["scan"])
+    monkeypatch.setattr(pdf_parser, "_fan_out", lambda fn, pdf_bytes, n, workers, *a, progress=None: ["scan"] * n)
+    assert pdf_parser._extract(b"not a pdf", workers=1) == "scan"
+    text = metrics.render()
+    assert 'advisor_stage_seconds_count{stage="pdf.text"} 2' in text
+    assert 'advisor_stage_seconds_count{stage="pdf.ocr"} 1' in text
@@ -0,0 +1,74 @@
+import pytest
+
+from core import pipeline, planner
+from core.catalog import Program
+from core.planner import greedy_plan
+from core.utils import load_json
+
+
+def test_resolve_stages():
+    assert pipeline.resolve_stages(["schedule"]) == ["audit", "plan", "schedule"]
+    assert pipeline.resolve_stages(["schedule"], have_plan=True) == ["schedule"]
+    assert pipeline.resolve_stages(["plan", "schedule"], have_plan=True) == ["audit", "plan", "schedule"]
+    with pytest.raises(ValueError):
+        pipeline.resolve_stages(["parse"])
+
+
+def test_pipeline_audits_once_and_schedules_requested_terms(monkeypatch):
+    program = Program("P", load_json("catalog.json")["programs"]["BS_CS"])
+    transcript = load_json("transcript.sample.json")
+    offerings = load_json("offerings.json")
+    terms = [offerings["term"], "2026F", "2027S"]
+    calls, audit = [], planner.audit_program
+    counting = lambda *a, **k: calls.append(1) or audit(*a, **k)
+    monkeypatch.setattr(pipeline, "audit_program", counting)
+    monkeypatch.setattr(planner, "audit_program", counting)
+
+    out = pipeline.run_pipeline(transcript, program, ["schedule"], terms, {offerings["term"]: offerings},
+                                terms=[offerings["term"], "2026F"])
+    assert len(calls) == 1
+    assert (out["audit"], out["planned_terms"]) == greedy_plan(transcript, program, terms)
+    first, second = out["schedules"]
+    assert first["available"] and first["chosen_sections"]
+    assert {c["course"] for c in first["chosen_sections"]} <= set(out["planned_terms"][0]["courses"])
+    assert second == {"term": "2026F", "available": False, "chosen_sections": [], "needs_overrides": [],
+                      "alternatives": []}
+
+
+def test_chat_ignores_a_client_sent_audit(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+    from core.audit import audit_program
+    transcript = load_json("transcript.sample.json")
+
+    async def answer(prepared):
+        return {"audit": prepared["audit"]}
+
+    monkeypatch.setattr(app, "answer_prepared", answer)
+    # Right ids and types but no details: this used to reach the planner and 500.
+    forged = [{"id": r["id"], "type": r["type"], "met": True, "details": {}}
+              for r in audit_program(transcript, app.CATALOG.get("BS_CS"))]
+    r = TestClient(app.app).post("/chat", json={"transcript": transcript, "program_id": "BS_CS", "audit": forged})
+    assert r.status_code == 200 and r.json()["audit"] == audit_program(transcript, app.CATALOG.get("BS_CS"))
+
+
+def test_chat_engine_work_runs_off_the_event_loop(monkeypatch):
+    import asyncio
+    from fastapi.testclient import TestClient
+    import app
+    on_loop = []
+
+    def prepare(**kwargs):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return {"reply": "ok", "audit": [], "planned_terms": []}
+
+    monkeypatch.setattr(app, "prepare_chat", prepare)
+    client = TestClient(app.app)
+    body = {"transcript": {"taken": []}, "program_id": "BS_CS"}
+    assert client.post("/chat", json=body).json()["reply"] == "ok"
+    assert "event: done" in client.post("/chat/stream", json=body).text
+    assert on_loop == [False, False]
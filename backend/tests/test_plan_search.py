@@ -0,0 +1,54 @@
+from core.catalog import Program
+from core.offerings import term_document
+from core.plan_search import search_plans
+from core.planner import greedy_plan
+
+SEC = {"crn": "1", "days": "MW", "start": "09:00", "end": "09:50", "cap": 30, "enrolled": 10}
+
+
+def _program(n=2):
+    # A -> B is required; `n` of E1..E3 are needed, and E3 needs B first.
+    return Program("T", {
+        "requirements": [{"id": "core", "type": "all_of", "courses": ["A", "B"]},
+                         {"id": "el", "type": "choose_n", "n": n, "from": ["E1", "E2", "E3"]}],
+        "prereqs": {"B": ["A"], "E3": ["B"]},
+        "course_meta": {c: {"credits": 3} for c in ["A", "B", "E1", "E2", "E3"]},
+    })
+
+
+def test_alternatives_vary_electives_and_never_lose_to_greedy():
+    program = _program(n=1)
+    terms = ["T1", "T2", "T3"]
+    out = search_plans({"taken": []}, program, terms, k=3, max_credits=6)
+    plans = out["plans"]
+    _, greedy = greedy_plan({"taken": []}, program, terms, max_credits=6)
+    # E3 can only follow B, which would take a third term; the two-term plans are the best.
+    assert not out["timed_out"] and len(plans) == 2
+    assert all(p["complete"] and p["terms"] == 2 for p in plans) and len(greedy) == 2
+    assert [p["electives"] for p in plans] == [["E1"], ["E2"]]
+    for p in plans:
+        term_of = {c: i for i, t in enumerate(p["planned_terms"]) for c in t["courses"]}
+        assert term_of["A"] < term_of["B"] and ("E3" not in term_of or term_of["B"] < term_of["E3"])
+        assert all(t["credits"] <= 6 for t in p["planned_terms"])
+
+
+def test_full_sections_are_avoided_when_it_costs_nothing():
+    full = {**SEC, "enrolled": 30}
+    offerings = {"T1": term_document("T1", {"A": [SEC], "E1": [full], "E2": [SEC]})}
+    best = search_plans({"taken": []}, _program(), ["T1", "T2", "T3"], k=1, max_credits=6, offerings=offerings)
+    assert best["plans"][0]["seat_issues"] == []
+    assert [t["courses"] for t in best["plans"][0]["planned_terms"]] == [["A", "E2"], ["B", "E1"]]
+
+
+def test_plans_are_complete_only_when_the_audit_is_covered():
+    # BSCivil: MAC2311 taken; its own prereq MAC2210 is outside the program. SUR3103(L)
+    # need MAC2210 too, so they can't be planned and no plan may claim to be complete.
+    from core import catalog_compiler as cc
+    catalog, _ = cc.compile_catalog("catalog.json", cc.EXPORTS_DIR)
+    program = Program("BSCivil", catalog["programs"]["BSCivil"])
+    out = search_plans({"taken": [{"code": "MAC2311"}]}, program, [f"T{i}" for i in range(8)], k=3)
+    assert out["plans"]
+    for plan in out["plans"]:
+        placed = {c for t in plan["planned_terms"] for c in t["courses"]}
+        assert {"MAC2312", "MAP3305", "PHY2048", "PHY2048L", "STA4032"} <= placed
+        assert not plan["complete"] and plan["missing"] == ["SUR3103", "SUR3103L"]
@@ -0,0 +1,49 @@
+from core.catalog import Program
+from core.planner import MAX_CREDITS, credit_limit, greedy_plan
+
+
+def _program():
+    # A -> B -> C -> D is the long chain; E..H are independent fillers.
+    return Program("T", {
+        "requirements": [{"id": "all", "type": "all_of", "courses": ["A", "B", "C", "D", "E", "F", "G", "H"]}],
+        "prereqs": {"B": ["A"], "C": ["B"], "D": ["C"]},
+        "course_meta": {c: {"credits": 3} for c in "ABCDEFGH"},
+    })
+
+
+def test_prereqs_land_in_earlier_terms_and_chain_goes_first():
+    _, planned = greedy_plan({"taken": []}, _program(), ["T1", "T2", "T3", "T4", "T5"], max_credits=6)
+    term_of = {c: i for i, t in enumerate(planned) for c in t["courses"]}
+    assert term_of["A"] < term_of["B"] < term_of["C"] < term_of["D"]
+    # Critical-path priority: the 4-course chain finishes in 4 terms instead of being pushed back.
+    assert len(planned) == 4
+    assert all(t["credits"] <= 6 for t in planned)
+
+
+def test_unreachable_prereq_is_left_unplanned():
+    program = Program("T", {
+        "requirements": [{"id": "all", "type": "all_of", "courses": ["B"]}],
+        "prereqs": {"B": ["X"]},
+        "course_meta": {"B": {"credits": 3}, "X": {"credits": 3}},
+    })
+    _, planned = greedy_plan({"taken": []}, program, ["T1", "T2"])
+    assert planned == []
+    _, planned = greedy_plan({"taken": [{"code": "X"}]}, program, ["T1", "T2"])
+    assert planned == [{"term": "T1", "courses": ["B"], "credits": 3}]
+
+
+def test_taken_course_counts_whatever_its_own_prereqs():
+    # B's prereq A is neither taken nor required, but B itself is taken, so C is plannable.
+    program = Program("T", {
+        "requirements": [{"id": "all", "type": "all_of", "courses": ["B", "C"]}],
+        "prereqs": {"B": ["A"], "C": ["B"]},
+        "course_meta": {c: {"credits": 3} for c in "ABC"},
+    })
+    _, planned = greedy_plan({"taken": [{"code": "B"}]}, program, ["T1", "T2"])
+    assert planned == [{"term": "T1", "courses": ["C"], "credits": 3}]
+
+
+def test_credit_limit_falls_back_and_clamps():
+    assert credit_limit({}) == credit_limit({"max_credits": "abc"}) == credit_limit(None) == MAX_CREDITS
+    assert credit_limit({"max_credits": "12"}) == 12
+    assert credit_limit({"max_credits": -4}) == 1 and credit_limit({"max_credits": 10**6}) == 30
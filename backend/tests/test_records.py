@@ -0,0 +1,33 @@
+from bench.synth import synth_cohort, synth_program
+from core.audit import audit_program
+from core.batch_audit import BatchAuditor
+from core.catalog import Program
+from core.records import as_transcript
+from core.scheduler import pick_sections, slot_groups
+
+
+def test_transcript_record_matches_dict_engines():
+    raw = synth_program(n_courses=80, depth=5, n_requirements=8, seed=3)
+    program = Program("S", raw)
+    auditor = BatchAuditor(program)
+    for t in synth_cohort(raw, 20, seed=4):
+        record = as_transcript(t)
+        assert as_transcript(record) is record
+        assert record.to_dict()["taken"] == [
+            {"code": r["code"], "term": r.get("term"), "grade": r.get("grade"), "credits": r.get("credits")}
+            for r in t["taken"]]
+        assert audit_program(record, program) == audit_program(t, program) == auditor.audit(record)
+        assert record.mask(program) == program.mask(r["code"] for r in t["taken"])
+
+
+def test_slot_groups_cached_per_offerings_document():
+    sec = {"crn": "1", "days": "MW", "start": "09:00", "end": "09:50", "cap": 30, "enrolled": 10}
+    offerings = {"sections": {"A": [sec, {**sec, "crn": "2", "enrolled": 5}, {**sec, "crn": "3", "days": "TR"}]}}
+    groups = slot_groups(offerings, "A")
+    assert slot_groups(offerings, "A") is groups
+    assert [(s.raw["crn"], s.free) for _, s in groups] == [("2", 25), ("3", 20)]
+    chosen, needs = pick_sections(["A"], offerings)
+    assert chosen == [{"course": "A", **offerings["sections"]["A"][1]}] and needs == []
+
+    full = {"sections": {"A": [{**sec, "enrolled": 30}]}}
+    assert slot_groups(full, "A") == ()
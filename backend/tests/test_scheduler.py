@@ -0,0 +1,53 @@
+from core.scheduler import conflict, pick_sections, rank_schedules, slot_groups
+
+
+def sec(crn, days, start, end, cap=30, enrolled=10):
+    return {"crn": crn, "days": days, "start": start, "end": end, "cap": cap, "enrolled": enrolled}
+
+
+def test_overlap_across_different_day_patterns():
+    assert conflict(sec("1", "MWF", "10:00", "10:50"), sec("2", "MW", "10:30", "11:45"))
+    assert not conflict(sec("1", "MWF", "10:00", "10:50"), sec("2", "TR", "10:00", "10:50"))
+    assert not conflict(sec("1", "MW", "10:00", "10:50"), sec("2", "MW", "10:50", "12:00"))
+
+
+def test_backtracks_instead_of_asking_for_override():
+    offerings = {"sections": {
+        "A": [sec("a1", "MWF", "10:00", "10:50"), sec("a2", "TR", "10:00", "11:15")],
+        "B": [sec("b1", "MW", "10:15", "11:30")],
+    }}
+    chosen, needs = pick_sections(["A", "B"], offerings)
+    assert needs == []
+    assert {c["crn"] for c in chosen} == {"a2", "b1"}
+
+
+def test_override_only_when_nothing_fits():
+    offerings = {"sections": {
+        "A": [sec("a1", "MWF", "10:00", "10:50")],
+        "B": [sec("b1", "MWF", "10:00", "10:50"), sec("b2", "TR", "09:00", "10:15", enrolled=30)],
+    }}
+    schedules = rank_schedules(["A", "B"], offerings)
+    assert len(schedules) == 1
+    chosen = {c["course"]: c for c in schedules[0]}
+    assert "note" not in chosen["A"]
+    assert chosen["B"]["crn"] == "b2" and chosen["B"]["note"] == "full → needs override"
+
+
+def test_slot_groups_follow_the_document_version():
+    offerings = {"version": 1, "sections": {"A": [sec("a1", "MWF", "10:00", "10:50")]}}
+    assert [g.raw["crn"] for _, g in slot_groups(offerings, "A")] == ["a1"]
+    offerings["sections"]["A"] = [sec("a2", "TR", "10:00", "11:15")]
+    offerings["version"] = 2  # an in-place edit is only seen with a new version
+    assert [g.raw["crn"] for _, g in slot_groups(offerings, "A")] == ["a2"]
+
+
+def test_budget_running_out_is_not_taken_for_a_conflict():
+    # First fit (X 8:00, Y 10:00) leaves Z nothing; X 9:00, Y 8:00, Z 10:00 works.
+    offerings = {"sections": {
+        "X": [sec("x8", "M", "08:00", "08:50"), sec("x9", "M", "09:00", "09:50")],
+        "Y": [sec("y8", "M", "08:00", "08:50"), sec("y10", "M", "10:00", "10:50")],
+        "Z": [sec("z10", "M", "10:00", "10:50"), sec("z8", "M", "08:00", "08:50")],
+    }}
+    # Two slot tries are not enough to finish even one schedule.
+    (chosen,) = rank_schedules(["X", "Y", "Z"], offerings, k=1, max_nodes=2)
+    assert [c["crn"] for c in chosen] == ["x9", "y8", "z10"]
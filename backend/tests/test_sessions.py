@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from core.sessions import MemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kw):
+        if request.param == "memory":
+            return MemorySessionStore(**kw)
+        return SQLiteSessionStore(str(tmp_path / "s.sqlite"), **kw)
+    return make
+
+
+def test_roundtrip_returns_copies(make_store):
+    store = make_store()
+    store.put("a", {"history": [{"role": "user", "content": "hi"}]})
+    got = store.get("a")
+    got["history"].append({"role": "assistant", "content": "hello"})
+    assert len(store.get("a")["history"]) == 1
+    assert store.delete("a") and store.get("a") is None and not store.delete("a")
+
+
+def test_ttl_and_lru_eviction(make_store, monkeypatch):
+    store = make_store(max_sessions=2, ttl=60)
+    store.put("a", {}); store.put("b", {})
+    store.get("a")  # a is now more recent than b
+    store.put("c", {})
+    if isinstance(store, SQLiteSessionStore):
+        store._evict(time.time())
+    assert store.get("b") is None and store.get("a") == {} and store.get("c") == {}
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert store.get("a") is None
+
+
+def test_put_with_expected_version_is_compare_and_set(make_store):
+    store = make_store()
+    store.put("a", {"history": []})
+    session, version = store.get_versioned("a")
+    assert store.put("a", {"history": ["first"]}, expect=version)
+    assert not store.put("a", {"history": ["stale"]}, expect=version)
+    assert store.get("a") == {"history": ["first"]} and store.get_versioned("a")[1] == version + 1
+
+
+def test_concurrent_turns_on_a_session_keep_both(monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+    from core.utils import load_json
+    monkeypatch.setattr(app, "SESSIONS", MemorySessionStore())
+    client = TestClient(app.app)
+    sid = client.post("/sessions", json={"transcript": load_json("transcript.sample.json"),
+                                         "program_id": "BS_CS"}).json()["session_id"]
+    first, second = app.SessionMessage(message="one"), app.SessionMessage(message="two")
+    # Both turns read the session before either is saved.
+    s1, v1, _ = app._session_turn(sid, first)
+    s2, v2, _ = app._session_turn(sid, second)
+    app._save_turn(sid, s1, v1, first, "reply one", {"k": 1})
+    app._save_turn(sid, s2, v2, second, "reply two", {"k": 2})
+    session = app.SESSIONS.get(sid)
+    assert [m["content"] for m in session["history"]] == ["one", "reply one", "two", "reply two"]
+    assert session["context_state"] is None  # the second turn's prompt state predates the first
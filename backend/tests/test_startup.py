@@ -0,0 +1,18 @@
+from bench.bench_startup import import_app
+from core.catalog import get_catalog
+from core.offerings import get_offerings
+from core.scheduler import _compiled
+from core.warmup import warm_up
+
+
+def test_importing_the_app_skips_pdf_and_llm_libraries():
+    _, loaded = import_app()
+    assert loaded == []
+
+
+def test_warm_up_levels():
+    catalog, offerings = get_catalog(), get_offerings()
+    assert warm_up(catalog, offerings, "0") == []
+    assert warm_up(catalog, offerings, "1") == ["engines"]
+    doc = offerings.get(offerings.default_term)
+    assert (id(doc), doc["version"]) in _compiled
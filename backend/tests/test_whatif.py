@@ -0,0 +1,78 @@
+import random
+
+from core.audit import audit_program
+from core.catalog import Program
+from core.planner import greedy_plan
+from core.whatif import what_if
+
+TERMS = ["T1", "T2", "T3", "T4", "T5", "T6"]
+
+
+def _program():
+    # A -> B -> C is a chain; D needs A; E..J fill a choose_n and a math-area credit rule.
+    return Program("T", {
+        "requirements": [
+            {"id": "core", "type": "all_of", "courses": ["A", "B", "C", "D"]},
+            {"id": "electives", "type": "choose_n", "n": 2, "from": ["E", "F", "G", "H"]},
+            {"id": "math", "type": "credits_at_least", "area": "math", "credits": 6},
+        ],
+        "prereqs": {"B": ["A"], "C": ["B"], "D": ["A"], "G": ["E"]},
+        "course_meta": {**{c: {"credits": 3} for c in "ABCDEFGH"},
+                        "I": {"credits": 3, "area": "math"}, "J": {"credits": 4, "area": "math"}},
+    })
+
+
+def test_drop_reevaluates_only_touched_requirements():
+    program = _program()
+    transcript = {"taken": [{"code": "A"}, {"code": "E"}, {"code": "I"}]}
+    out = what_if(transcript, program, [{"op": "drop", "code": "A"}], TERMS, max_credits=6)
+    assert out["reevaluated"] == ["core"]
+    assert out["audit"] == audit_program(out["transcript"], program)
+    assert [d["id"] for d in out["diff"]["audit"]] == ["core"]
+    # A now has to be planned before B and D, so the whole plan is redone.
+    assert out["replanned_from"] == "T1"
+    assert out["planned_terms"] == greedy_plan(out["transcript"], program, TERMS, 6)[1]
+
+
+def test_unrelated_change_keeps_plan_and_grade_change_moves_nothing():
+    program = _program()
+    transcript = {"taken": [{"code": "A", "grade": "B"}]}
+    base = what_if(transcript, program, [], TERMS, max_credits=6)
+    out = what_if(transcript, program, [{"op": "grade", "code": "A", "grade": "A"}], TERMS, max_credits=6,
+                  base_audit=base["audit"], base_plan=base["planned_terms"])
+    assert out["transcript"]["taken"][0]["grade"] == "A"
+    assert out["replanned_from"] is None and out["diff"]["plan"] == [] and out["diff"]["audit"] == []
+
+
+def test_random_changes_match_full_recompute_and_keep_plans_valid():
+    program = _program()
+    rnd = random.Random(7)
+    codes = list("ABCDEFGHIJ")
+    for _ in range(300):
+        transcript = {"taken": [{"code": c} for c in rnd.sample(codes, rnd.randint(0, 5))]}
+        changes = [{"op": rnd.choice(["add", "drop"]), "code": rnd.choice(codes)} for _ in range(rnd.randint(1, 3))]
+        out = what_if(transcript, program, changes, TERMS, max_credits=6)
+        assert out["audit"] == audit_program(out["transcript"], program)
+        if out["replanned_from"] == "T1":
+            assert out["planned_terms"] == greedy_plan(out["transcript"], program, TERMS, 6)[1]
+        done = {t["code"] for t in out["transcript"]["taken"]}
+        seen = set(done)
+        for term in out["planned_terms"]:
+            assert term["credits"] <= 6
+            assert all(set(program.prereqs.get(c, ())) <= seen for c in term["courses"])
+            assert not set(term["courses"]) & done
+            seen |= set(term["courses"])
+        # Everything the new audit still needs (and can reach) is planned.
+        full = greedy_plan(out["transcript"], program, TERMS, 6)[1]
+        assert {c for t in full for c in t["courses"]} == seen - done
+
+
+def test_adding_a_course_with_an_untracked_prereq_unlocks_its_dependents():
+    # B's own prereq X is not in the program's requirements; taking B still unlocks C.
+    program = Program("T", {"requirements": [{"id": "core", "type": "all_of", "courses": ["B", "C"]}],
+                            "prereqs": {"B": ["X"], "C": ["B"]}})
+    base = what_if({"taken": []}, program, [], TERMS)
+    assert base["planned_terms"] == []
+    out = what_if({"taken": []}, program, [{"op": "add", "code": "B"}], TERMS,
+                  base_audit=base["audit"], base_plan=base["planned_terms"])
+    assert out["planned_terms"] == [{"term": "T1", "courses": ["C"], "credits": 3}]
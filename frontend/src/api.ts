@@ -30,6 +30,16 @@ export async function audit(transcript: any, program_id: string) {
   return r.json();
 }
 
+// Every loaded program, ranked by remaining credits / estimated terms.
+export async function auditAll(transcript: any) {
+  const r = await fetch(`${BASE}/audit/all`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ transcript })
+  });
+  return r.json();
+}
+
 export async function plan(transcript: any, program_id: string) {
   const r = await fetch(`${BASE}/plan`, {
     method: 'POST',
@@ -39,6 +49,15 @@ export async function plan(transcript: any, program_id: string) {
   return r.json();
 }
 
+export async function planAlternatives(transcript: any, program_id: string, k = 3) {
+  const r = await fetch(`${BASE}/plan/alternatives`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ transcript, program_id, k })
+  });
+  return r.json();
+}
+
 export async function schedule(planned_terms: any[]) {
   const r = await fetch(`${BASE}/schedule`, {
     method: 'POST',
@@ -64,4 +83,118 @@ export async function chat(payload: any) {
     body: JSON.stringify(payload),
   });
   return res.json();
-}
\ No newline at end of file
+}
+
+// Streams Server-Sent Events from a POST endpoint; onEvent gets ('engine' | 'token' | 'done' | 'error', data).
+// Non-2xx responses throw an Error carrying `status` (404 = session expired).
+async function streamEvents(path: string, payload: any, onEvent: (event: string, data: any) => void) {
+  const res = await fetch(`${BASE}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload),
+  });
+  if (!res.ok || !res.body) {
+    const err: any = new Error(`chat stream failed: ${res.status}`);
+    err.status = res.status;
+    throw err;
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buf.indexOf('\n\n')) !== -1) {
+      const block = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
+export async function chatStream(payload: any, onEvent: (event: string, data: any) => void) {
+  return streamEvents('/chat/stream', payload, onEvent);
+}
+
+// Server-side advising session: the transcript, audit, plan and history stay on the server.
+export async function createSession(payload: any) {
+  const r = await fetch(`${BASE}/sessions`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload),
+  });
+  if (!r.ok) throw new Error(`create session failed: ${r.status}`);
+  return r.json();
+}
+
+export async function sessionChatStream(sessionId: string, payload: any, onEvent: (event: string, data: any) => void) {
+  return streamEvents(`/sessions/${sessionId}/chat/stream`, payload, onEvent);
+}
+
+// Hypothetical adds/drops/grade changes against a session (or a transcript); nothing is saved.
+export async function whatIf(payload: any) {
+  const r = await fetch(`${BASE}/whatif`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload),
+  });
+  if (!r.ok) throw new Error(`what-if failed: ${r.status}`);
+  return r.json();
+}
+
+// Background PDF processing: returns { job_id } at once (429 when the queue is full).
+export async function submitTranscriptPdfJob(file: File) {
+  const f = new FormData();
+  f.append('file', file);
+  const r = await fetch(`${BASE}/jobs/transcript_pdf`, { method: 'POST', body: f });
+  if (!r.ok) throw new Error(`PDF job submit failed: ${r.status}`);
+  return r.json();
+}
+
+export async function getJob(jobId: string) {
+  const r = await fetch(`${BASE}/jobs/${jobId}`);
+  if (!r.ok) throw new Error(`job lookup failed: ${r.status}`);
+  return r.json();
+}
+
+// `status` / `progress` events, then `done` (the upload result) or `error`. Returns the
+// EventSource so callers can close it early.
+export function watchJob(jobId: string, onEvent: (event: string, data: any) => void) {
+  const es = new EventSource(`${BASE}/jobs/${jobId}/events`);
+  for (const name of ['status', 'progress', 'done', 'error']) {
+    es.addEventListener(name, (e: MessageEvent) => {
+      // A dropped connection also fires `error`, without data.
+      onEvent(name, e.data ? JSON.parse(e.data) : { message: 'connection lost' });
+      if (name === 'done' || name === 'error') es.close();
+    });
+  }
+  return es;
+}
+
+// audit -> plan -> schedule in one call (choose with `stages`).
+export async function pipeline(payload: any) {
+  const r = await fetch(`${BASE}/pipeline`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload),
+  });
+  if (!r.ok) throw new Error(`pipeline failed: ${r.status}`);
+  return r.json();
+}
+
+export async function pipelinePdf(file: File, options: any = {}) {
+  const f = new FormData();
+  f.append('file', file);
+  f.append('options', JSON.stringify(options));
+  const r = await fetch(`${BASE}/pipeline`, { method: 'POST', body: f });
+  if (!r.ok) throw new Error(`pipeline failed: ${r.status}`);
+  return r.json();
+}
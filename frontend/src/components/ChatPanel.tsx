@@ -1,6 +1,6 @@
-import React, { useState } from 'react'
+import React, { useEffect, useState } from 'react'
 import ReactMarkdown from 'react-markdown'
-import { chat } from '../api'
+import { createSession, sessionChatStream } from '../api'
 
 type Message = { role: 'user' | 'assistant'; content: string }
 
@@ -26,13 +26,18 @@ export default function ChatPanel({
   const [input, setInput] = useState('')
   const [goals, setGoals] = useState('Graduate on time and keep ~15 credits per term.')
   const [loading, setLoading] = useState(false)
+  // Server-side session holding transcript, audit, plan and history; turns send only the new message.
+  const [sessionId, setSessionId] = useState<string | null>(null)
+
+  useEffect(() => {
+    setSessionId(null)
+  }, [transcript])
 
   const hasTranscript = !!transcript
 
   async function sendMessage() {
     if (!hasTranscript || !input.trim()) return
-    const newHistory: Message[] = [...messages, { role: 'user', content: input }]
-    setMessages(newHistory)
+    setMessages([...messages, { role: 'user', content: input }])
     setInput('')
     setLoading(true)
 
@@ -44,20 +49,51 @@ export default function ChatPanel({
       termsToSend = [firstTerm, ...plannedTerms.slice(1)];
     }
 
-    try {
-      const res = await chat({
-        transcript,
-        goals,
-        preferences: {},
-        history: newHistory,
-        planned_terms: termsToSend, 
-      })
+    const turn = async (sid: string) => {
+      let started = false
+      await sessionChatStream(
+        sid,
+        {
+          message: input,
+          goals,
+          // Only override the session's plan when the student narrowed next term's courses.
+          planned_terms: confirmedSelection.length > 0 ? termsToSend : undefined,
+        },
+        (event, data) => {
+          if (event === 'engine') {
+            if (data.planned_terms) onUpdatePlan(data.planned_terms)
+          } else if (event === 'token') {
+            // Append tokens to the assistant bubble as they arrive.
+            const first = !started
+            started = true
+            setMessages((prev) =>
+              first
+                ? [...prev, { role: 'assistant', content: data.text }]
+                : [...prev.slice(0, -1), { role: 'assistant', content: prev[prev.length - 1].content + data.text }]
+            )
+          } else if (event === 'error') {
+            throw new Error(data.message)
+          }
+        }
+      )
+    }
+
+    const openSession = async () => {
+      const s = await createSession({ transcript, goals, preferences: {}, planned_terms: termsToSend })
+      if (s.audit) onUpdateAudit(s.audit)
+      setSessionId(s.session_id)
+      return s.session_id as string
+    }
 
-      if (res.reply) {
-        setMessages((prev) => [...prev, { role: 'assistant', content: res.reply }])
+    try {
+      const sid = sessionId ?? (await openSession())
+      try {
+        await turn(sid)
+      } catch (e: any) {
+        // Session expired on the server: start a new one and retry once.
+        if (e?.status !== 404) throw e
+        await turn(await openSession())
       }
-      if (res.audit) onUpdateAudit(res.audit)
-      if (res.planned_terms) onUpdatePlan(res.planned_terms)
     } catch (e) {
       setMessages((prev) => [
         ...prev,